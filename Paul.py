@@ -5,13 +5,14 @@ Last release date: Unreleased
 
 Most "Any" type hints are placeholders, the actual type is an inline comment.
 """
+import os
 import pickle  # nosec
-from math import floor
-from typing import Any, Dict, List, Set, Union
+from itertools import chain
+from time import perf_counter
+from typing import Any, Dict, List, Set, Tuple
 
 import numpy as np
 import sc2
-from mypy_extensions import TypedDict
 from s2clientprotocol import sc2api_pb2 as sc_pb
 from sc2 import Difficulty
 from sc2.data import Race
@@ -22,32 +23,161 @@ from sc2.ids.upgrade_id import UpgradeId
 from sc2.player import Bot, Computer
 from sc2.position import Point2
 from sc2.unit import Unit
+from sc2.unit_command import UnitCommand
 from sc2.units import Units
 
-from creep_manager import Creeper
-from path_manager import PathManager
+from base_distances import points_file, save_key_points
+from combat_estimator import army_arrays, estimate
+from creep_growth import CREEP_RADIUS, SPREAD_LOOPS, CreepGrowth
+from creep_manager import Creeper, candidate_cells
+from enemy_memory import EnemyMemory
+from formation import formation_positions
+from job_queue import JobQueue
+from order_manager import OrderManager
+from overlord_scouting import OverlordPlanner, VisionTable
+from path_manager import ROUTE, PathManager
+from placement_cache import FOOTPRINTS, PlacementCache, Spot
+from query_batch import QueryBatch
+from spatial_index import FrameIndexes, SpatialIndex
+from target_fire import assign_targets
+from timeline import (
+    CREEP,
+    INJECT,
+    INJECT_LOOPS,
+    LARVA,
+    QUEEN_ABILITY_ENERGY,
+    RETRY_LOOPS,
+    TUMOR,
+    Timeline,
+    loops_until_energy,
+)
+from unit_registry import (
+    REMOVED,
+    ROLE_CREEP,
+    ROLE_INJECT,
+    ROLE_NONE,
+    ROLE_SCOUT,
+    UnitRegistry,
+)
 
-# used for self.pathing_dict
-PathDict = TypedDict("PathDict", {"path": list, "step": int})
+# our units and enemies this close to a unit make up its fight
+ENGAGE_RADIUS = 10
+# melee units this close to an enemy group spread out around it
+FORMATION_RADIUS = 15
+# enemies this close to the one nearest the swarm are surrounded together
+CLUSTER_RADIUS = 5
+# live placement queries per blocked building before giving up on it
+MAX_PLACEMENT_CHECKS = 4
+# structures ground units walk over, or that stand on ground that's blocked anyway
+UNBLOCKING_STRUCTURES = {
+    UnitTypeId.CREEPTUMOR,
+    UnitTypeId.CREEPTUMORBURROWED,
+    UnitTypeId.CREEPTUMORQUEEN,
+    UnitTypeId.EXTRACTOR,
+    UnitTypeId.EXTRACTORRICH,
+}
+
+
+def prepare_visuals(
+    paths: List[Any], points: Dict[str, Any]
+) -> Tuple[List[Any], Dict[str, List[Any]]]:
+    """
+    Turn what publish_visuals hands over into the lists the visualizer draws.
+
+    Note: This is run in the drawing thread, so it only reads its arguments.
+
+    Args:
+        paths (List[Any]): path entries and path service results
+        points (Dict[str, Any]): tumor candidates, and Units per kind of point
+
+    Returns:
+        Tuple[List, Dict[str, List]]: paths and points, see visualizer.render
+    """
+    entries, results = paths
+    cells = [entry["path"] + entry["waypoints"] for entry in entries]
+    cells += [result[0] if key[0] == ROUTE else result for key, result in results]
+    candidates = points["candidates"]
+    return (
+        cells,
+        {
+            "candidates": candidate_cells(*candidates) if candidates else [],
+            "units": [unit.position_tuple for unit in points["units"]],
+            "enemies": [
+                unit.position_tuple for units in points["enemies"] for unit in units
+            ],
+            "tumors": [
+                unit.position_tuple
+                for unit in points["tumors"]
+                if unit.type_id == UnitTypeId.CREEPTUMORBURROWED
+            ],
+        },
+    )
 
 
 class Paul(sc2.BotAI):
     """The code that is Paul."""
 
-    def __init__(self) -> None:
-        """Set up variables and data for the game."""
+    def __init__(
+        self, capture: bool = False, memory_interval: int = 0, visualize: str = ""
+    ) -> None:
+        """
+        Set up variables and data for the game.
+
+        Args:
+            capture (bool): record every frame's timings and state to captures/
+            memory_interval (int): game loops between memory samples written to
+                                   memory/, 0 to not trace memory
+            visualize (str): draw the grids live, "window" to show them or "png"
+                             to write frames to visuals/, "" to not draw
+
+        Returns:
+            None
+        """
         super().__init__()
-        self.unit_dict: Dict[int, UnitTypeId] = {}
-        self.inject_queens: Set[int] = set()
-        self.creep_queens: Set[int] = set()
-        self.tag_sets: List[Set[int]] = [self.inject_queens, self.creep_queens]
-        self.tag_dicts: List[Units] = [self.unit_dict]
+        self.registry = UnitRegistry()
+        self.orders = OrderManager()
+        self.registry.subscribe(REMOVED, self.orders.forget)
+        self.indexes = FrameIndexes()
+        self.enemy_memory = EnemyMemory(self.threat_value)
+        self.registry.subscribe(REMOVED, self.enemy_memory.forget)
+        self.jobs = JobQueue()
+        self.registry.subscribe(REMOVED, self.jobs.forget)
+        self.timeline = Timeline()
+        self.registry.subscribe(REMOVED, self.timeline.forget)
+        self.known_tumors: Set[int] = set()
+        self.spread_tumors: Set[int] = set()
+        self.registry.subscribe(REMOVED, self.known_tumors.discard)
+        self.registry.subscribe(REMOVED, self.spread_tumors.discard)
+        # worker tag -> (building, footprint size, spot) until the worker starts it
+        self.pending_builds: Dict[int, Tuple[UnitTypeId, int, Spot]] = {}
+        self.registry.subscribe(
+            REMOVED, lambda tag: self.pending_builds.pop(tag, None)
+        )
+        # structure tag -> (footprint size, spot) it was built on from the cache
+        self.placed: Dict[int, Tuple[int, Spot]] = {}
+        self.registry.subscribe(REMOVED, self.release_spot)
         self.target: Point2 = None
         self.build_order: List[Dict] = []
         self.pathing: Any = None  # class
+        self.placement: Any = None  # PlacementCache
+        self.creep_growth: Any = None  # CreepGrowth
+        self.scouting: Any = None  # OverlordPlanner
         self.i: int = 0  # build order index
         self.mode: str = "econ"  # econ or army
         self.rush_start = False
+        self.capturing = capture
+        self.capture: Any = None  # FrameCapture
+        # this frame's row and the column of each name, set up only when capturing,
+        # timings are filled in by lap
+        self.frame: Any = None
+        self.columns: Dict[str, int] = {}
+        self.lap_at = 0.0
+        self.memory_interval = memory_interval
+        self.memory: Any = None  # MemoryTracker
+        self.visualize = visualize
+        self.visualizer: Any = None  # Visualizer
+        # the last tumor handed to a spread job and its spreadable mask
+        self.tumor_candidates: Tuple[Point2, Any] = None
 
     async def on_start(self) -> None:
         """
@@ -72,72 +202,373 @@ class Paul(sc2.BotAI):
         )
         raw_game_info = await self._client._execute(game_info=sc_pb.RequestGameInfo())
         raw_observation = self.state.response_observation
-        self.pathing = PathManager(raw_game_data, raw_game_info, raw_observation)
+        self.pathing = PathManager(
+            raw_game_data, raw_game_info, raw_observation, jobs=self.jobs
+        )
         self.creeper = Creeper(raw_game_data, raw_game_info, raw_observation)
         # build_selector = BuildOrderManager(self.enemy_race)
         # self.build_order = build_selector.select_build_order()
         with open("builds/1312.pickle", "rb") as f:
             self.build_order = pickle.load(f)  # nosec
         # all possible arguments are handled by BuildOrderManager class
-        self.tag_dicts.append(self.pathing.pathing_dict)
+        self.registry.subscribe(REMOVED, self.pathing.forget)
+        # rocks are blocked in the grid until they die
+        for rock in self.destructables:
+            self.pathing.add_rock(rock.tag, rock.position, rock.radius)
+        self.creep_growth = CreepGrowth(self.pathing.grids.pathing.shape)
+        self.registry.subscribe(REMOVED, self.creep_growth.forget)
+        for townhall in self.townhalls:
+            self.creep_growth.add(
+                townhall.tag, townhall.position, CREEP_RADIUS[townhall.type_id], 0
+            )
+        map_name = self._game_info.map_name
+        self.placement = PlacementCache.load(map_name)
+        if not self.placement:
+            # only the first game on a map pays for finding expansions and spots
+            self.placement = PlacementCache.build(
+                self.pathing.grids.placement,
+                [self.start_location] + self.enemy_start_locations,
+                {
+                    location: [resource.position_tuple for resource in resources]
+                    for location, resources in self.expansion_locations.items()
+                },
+                self.pathing.base_distances,
+            )
+            self.placement.save(map_name)
+        if not os.path.exists(points_file(map_name)):
+            save_key_points(
+                map_name,
+                [self.start_location] + self.enemy_start_locations,
+                self.placement.expansions,
+                [ramp.top_center for ramp in self._game_info.map_ramps],
+            )
+        vision = VisionTable.load(map_name)
+        if not vision:
+            distances = self.pathing.base_distances
+            vision = VisionTable.build(
+                self.pathing.grids.pathing,
+                np.load(points_file(map_name)),
+                [
+                    distances.route(self.start_location, start)
+                    for start in self.enemy_start_locations
+                ]
+                if distances
+                else [],
+            )
+            vision.save(map_name)
+        self.scouting = OverlordPlanner(vision, self.enemy_start_locations)
+        self.registry.subscribe(REMOVED, self.scouting.release)
         self.target = self.enemy_start_locations[0].position
+        # optional tools are only imported when they're turned on
+        if self.capturing:
+            from frame_capture import COLUMNS, INDEX, FrameCapture, capture_file
+
+            self.frame = np.zeros(len(COLUMNS), dtype=np.float32)
+            self.columns = INDEX
+            self.capture = FrameCapture(
+                capture_file(map_name),
+                {"map": map_name, "enemy_race": self.enemy_race.name},
+            )
+        if self.memory_interval:
+            from memory_tracker import MemoryTracker, memory_file
+
+            self.memory = MemoryTracker(memory_file(map_name), self.memory_interval)
+        if self.visualize:
+            from visualizer import Visualizer, visual_dir
+
+            self.visualizer = Visualizer(
+                self.pathing.grids.pathing.shape,
+                visual_dir(map_name) if self.visualize == "png" else None,
+                prepare=prepare_visuals,
+            )
         await self.chat_send("gl hf")
 
     async def on_step(self, iteration: int = 0) -> None:
         """
-        Call all relevant functions.
+        Play a frame, timing its parts.
 
         Note: This function is called automatically.
 
+        Args:
+            iteration (int): frames played so far
+
+        Returns:
+            None
+        """
+        if self.capture:
+            self.frame.fill(0)
+        if self.memory:
+            self.memory.section("between_steps")
+        started = self.lap_at = perf_counter()
+        await self.play_step(iteration)
+        # whatever ran after the last lap is the build order
+        self.lap("build_ms")
+        if self.capture:
+            self.frame[self.columns["step_ms"]] = (perf_counter() - started) * 1000
+            self.record_state()
+            self.capture.append(self.frame)
+        if self.memory and self.memory.due(self.state.game_loop):
+            self.memory.sample(self.state.game_loop, self.memory_stores())
+        if self.visualizer and self.visualizer.due():
+            self.publish_visuals()
+
+    def lap(self, column: str) -> None:
+        """
+        Charge the time since the last lap to one of the timing columns.
+
+        Args:
+            column (str): one of frame_capture.TIMINGS
+
+        Returns:
+            None
+        """
+        if self.capture:
+            now = perf_counter()
+            self.frame[self.columns[column]] += (now - self.lap_at) * 1000
+            self.lap_at = now
+        if self.memory:
+            self.memory.section(column)
+
+    def memory_stores(self) -> Dict[str, int]:
+        """
+        Count the entries of everything that's kept between frames.
+
+        Args:
+            None
+
+        Returns:
+            Dict[str, int]: store name -> entries
+        """
+        pathing = self.pathing
+        return {
+            "registry": len(self.registry),
+            "last_orders": len(self.orders.last_orders),
+            "enemy_memory": len(self.enemy_memory),
+            "timeline": len(self.timeline.scheduled),
+            "timeline_queue": len(self.timeline.queue),
+            "jobs": len(self.jobs.pending),
+            "indexes": len(self.indexes.indexes),
+            "known_tumors": len(self.known_tumors),
+            "spread_tumors": len(self.spread_tumors),
+            "pending_builds": len(self.pending_builds),
+            "placed": len(self.placed),
+            "pathing_dict": len(pathing.pathing_dict),
+            "path_requests": len(pathing.path_requests),
+            "path_owners": len(pathing.path_owners),
+            "path_results": len(pathing.path_results),
+        }
+
+    def record_state(self) -> None:
+        """
+        Fill in the game state columns of this frame's row.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        frame = self.frame
+        index = self.columns
+        frame[index["game_loop"]] = self.state.game_loop
+        frame[index["units"]] = len(self.units)
+        frame[index["structures"]] = len(self.structures)
+        frame[index["enemies"]] = len(self.enemy_units) + len(self.enemy_structures)
+        frame[index["role_none"]] = self.registry.count(ROLE_NONE)
+        frame[index["role_inject"]] = self.registry.count(ROLE_INJECT)
+        frame[index["role_creep"]] = self.registry.count(ROLE_CREEP)
+        frame[index["role_scout"]] = self.registry.count(ROLE_SCOUT)
+        frame[index["tumors"]] = len(self.known_tumors)
+        pathing = self.pathing
+        frame[index["paths_cached"]] = len(pathing.pathing_dict) + len(
+            pathing.path_results
+        )
+        frame[index["path_requests"]] = len(pathing.path_requests) + len(
+            pathing.solving
+        )
+
+    def publish_visuals(self) -> None:
+        """
+        Hand the visualizer this frame's layers, paths and units.
+
+        Only references and shallow copies of the path stores are handed over,
+        prepare_visuals turns them into cells and positions in the drawing thread.
+        The Units collections are replaced every frame, not changed.
+
         Args:
             None
 
+        Returns:
+            None
+        """
+        grids = self.pathing.grids
+        self.visualizer.publish(
+            self.state.game_loop,
+            {"pathing": grids.pathing, "creep": grids.creep},
+            [
+                list(self.pathing.pathing_dict.values()),
+                list(self.pathing.path_results.items()),
+            ],
+            {
+                "candidates": self.tumor_candidates,
+                "units": self.units,
+                "enemies": (self.enemy_units, self.enemy_structures),
+                "tumors": self.structures,
+            },
+        )
+
+    async def play_step(self, iteration: int) -> None:
+        """
+        Call all relevant functions.
+
+        Args:
+            iteration (int): frames played so far
+
         Returns:
             None
         """
         if len(self.units(UnitTypeId.ZERGLING)) >= 6:
             self.rush_start = True
-        await self.inject(queen_tags=self.inject_queens)
+        self.enemy_memory.update(
+            chain(self.enemy_units, self.enemy_structures), self.state.game_loop
+        )
+        self.check_threats()
+        self.lap("enemies_ms")
+        grids = self.pathing.grids
+        grids.update(self.state)
+        creep_grid = grids.creep
+        self.pathing.update_creep(creep_grid, self.state.game_loop)
+        self.lap("grids_ms")
+        # only units whose timeline entry is due get their abilities checked
+        game_loop = self.state.game_loop
+        for tumor in self.structures(UnitTypeId.CREEPTUMORBURROWED):
+            if tumor.tag not in self.known_tumors:
+                self.known_tumors.add(tumor.tag)
+                self.timeline.schedule(TUMOR, tumor.tag, game_loop)
+                self.creep_growth.add(
+                    tumor.tag, tumor.position, CREEP_RADIUS[tumor.type_id], game_loop
+                )
+        due: Dict[str, Set[int]] = {INJECT: set(), CREEP: set(), TUMOR: set()}
+        for kind, tag in self.timeline.due(game_loop):
+            if kind == LARVA:
+                # a townhall can be injected again, wake the inject queens
+                for queen_tag in self.registry.tags_with_role(ROLE_INJECT):
+                    self.timeline.schedule(INJECT, queen_tag, game_loop + 1)
+            else:
+                due[kind].add(tag)
+        due_units = [
+            *self.units.tags_in(due[INJECT] | due[CREEP]),
+            *self.structures.tags_in(due[TUMOR]),
+        ]
+        # every stage's questions go to the game together, one round trip per frame
+        batch = QueryBatch()
+        batch.ask_abilities([unit.tag for unit in due_units])
+        retries = self.plan_blocked_builds(batch)
+        expansion = self.plan_expansion(batch)
+        await batch.send(self._client)
+        abilities = batch.abilities
+        self.lap("abilities_ms")
+        await self.inject(queen_tags=due[INJECT], abilities=abilities)
+        self.lap("inject_ms")
         if self.rush_start:
             await self.micro()
-        creep_grid = np.transpose(self.state.creep.data_numpy)
+        self.lap("micro_ms")
         if iteration == 0:
             with open("drawn_grids/creep_triton.txt", "w") as f:
                 for i in range(creep_grid.shape[0]):
                     for j in range(creep_grid.shape[1]):
-                        f.write(str(creep_grid[i][j]))
+                        f.write(str(int(creep_grid[i][j])))
                     f.write("\n")
-        for queen in self.units(UnitTypeId.QUEEN).filter(
-            lambda unit: unit.tag in self.creep_queens
-        ):
-            q_abilities = await self.get_available_abilities(queen)
-            if AbilityId.BUILD_CREEPTUMOR_QUEEN in q_abilities:
-                enemy_target = self.enemy_start_locations[0].towards(
-                    self._game_info.map_center, 5
-                )
-                to_e_base = self.pathing.pf.find_path(
-                    (floor(queen.position.x), floor(queen.position.y)),
-                    (floor(enemy_target.x), floor(enemy_target.y)),
-                )[0]
-                for i in range(len(to_e_base) - 1, -1, -1):
-                    if creep_grid[to_e_base[i]]:
-                        pos = Point2((to_e_base[i][0], to_e_base[i][1]))
-                        self.do(queen(AbilityId.BUILD_CREEPTUMOR_QUEEN, pos))
-                        # CAN'T FIND PROPER POINT
-        for tumor in self.structures(UnitTypeId.CREEPTUMORBURROWED):
-            abilities = await self.get_available_abilities(tumor)
-            if AbilityId.BUILD_CREEPTUMOR_TUMOR in abilities:
-                tumor_positions = {
-                    unit.position
-                    for unit in self.structures.filter(
-                        lambda unit: unit.type_id
-                        in {UnitTypeId.CREEPTUMORBURROWED, UnitTypeId.CREEPTUMOR}
-                    )
-                }
-                location = await self.creeper.find_position(
-                    tumor, tumor_positions, creep_grid, self.pathing.map_grid
+        for queen in self.units.tags_in(due[CREEP]):
+            q_abilities = abilities.get(queen.tag, [])
+            if AbilityId.BUILD_CREEPTUMOR_QUEEN not in q_abilities:
+                wait = loops_until_energy(queen.energy) or RETRY_LOOPS
+                self.timeline.schedule(CREEP, queen.tag, game_loop + wait)
+                continue
+            # the path service solves it in a later frame
+            enemy_target = self.enemy_start_locations[0].towards(
+                self._game_info.map_center, 5
+            )
+            self.pathing.request_path(
+                ("creep_path", queen.tag), queen.position, enemy_target
+            )
+            done, to_e_base = self.pathing.path_result(("creep_path", queen.tag))
+            if not done:
+                self.timeline.schedule(CREEP, queen.tag, game_loop + 1)
+                continue
+            wait = RETRY_LOOPS
+            for i in range(len(to_e_base) - 1, -1, -1):
+                if creep_grid[to_e_base[i]]:
+                    pos = Point2((to_e_base[i][0], to_e_base[i][1]))
+                    self.do(queen(AbilityId.BUILD_CREEPTUMOR_QUEEN, pos))
+                    wait = loops_until_energy(queen.energy - QUEEN_ABILITY_ENERGY)
+                    # CAN'T FIND PROPER POINT
+            self.timeline.schedule(CREEP, queen.tag, game_loop + max(wait, 1))
+        for tumor in self.structures.tags_in(due[TUMOR]):
+            if AbilityId.BUILD_CREEPTUMOR_TUMOR not in abilities.get(tumor.tag, []):
+                # a tumor that was told to spread and can't any more is done
+                if tumor.tag not in self.spread_tumors:
+                    self.timeline.schedule(TUMOR, tumor.tag, game_loop + RETRY_LOOPS)
+                continue
+            tumor_positions = {
+                unit.position
+                for unit in self.structures.filter(
+                    lambda unit: unit.type_id
+                    in {UnitTypeId.CREEPTUMORBURROWED, UnitTypeId.CREEPTUMOR}
                 )
+            }
+            # scored in a worker thread, spread once the result is in
+            done, location = self.jobs.pop_result(("tumor", tumor.tag))
+            if done:
                 self.do(tumor(AbilityId.BUILD_CREEPTUMOR_TUMOR, location))
+                self.spread_tumors.add(tumor.tag)
+                # later spreads plan around the creep this one will make, until
+                # the new tumor shows up and takes over
+                self.creep_growth.add(
+                    ("spread", tumor.tag),
+                    location,
+                    CREEP_RADIUS[UnitTypeId.CREEPTUMORBURROWED],
+                    game_loop + SPREAD_LOOPS,
+                    expires=game_loop + 2 * SPREAD_LOOPS,
+                )
+                # confirm the spread happened
+                self.timeline.schedule(TUMOR, tumor.tag, game_loop + RETRY_LOOPS)
+                continue
+            self.timeline.schedule(TUMOR, tumor.tag, game_loop + 1)
+            if ("tumor", tumor.tag) in self.jobs:
+                continue
+            # fallback path toward the enemy comes from the path service
+            self.pathing.request_path(
+                ("tumor_path", tumor.tag),
+                tumor.position,
+                self.enemy_start_locations[0],
+            )
+            path_done, path_to_e_base = self.pathing.path_result(
+                ("tumor_path", tumor.tag)
+            )
+            if path_done:
+                # fresh masks, the layers change while the job runs
+                spreadable = grids.mask("pathing", "creep")
+                self.tumor_candidates = (tumor.position, spreadable)
+                # score against the creep there will be once the new tumor is up
+                self.creep_growth.expire(game_loop)
+                uncovered = self.creep_growth.coverage(
+                    grids.creep, game_loop + SPREAD_LOOPS
+                )
+                np.greater(grids.pathing, uncovered, out=uncovered)
+                self.jobs.submit(
+                    ("tumor", tumor.tag),
+                    self.creeper.find_position,
+                    tumor.position,
+                    tumor_positions,
+                    spreadable,
+                    uncovered,
+                    path_to_e_base,
+                )
+        self.lap("creep_ms")
+        self.pathing.solve_requests()
+        self.retry_blocked_builds(retries, batch)
+        self.lap("paths_ms")
         # TODO: place all necessary code above build order due to return statements
         if self.i >= len(self.build_order):
             # TODO: Select new build order instead of switching to army
@@ -147,29 +578,27 @@ class Paul(sc2.BotAI):
             if self.supply_used != order["supply"]:
                 self.train(UnitTypeId["DRONE"])
             elif self.supply_used == order["supply"]:
-                for tech in order["requires"]:
-                    if not self.structures(UnitTypeId[tech]).ready:
-                        return
+                if not self.requirements_met(order):
+                    return
                 if order["category"] == "struct":
                     if self.workers:
                         worker = self.workers.random
                         if order["name"] == "EXTRACTOR":
                             if self.can_afford(UnitTypeId["EXTRACTOR"]):
-                                target = self.vespene_geyser.closest_to(worker)
+                                target = self.index(
+                                    "geysers", self.vespene_geyser
+                                ).closest_to(worker)
                                 if self.do(worker.build_gas(target)):
                                     self.i += 1
                         elif order["name"] == "SPAWNINGPOOL":
-                            pos = self.townhalls[0].position.to2.towards(
-                                self._game_info.map_center, 5
-                            )
                             if self.can_afford(UnitTypeId["SPAWNINGPOOL"]):
-                                if self.do(
-                                    worker.build(UnitTypeId["SPAWNINGPOOL"], pos)
+                                if self.place_building(
+                                    worker, UnitTypeId["SPAWNINGPOOL"]
                                 ):
                                     self.i += 1
                         elif order["name"] == "HATCHERY":
                             if self.minerals >= 300:
-                                await self.expand_now()
+                                await self.expand(expansion, batch)
                                 self.i += 1
                 elif order["category"] == "unit":
                     if len(self.units(UnitTypeId["LARVA"])) > 0:
@@ -184,13 +613,11 @@ class Paul(sc2.BotAI):
                 not self.already_pending(UnitTypeId["SPAWNINGPOOL"])
                 and not self.structures(UnitTypeId["SPAWNINGPOOL"]).ready
             ):
-                if self.can_afford(UnitTypeId["SPAWNINGPOOL"]):
-                    pos = self.townhalls[0].position.to2.towards(
-                        self._game_info.map_center, 5
+                if self.can_afford(UnitTypeId["SPAWNINGPOOL"]) and self.workers:
+                    worker = self.index("workers", self.workers).closest_to(
+                        self.start_location
                     )
-                    if self.can_afford(UnitTypeId["SPAWNINGPOOL"]) and self.workers:
-                        worker = self.workers.closest_to(pos)
-                        self.do(worker.build(UnitTypeId["SPAWNINGPOOL"], pos))
+                    self.place_building(worker, UnitTypeId["SPAWNINGPOOL"])
                 else:
                     return
             if self.supply_left <= 2:
@@ -201,6 +628,271 @@ class Paul(sc2.BotAI):
             )
             self.train(UnitTypeId["QUEEN"])
 
+    def do(
+        self,
+        action: UnitCommand,
+        subtract_cost: bool = False,
+        subtract_supply: bool = False,
+        can_afford_check: bool = False,
+    ) -> bool:
+        """
+        Queue a unit command unless the unit is already carrying it out.
+
+        Args:
+            action (UnitCommand): the command to issue
+            subtract_cost (bool): passed on to BotAI.do
+            subtract_supply (bool): passed on to BotAI.do
+            can_afford_check (bool): passed on to BotAI.do
+
+        Returns:
+            bool: True if the command was queued or is already in progress
+        """
+        if self.orders.is_redundant(action):
+            return True
+        if super().do(action, subtract_cost, subtract_supply, can_afford_check):
+            self.orders.record(action)
+            return True
+        return False
+
+    async def _do_actions(
+        self, actions: List[UnitCommand], prevent_double: bool = True
+    ) -> Any:
+        """
+        Send the frame's commands with identical orders grouped together.
+
+        Note: This function is called automatically after on_step.
+
+        Args:
+            actions (List[UnitCommand]): commands collected by self.do
+            prevent_double (bool): passed on to BotAI._do_actions
+
+        Returns:
+            Any: action results from the client
+        """
+        return await super()._do_actions(self.orders.batch(actions), prevent_double)
+
+    def index(self, name: str, units: Units) -> SpatialIndex:
+        """
+        Get this frame's spatial index for a group of units.
+
+        Args:
+            name (str): cache key, the same name must always mean the same group
+            units (Units): the group to index if it isn't cached yet
+
+        Returns:
+            SpatialIndex: the index
+        """
+        return self.indexes.get(name, units, self.state.game_loop)
+
+    def next_expansion(self) -> Point2:
+        """
+        Pick the free expansion closest to our main.
+
+        Ground distance decides when the map has a distance table, otherwise the
+        cached order.
+
+        Args:
+            None
+
+        Returns:
+            Point2: the expansion, None if every expansion is taken
+        """
+        townhall_types = {
+            UnitTypeId.HATCHERY,
+            UnitTypeId.LAIR,
+            UnitTypeId.HIVE,
+            UnitTypeId.NEXUS,
+            UnitTypeId.COMMANDCENTER,
+            UnitTypeId.ORBITALCOMMAND,
+            UnitTypeId.PLANETARYFORTRESS,
+        }
+        taken = self.index(
+            "all_townhalls",
+            self.townhalls | self.enemy_structures.of_type(townhall_types),
+        )
+        free = [
+            Point2(location)
+            for location in self.placement.expansions_from(self.start_location)
+            if taken.closest_distance_to(location) > 6
+        ]
+        table = self.pathing.base_distances
+        if table:
+            return table.closest(self.start_location, free)
+        return free[0] if free else None
+
+    def place_building(self, worker: Unit, building: UnitTypeId) -> bool:
+        """
+        Send a worker to build at the next cached spot in our main.
+
+        Args:
+            worker (Unit): the worker to build with
+            building (UnitTypeId): a building listed in FOOTPRINTS
+
+        Returns:
+            bool: True if the build was queued or a worker is already on its way
+        """
+        if any(pending[0] == building for pending in self.pending_builds.values()):
+            return True
+        size = FOOTPRINTS[building.name]
+        spot = self.placement.next_spot(
+            self.placement.base_of(self.start_location), size
+        )
+        if not spot:
+            return False
+        if not self.do(worker.build(building, Point2(spot))):
+            return False
+        self.placement.claim(size, spot)
+        self.pending_builds[worker.tag] = (building, size, spot)
+        return True
+
+    def plan_blocked_builds(
+        self, batch: QueryBatch
+    ) -> List[Tuple[int, UnitTypeId, int, List[Spot]]]:
+        """
+        Ask where builds whose cached spot turned out to be blocked can go instead.
+
+        Only here is placement checked with the game, a few spots per build at most.
+        The spots are claimed while they're checked so two builds don't get the
+        same ones.
+
+        Args:
+            batch (QueryBatch): this frame's queries
+
+        Returns:
+            List[Tuple[int, UnitTypeId, int, List[Spot]]]: worker tag, building,
+                footprint size and the spots asked about, best first
+        """
+        retries = []
+        for error in self.state.action_errors:
+            if error.unit_tag not in self.pending_builds:
+                continue
+            building, size, spot = self.pending_builds.pop(error.unit_tag)
+            if not self.units.find_by_tag(error.unit_tag):
+                continue
+            base = self.placement.base_of(spot)
+            ability = self._game_data.units[building.value].creation_ability.id
+            spots = []
+            for _ in range(MAX_PLACEMENT_CHECKS):
+                spot = self.placement.next_spot(base, size)
+                if not spot:
+                    break
+                self.placement.claim(size, spot)
+                batch.ask_placement((error.unit_tag, spot), ability, spot)
+                spots.append(spot)
+            retries.append((error.unit_tag, building, size, spots))
+        return retries
+
+    def retry_blocked_builds(
+        self,
+        retries: List[Tuple[int, UnitTypeId, int, List[Spot]]],
+        batch: QueryBatch,
+    ) -> None:
+        """
+        Move blocked builds to the first spot the game said is free.
+
+        Spots the game said a building can't stand on stay claimed so nobody
+        tries them again, every other spot that wasn't chosen is handed back.
+
+        Args:
+            retries (List[Tuple[int, UnitTypeId, int, List[Spot]]]): from
+                plan_blocked_builds
+            batch (QueryBatch): this frame's queries, already sent
+
+        Returns:
+            None
+        """
+        for worker_tag, building, size, spots in retries:
+            worker = self.units.find_by_tag(worker_tag)
+            for spot in spots:
+                key = (worker_tag, spot)
+                if (
+                    worker
+                    and worker_tag not in self.pending_builds
+                    and batch.placeable.get(key)
+                ):
+                    self.do(worker.build(building, Point2(spot)))
+                    self.pending_builds[worker_tag] = (building, size, spot)
+                elif not batch.blocked(key):
+                    self.placement.release(size, spot)
+
+    def plan_expansion(self, batch: QueryBatch) -> Point2:
+        """
+        Ask if the next expansion is free when the build order is about to take it.
+
+        Only asked on the frame the econ build order places the hatchery, so the
+        same checks as there.
+
+        Args:
+            batch (QueryBatch): this frame's queries
+
+        Returns:
+            Point2: the expansion, None if the build order isn't at an expansion
+        """
+        if self.mode != "econ" or self.i >= len(self.build_order):
+            return None
+        order = self.build_order[self.i]
+        if (
+            order["name"] != "HATCHERY"
+            or self.supply_used != order["supply"]
+            or not self.requirements_met(order)
+            or not self.workers
+            or self.minerals < 300
+        ):
+            return None
+        location = self.next_expansion()
+        if location:
+            batch.ask_placement(
+                ("expansion", location), AbilityId.ZERGBUILD_HATCHERY, location
+            )
+        return location
+
+    def requirements_met(self, order: Dict) -> bool:
+        """Check that every structure a build order step requires is ready."""
+        return all(
+            self.structures(UnitTypeId[tech]).ready for tech in order["requires"]
+        )
+
+    async def expand(self, location: Point2, batch: QueryBatch) -> None:
+        """
+        Send a drone to build a hatchery at an expansion.
+
+        Args:
+            location (Point2): the expansion, see plan_expansion
+            batch (QueryBatch): this frame's queries, already sent
+
+        Returns:
+            None
+        """
+        if not batch.placeable.get(("expansion", location)):
+            # something stands on the spot, let the library search around it
+            await self.expand_now(location=location)
+            return
+        worker = self.select_build_worker(location)
+        if worker:
+            self.do(
+                worker.build(UnitTypeId.HATCHERY, location), subtract_cost=True
+            )
+
+    async def on_end(self, game_result: Any) -> None:
+        """
+        Stop background work and finish the capture, memory log and drawing.
+
+        Note: This function is called automatically.
+
+        Args:
+            game_result (Any): Result enum from the library
+
+        Returns:
+            None
+        """
+        self.jobs.shutdown()
+        if self.capture:
+            self.capture.close(result=str(game_result))
+        if self.memory:
+            self.memory.close()
+        if self.visualizer:
+            self.visualizer.close()
+
     async def on_unit_created(self, unit: Unit) -> None:
         """
         Add unit to dictionaries and determine what should happen to each spawned unit.
@@ -213,7 +905,7 @@ class Paul(sc2.BotAI):
         Returns:
             None
         """
-        self.unit_dict[unit.tag] = unit.type_id
+        self.registry.add(unit.tag, unit.type_id)
 
         # drone protocol (prioritize gas -> minerals)
         if unit.type_id in {UnitTypeId.DRONE}:
@@ -223,18 +915,57 @@ class Paul(sc2.BotAI):
                     return
             for base in self.townhalls.ready:
                 if base.assigned_harvesters < 16:
-                    self.do(unit.gather(self.mineral_field.closest_to(base.position)))
+                    minerals = self.index("minerals", self.mineral_field)
+                    self.do(unit.gather(minerals.closest_to(base.position)))
                     return
 
+        # overlords spread out to watch expansions and attack routes
+        if unit.type_id == UnitTypeId.OVERLORD and self.scouting:
+            spot = self.scouting.assign(unit.tag)
+            if spot:
+                self.registry.set_role(unit.tag, ROLE_SCOUT)
+                self.do(unit.move(Point2(spot)))
+            return
+
         # queen protocol (inject > creep > unassigned)
         if unit.type_id in {UnitTypeId.QUEEN}:
-            if len(self.inject_queens) < min(len(self.townhalls), 3):
-                self.inject_queens.add(unit.tag)
+            if self.registry.count(ROLE_INJECT) < min(len(self.townhalls), 3):
+                self.registry.set_role(unit.tag, ROLE_INJECT)
+                self.timeline.schedule(INJECT, unit.tag, self.state.game_loop)
                 return
-            elif len(self.creep_queens) < 4:
-                self.creep_queens.add(unit.tag)
+            elif self.registry.count(ROLE_CREEP) < 4:
+                self.registry.set_role(unit.tag, ROLE_CREEP)
+                self.timeline.schedule(CREEP, unit.tag, self.state.game_loop)
                 return
 
+    async def on_building_construction_started(self, unit: Unit) -> None:
+        """
+        Block the new structure's cells and clear the pending build it came from.
+
+        Note: This function is called automatically.
+
+        Args:
+            unit (Unit): the structure that started
+
+        Returns:
+            None
+        """
+        if unit.type_id not in UNBLOCKING_STRUCTURES:
+            size = FOOTPRINTS.get(unit.type_id.name) or int(2 * unit.radius)
+            self.pathing.block(unit.tag, unit.position, size)
+        for worker_tag, (building, size, spot) in self.pending_builds.items():
+            if building == unit.type_id and unit.distance_to(Point2(spot)) < 1:
+                del self.pending_builds[worker_tag]
+                # the spot stays claimed as long as the structure stands
+                self.placed[unit.tag] = (size, spot)
+                return
+
+    def release_spot(self, tag: int) -> None:
+        """Hand a destroyed structure's cached spot out again."""
+        placed = self.placed.pop(tag, None)
+        if placed and self.placement:
+            self.placement.release(*placed)
+
     async def on_unit_destroyed(self, unit_tag: int) -> None:
         """
         Remove dead units from stored data points, replace structures/drones.
@@ -247,15 +978,8 @@ class Paul(sc2.BotAI):
         Returns:
             None
         """
-        # clean up lists and sets
-        for tag_set in self.tag_sets:  # type: Union[list, set]
-            if unit_tag in tag_set:
-                tag_set.remove(unit_tag)
-
-        # clean up dictionaries
-        for tag_dict in self.tag_dicts:  # type: Dict
-            if unit_tag in tag_dict:
-                del tag_dict[unit_tag]
+        # subscribed managers clean up their own stores
+        self.registry.remove(unit_tag)
 
     async def on_building_construction_complete(self, unit: Unit) -> None:
         """
@@ -269,37 +993,66 @@ class Paul(sc2.BotAI):
         Returns:
             None
         """
+        if unit.type_id in CREEP_RADIUS:
+            self.creep_growth.add(
+                unit.tag,
+                unit.position,
+                CREEP_RADIUS[unit.type_id],
+                self.state.game_loop,
+            )
         # immediately assign workers to geyser
         if unit.type_id in {UnitTypeId.EXTRACTOR, UnitTypeId.EXTRACTORRICH}:
-            gas_drones = self.workers.closest_n_units(unit, 3)
+            gas_drones = self.index("workers", self.workers).closest_n_units(unit, 3)
             for drone in gas_drones:
                 self.do(drone.gather(unit))
             return
 
-    async def inject(self, queen_tags: Set[int]) -> None:
+    async def inject(
+        self, queen_tags: Set[int], abilities: Dict[int, List[AbilityId]]
+    ) -> None:
         """
-        Inject townhalls.
+        Inject townhalls with the inject queens that are due and reschedule them.
 
         Args:
-            queen_tags (Set[int]): tags of queens assigned to inject
+            queen_tags (Set[int]): tags of inject queens due on the timeline
+            abilities (Dict[int, List[AbilityId]]): available abilities by tag
 
         Returns:
             None
         """
-        queens = self.units.tags_in(queen_tags)
-        for queen in queens:
-            abilities = await self.get_available_abilities(queen)
-            if AbilityId.EFFECT_INJECTLARVA in abilities:
-                possible_targets = self.townhalls.filter(
-                    lambda unit: BuffId.QUEENSPAWNLARVATIMER not in unit.buffs
-                )
-                if possible_targets:
-                    inject_target = possible_targets.closest_to(queen)
-                    self.do(queen(AbilityId.EFFECT_INJECTLARVA, inject_target))
+        game_loop = self.state.game_loop
+        ready_queens = []
+        for queen in self.units.tags_in(queen_tags):
+            if AbilityId.EFFECT_INJECTLARVA in abilities.get(queen.tag, []):
+                ready_queens.append(queen)
+            else:
+                wait = loops_until_energy(queen.energy) or RETRY_LOOPS
+                self.timeline.schedule(INJECT, queen.tag, game_loop + wait)
+        if not ready_queens:
+            return
+        possible_targets = self.index(
+            "inject_targets",
+            self.townhalls.filter(
+                lambda unit: BuffId.QUEENSPAWNLARVATIMER not in unit.buffs
+            ),
+        )
+        if not possible_targets:
+            # woken again when a townhall's larva pops
+            for queen in ready_queens:
+                self.timeline.schedule(INJECT, queen.tag, game_loop + RETRY_LOOPS)
+            return
+        # one batched query for every queen that can inject
+        _, indices = possible_targets.nearest_k(self.units.subgroup(ready_queens))
+        for queen, target_index in zip(ready_queens, indices[:, 0]):
+            inject_target = possible_targets.unit_list[target_index]
+            self.do(queen(AbilityId.EFFECT_INJECTLARVA, inject_target))
+            wait = loops_until_energy(queen.energy - QUEEN_ABILITY_ENERGY)
+            self.timeline.schedule(INJECT, queen.tag, game_loop + max(wait, 1))
+            self.timeline.schedule(LARVA, inject_target.tag, game_loop + INJECT_LOOPS)
 
     async def on_enemy_unit_entered_vision(self, unit: Unit) -> None:
         """
-        Decide what to do based on where the unit is.
+        Remember the unit, on_step decides what to do about it.
 
         Args:
             unit (Unit): the enemy that entered vision
@@ -307,9 +1060,166 @@ class Paul(sc2.BotAI):
         Returns:
             None
         """
-        if unit.type_id not in {UnitTypeId.DRONE, UnitTypeId.PROBE, UnitTypeId.SCV}:
-            if self._distance_pos_to_pos(unit, self.townhalls.closest_to(unit)) <= 20:
-                self.mode = "army"
+        self.enemy_memory.see(unit, self.state.game_loop)
+
+    def threat_value(self, unit: Unit) -> float:
+        """
+        Rate how dangerous an enemy unit is.
+
+        Args:
+            unit (Unit): the enemy unit
+
+        Returns:
+            float: 0 for workers and units that can't attack, otherwise supply cost
+        """
+        if unit.type_id in {UnitTypeId.DRONE, UnitTypeId.PROBE, UnitTypeId.SCV}:
+            return 0
+        if not unit.can_attack:
+            return 0
+        return float(max(self.calculate_supply_cost(unit.type_id), 1))
+
+    def check_threats(self) -> None:
+        """
+        Switch to army mode if remembered enemies are close to any townhall.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if not self.townhalls or not len(self.enemy_memory):
+            return
+        townhall_positions = np.array(
+            [base.position_tuple for base in self.townhalls], dtype=np.float32
+        )
+        if self.enemy_memory.threat_near(townhall_positions, 20).max() > 0:
+            self.mode = "army"
+
+    def losing_units(self, attackers: Units) -> Set[int]:
+        """
+        Find attackers whose local fight is predicted to be lost.
+
+        Each attacker's candidate fight is our attackers and the visible enemies
+        within ENGAGE_RADIUS of it, and all of them are estimated in one batch.
+
+        Args:
+            attackers (Units): units that might fight
+
+        Returns:
+            Set[int]: tags of attackers that should retreat
+        """
+        enemies = self.enemy_units
+        if not attackers or not enemies:
+            return set()
+        attacker_list = list(attackers)
+        enemy_list = list(enemies)
+        ours = np.array([unit.position_tuple for unit in attacker_list])
+        theirs = np.array([unit.position_tuple for unit in enemy_list])
+        our_offsets = ours[:, None, :] - ours[None, :, :]
+        their_offsets = ours[:, None, :] - theirs[None, :, :]
+        radius = ENGAGE_RADIUS ** 2
+        our_members = np.einsum("ijk,ijk->ij", our_offsets, our_offsets) <= radius
+        their_members = (
+            np.einsum("ijk,ijk->ij", their_offsets, their_offsets) <= radius
+        )
+        ours_kept, _ = estimate(
+            army_arrays(attacker_list),
+            our_members,
+            army_arrays(enemy_list),
+            their_members,
+        )
+        losing = (ours_kept <= 0) & their_members.any(axis=1)
+        return {unit.tag for unit, lost in zip(attacker_list, losing) if lost}
+
+    def focus_targets(self, attackers: Units) -> Dict[int, Unit]:
+        """
+        Pick a target for every attacker that has a visible enemy in range.
+
+        Args:
+            attackers (Units): units to find targets for
+
+        Returns:
+            Dict[int, Unit]: attacker tag -> enemy to attack
+        """
+        enemies = self.enemy_units
+        if not attackers or not enemies:
+            return {}
+        attacker_list = list(attackers)
+        enemy_list = list(enemies)
+        targets = assign_targets(
+            positions=[unit.position_tuple for unit in attacker_list],
+            radii=[unit.radius for unit in attacker_list],
+            ground_range=[unit.ground_range for unit in attacker_list],
+            air_range=[unit.air_range for unit in attacker_list],
+            ground_dps=[unit.ground_dps for unit in attacker_list],
+            air_dps=[unit.air_dps for unit in attacker_list],
+            enemy_positions=[unit.position_tuple for unit in enemy_list],
+            enemy_radii=[unit.radius for unit in enemy_list],
+            enemy_flying=[unit.is_flying for unit in enemy_list],
+            enemy_health=[unit.health + unit.shield for unit in enemy_list],
+            # dangerous and nearly dead first
+            enemy_priority=[
+                (self.threat_value(unit) + 1) / (unit.health + unit.shield + 1)
+                for unit in enemy_list
+            ],
+        )
+        return {
+            unit.tag: enemy_list[target]
+            for unit, target in zip(attacker_list, targets)
+            if target >= 0
+        }
+
+    def swarm_slots(
+        self, attackers: Units, targets: Dict[int, Unit]
+    ) -> Dict[int, Point2]:
+        """
+        Spread approaching melee units around the nearest enemy group.
+
+        Args:
+            attackers (Units): units being microed
+            targets (Dict[int, Unit]): focus targets, units with one are left alone
+
+        Returns:
+            Dict[int, Point2]: melee unit tag -> where to attack-move to
+        """
+        enemies = self.enemy_units
+        melee = attackers.filter(
+            lambda unit: unit.tag not in targets
+            and not unit.is_flying
+            and 0 < unit.ground_range < 1
+        )
+        if not melee or not enemies:
+            return {}
+        nearest = self.index("enemy_units", enemies).closest_to(melee.center)
+        group = np.array(
+            [
+                unit.position_tuple
+                for unit in enemies
+                if unit.distance_to(nearest) <= CLUSTER_RADIUS
+            ]
+        )
+        center = group.mean(axis=0)
+        spread = np.sqrt(((group - center) ** 2).sum(axis=1)).max()
+        swarm = [
+            unit
+            for unit in melee
+            if unit.distance_to(Point2(center)) <= FORMATION_RADIUS
+        ]
+        if not swarm:
+            return {}
+        destinations = formation_positions(
+            [unit.position_tuple for unit in swarm],
+            center,
+            spread + 1.5,
+            self.pathing.grids.pathing,
+        )
+        if destinations is None:
+            return {}
+        return {
+            unit.tag: Point2((float(x), float(y)))
+            for unit, (x, y) in zip(swarm, destinations)
+        }
 
     async def micro(self, unit_tags: List[int] = []) -> None:
         """
@@ -323,17 +1233,33 @@ class Paul(sc2.BotAI):
         """
         if not unit_tags:
             attackers = self.units.filter(
-                lambda unit: unit.tag not in self.inject_queens | self.creep_queens
+                lambda unit: self.registry.role_of(unit.tag) == ROLE_NONE
                 and unit.type_id
                 not in {UnitTypeId.OVERLORD, UnitTypeId.DRONE, UnitTypeId.LARVA}
             )
         else:
             attackers = self.units.filter(lambda unit: unit.tag in unit_tags)
+        losing = self.losing_units(attackers)
+        targets = self.focus_targets(attackers)
+        slots = self.swarm_slots(attackers, targets)
         for unit in attackers:
+            if unit.tag in losing:
+                home = self.index("townhalls", self.townhalls).closest_to(unit)
+                self.do(unit.move(home.position if home else self.start_location))
+                continue
+            if unit.tag in targets:
+                self.do(unit.attack(targets[unit.tag]))
+                continue
+            if unit.tag in slots:
+                self.do(unit.attack(slots[unit.tag]))
+                continue
             self.do(
                 unit.attack(
                     self.pathing.follow_path(
-                        unit=unit, default=self.enemy_start_locations[0].position
+                        unit=unit,
+                        default=self.enemy_start_locations[0].position,
+                        game_loop=self.state.game_loop,
+                        creep=unit.type_id == UnitTypeId.QUEEN,
                     )
                 )
             )
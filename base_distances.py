@@ -0,0 +1,270 @@
+"""
+Precompute ground distances and routes between the key points of every map.
+
+Paul saves each map's start locations, expansions and ramp tops to
+map_grids/{map_name}_points.npy during on_start. Running this file solves every pair
+of those points on the stored grid, spread over a process pool, and writes
+map_grids/{map_name}_distances.npz for PathManager to load.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from math import floor
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from grid_stack import load_grid, stored_maps
+from lazy_import import lazy_import
+
+# only the worker processes path, the bot just reads and writes the files
+sc2pathlib = lazy_import("sc2pathlib")
+
+# kinds of key point, stored in the third column of the points file
+START = 0
+EXPANSION = 1
+RAMP = 2
+
+# one PathFind per map, per worker process
+_path_finders: Dict[str, Any] = {}
+
+
+def points_file(map_name: str) -> str:
+    """Return where a map's key points are stored."""
+    return f"map_grids/{map_name}_points.npy"
+
+
+def distances_file(map_name: str) -> str:
+    """Return where a map's distance table is stored."""
+    return f"map_grids/{map_name}_distances.npz"
+
+
+def save_key_points(
+    map_name: str,
+    start_locations: Iterable[Any],
+    expansions: Iterable[Any],
+    ramps: Iterable[Any],
+) -> None:
+    """
+    Store a map's key points for the precompute step.
+
+    Args:
+        map_name (str): map name as given by game_info
+        start_locations (Iterable[Any]): every start location
+        expansions (Iterable[Any]): every expansion location
+        ramps (Iterable[Any]): top center of every ramp
+
+    Returns:
+        None
+    """
+    rows = (
+        [(p[0], p[1], START) for p in start_locations]
+        + [(p[0], p[1], EXPANSION) for p in expansions]
+        + [(p[0], p[1], RAMP) for p in ramps]
+    )
+    np.save(points_file(map_name), np.array(rows, dtype=np.float32))
+
+
+def solve_source(
+    map_name: str, source: int
+) -> Tuple[str, int, List[float], List[List[Tuple[int, int]]]]:
+    """
+    Find paths from one key point to every later key point.
+
+    Note: This runs in a worker process.
+
+    Args:
+        map_name (str): the map
+        source (int): row of the starting point in the points file
+
+    Returns:
+        Tuple: map name, source, distances and routes to points source + 1 onwards
+    """
+    if map_name not in _path_finders:
+        map_grid = load_grid(map_name).astype(int)
+        _path_finders[map_name] = sc2pathlib.PathFind(map_grid)
+    pf = _path_finders[map_name]
+    points = np.load(points_file(map_name))
+    start = (floor(points[source][0]), floor(points[source][1]))
+    first_target = source + 1
+    distances = []
+    routes = []
+    for target in points[first_target:]:
+        path, distance = pf.find_path(start, (floor(target[0]), floor(target[1])))
+        distances.append(distance if path else np.inf)
+        routes.append(path)
+    return map_name, source, distances, routes
+
+
+def build_tables(map_names: List[str], max_workers: int = None) -> None:
+    """
+    Solve every map's key point pairs in a process pool and save the tables.
+
+    Args:
+        map_names (List[str]): maps that have both a grid and a points file
+        max_workers (int): processes to use, defaults to the number of CPUs
+
+    Returns:
+        None
+    """
+    results: Dict[str, Dict[int, Tuple[List[float], List[Any]]]] = {
+        name: {} for name in map_names
+    }
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(solve_source, name, source)
+            for name in map_names
+            for source in range(len(np.load(points_file(name))))
+        ]
+        for future in futures:
+            name, source, row_distances, routes = future.result()
+            results[name][source] = (row_distances, routes)
+    for name in map_names:
+        points = np.load(points_file(name))
+        n = len(points)
+        upper: np.ndarray = np.zeros((n, n), dtype=np.float32)
+        cells: List[Tuple[int, int]] = []
+        offsets = [0]
+        for i in range(n):
+            row_distances, row_routes = results[name][i]
+            first_target = i + 1
+            upper[i][first_target:] = row_distances
+            for route in row_routes:
+                cells.extend(route)
+                offsets.append(len(cells))
+        table: np.ndarray = upper + upper.T
+        np.savez(
+            distances_file(name),
+            points=points,
+            distances=table,
+            route_cells=np.array(cells, dtype=np.int16).reshape(-1, 2),
+            route_offsets=np.array(offsets, dtype=np.int32),
+        )
+        print(f"{name}: {n} points, {len(cells)} route cells")
+
+
+class BaseDistances:
+    """Table lookups for ground distance and routes between key points."""
+
+    def __init__(self, tables: Any) -> None:
+        """
+        Wrap a loaded distances file.
+
+        Args:
+            tables (Any): the loaded npz file
+
+        Returns:
+            None
+        """
+        self.points = tables["points"][:, :2]
+        self.kinds = tables["points"][:, 2].astype(int)
+        self.distances = tables["distances"]
+        self.route_cells = tables["route_cells"]
+        self.route_offsets = tables["route_offsets"]
+
+    @classmethod
+    def load(cls, map_name: str) -> Any:
+        """
+        Load a map's table.
+
+        Args:
+            map_name (str): map name as given by game_info
+
+        Returns:
+            BaseDistances: the table, None if it hasn't been built for this map
+        """
+        if not os.path.exists(distances_file(map_name)):
+            return None
+        with np.load(distances_file(map_name)) as tables:
+            return cls(tables)
+
+    def nearest_point(self, position: Any, tolerance: float = 3) -> int:
+        """
+        Find the key point at a position.
+
+        Args:
+            position (Any): Point2 or (x, y)
+            tolerance (float): how far the position may be from the key point
+
+        Returns:
+            int: row of the key point, -1 if none is close enough
+        """
+        offsets = self.points - np.array([position[0], position[1]])
+        squared = np.einsum("ij,ij->i", offsets, offsets)
+        nearest = int(np.argmin(squared))
+        return nearest if squared[nearest] <= tolerance ** 2 else -1
+
+    def distance(self, start: Any, destination: Any) -> float:
+        """
+        Look up the ground distance between two key points.
+
+        Args:
+            start (Any): Point2 or (x, y) of a key point
+            destination (Any): Point2 or (x, y) of a key point
+
+        Returns:
+            float: ground distance, None if either position isn't a key point
+        """
+        i, j = self.nearest_point(start), self.nearest_point(destination)
+        if i < 0 or j < 0:
+            return None
+        return float(self.distances[i, j])
+
+    def route(self, start: Any, destination: Any) -> List[Tuple[int, int]]:
+        """
+        Look up the stored route between two key points.
+
+        Args:
+            start (Any): Point2 or (x, y) of a key point
+            destination (Any): Point2 or (x, y) of a key point
+
+        Returns:
+            List[Tuple[int, int]]: grid cells from start to destination, None if
+                                   either position isn't a key point
+        """
+        i, j = self.nearest_point(start), self.nearest_point(destination)
+        if i < 0 or j < 0:
+            return None
+        if i == j:
+            return []
+        low, high = min(i, j), max(i, j)
+        n = len(self.points)
+        # routes are stored for low < high only, row by row
+        k = low * n - low * (low + 1) // 2 + (high - low - 1)
+        begin, end = self.route_offsets[k], self.route_offsets[k + 1]
+        cells = self.route_cells[begin:end]
+        route = [(int(x), int(y)) for x, y in cells]
+        return route if i < j else route[::-1]
+
+    def closest(self, start: Any, candidates: Iterable[Any]) -> Any:
+        """
+        Pick the candidate key point with the shortest ground distance from start.
+
+        Args:
+            start (Any): Point2 or (x, y) of a key point
+            candidates (Iterable[Any]): key points to choose from
+
+        Returns:
+            Any: the closest reachable candidate, None if there is none
+        """
+        i = self.nearest_point(start)
+        if i < 0:
+            return None
+        best, best_distance = None, np.inf
+        for candidate in candidates:
+            j = self.nearest_point(candidate)
+            if j >= 0 and self.distances[i, j] < best_distance:
+                best, best_distance = candidate, self.distances[i, j]
+        return best
+
+
+def main() -> None:
+    """Build distance tables for every map with a stored grid and key points."""
+    map_names = [name for name in stored_maps() if os.path.exists(points_file(name))]
+    if not map_names:
+        print("No key points stored yet, play a game on the map first.")
+        return
+    build_tables(map_names)
+
+
+if __name__ == "__main__":
+    main()
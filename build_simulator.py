@@ -0,0 +1,303 @@
+"""
+Simulate the opening economy of many build order variants at once.
+
+Builds in builds/ are played the way Paul's econ mode plays them: make drones until
+supply matches the next order, wait for what it requires, then place it once it's
+affordable. Every variant is a row in the state arrays, so thousands of supply
+timings are stepped through together with NumPy and compared without the game.
+
+The model is deliberately rough: flat income per worker with a cheaper second
+worker per patch, larva from hatcheries only (no injects) and no travel time for
+drones going to build.
+"""
+import argparse
+import pickle  # nosec
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# seconds on faster per simulation step
+DEFAULT_STEP = 0.5
+DEFAULT_DURATION = 300.0
+
+# income per second on faster, workers past 16 per base mine at the lower rate
+MINERALS_PER_WORKER = 0.94
+MINERALS_PER_EXTRA_WORKER = 0.4
+GAS_PER_WORKER = 0.95
+# hatcheries make a larva every 11 seconds, up to 3
+LARVA_TIME = 11.0
+MAX_LARVA = 3
+
+# name -> minerals, gas, supply, build time, uses larva, uses a drone, supply given
+ITEMS: Dict[str, Tuple[int, int, int, float, bool, bool, int]] = {
+    "DRONE": (50, 0, 1, 12.0, True, False, 0),
+    "OVERLORD": (100, 0, 0, 18.0, True, False, 8),
+    "ZERGLING": (50, 0, 1, 17.0, True, False, 0),
+    "QUEEN": (150, 0, 2, 36.0, False, False, 0),
+    "ROACH": (75, 25, 2, 19.0, True, False, 0),
+    "HATCHERY": (300, 0, 0, 71.0, False, True, 6),
+    "EXTRACTOR": (25, 0, 0, 21.0, False, True, 0),
+    "SPAWNINGPOOL": (200, 0, 0, 46.0, False, True, 0),
+    "EVOLUTIONCHAMBER": (75, 0, 0, 25.0, False, True, 0),
+    "ROACHWARREN": (150, 0, 0, 39.0, False, True, 0),
+    "BANELINGNEST": (100, 50, 0, 43.0, False, True, 0),
+    "ZERGLINGMOVEMENTSPEED": (100, 100, 0, 79.0, False, False, 0),
+}
+
+# most eggs, buildings and research in progress at once per variant
+PENDING_SLOTS = 64
+
+
+class BuildSimulator:
+    """Step many supply-timing variants of one build through the opening."""
+
+    def __init__(self, build_order: List[Dict], supply_triggers: Any) -> None:
+        """
+        Set up the item tables for a build.
+
+        Args:
+            build_order (List[Dict]): orders as stored in builds/, each with supply,
+                                      name, quantity, category and requires
+            supply_triggers (ndarray): (variants, orders) supply to place each order
+                                       at, one row per variant
+
+        Returns:
+            None
+        """
+        self.build_order = build_order
+        self.supply_triggers = np.atleast_2d(supply_triggers).astype(np.int32)
+        self.variants, n = self.supply_triggers.shape
+        names = [order["name"] for order in build_order]
+        for name in names:
+            if name not in ITEMS:
+                raise KeyError(f"No economy data for {name}")
+        quantity = np.array([order["quantity"] for order in build_order])
+        table = np.array([ITEMS[name] for name in names], dtype=float).reshape(n, 7)
+        uses_larva = table[:, 4].astype(bool)
+        # per order: what placing it costs and what finishing it gives
+        self.minerals_cost = table[:, 0] * quantity
+        self.gas_cost = table[:, 1] * quantity
+        self.supply_cost = (table[:, 2] * quantity).astype(int)
+        self.build_time = table[:, 3]
+        self.larva_cost = np.where(uses_larva, quantity, 0)
+        self.drone_cost = table[:, 5].astype(int)
+        # completion effects, index 0 is a drone and order j is j + 1
+        self.supply_given = np.concatenate(([0], table[:, 6] * quantity)).astype(int)
+        self.adds_hatchery = np.array([False] + [name == "HATCHERY" for name in names])
+        self.adds_extractor = np.array(
+            [False] + [name == "EXTRACTOR" for name in names]
+        )
+        self.adds_drones = np.zeros(n + 1, dtype=int)
+        self.adds_drones[0] = 1
+        # requires as a (orders, orders) mask of earlier orders that must be done
+        self.requires = np.zeros((n, n), dtype=bool)
+        for j, order in enumerate(build_order):
+            for name in order["requires"]:
+                if name not in names:
+                    raise KeyError(f"{names[j]} requires {name}, which isn't built")
+                self.requires[j, names.index(name)] = True
+
+    def run(
+        self, duration: float = DEFAULT_DURATION, step: float = DEFAULT_STEP
+    ) -> Dict[str, Any]:
+        """
+        Simulate every variant from the start of the game.
+
+        Args:
+            duration (float): seconds on faster to simulate
+            step (float): seconds per step
+
+        Returns:
+            Dict[str, ndarray]: done_at (variants, orders) completion time of each
+                                order, inf if it never finished, and drones,
+                                minerals and gas per variant at the end
+        """
+        v, n = self.supply_triggers.shape
+        rows = np.arange(v)
+        minerals = np.full(v, 50.0)
+        gas = np.zeros(v)
+        drones = np.full(v, 12)
+        gas_workers = np.zeros(v, dtype=int)
+        supply_used = np.full(v, 12)
+        supply_cap = np.full(v, 14)
+        hatcheries = np.ones(v, dtype=int)
+        extractors = np.zeros(v, dtype=int)
+        larva = np.full(v, 3)
+        larva_progress = np.zeros(v)
+        next_order = np.zeros(v, dtype=int)
+        done_at = np.full((v, n), np.inf)
+        finish = np.full((v, PENDING_SLOTS), np.inf)
+        what = np.zeros((v, PENDING_SLOTS), dtype=int)
+
+        for t in np.arange(step, duration + step, step):
+            # income
+            mining = drones - gas_workers
+            saturated = np.minimum(mining, 16 * hatcheries)
+            extra = np.clip(mining - saturated, 0, 8 * hatcheries)
+            minerals += step * (
+                MINERALS_PER_WORKER * saturated + MINERALS_PER_EXTRA_WORKER * extra
+            )
+            gas += step * GAS_PER_WORKER * np.minimum(gas_workers, 3 * extractors)
+            # larva
+            growing = larva < MAX_LARVA * hatcheries
+            larva_progress += np.where(growing, step * hatcheries / LARVA_TIME, 0)
+            new_larva = np.floor(larva_progress).astype(int)
+            larva = np.minimum(larva + new_larva, MAX_LARVA * hatcheries)
+            larva_progress -= new_larva
+
+            # completions
+            completed = finish <= t
+            if completed.any():
+                counts = np.zeros((v, n + 1), dtype=int)
+                np.add.at(counts, (np.nonzero(completed)[0], what[completed]), 1)
+                drones += counts @ self.adds_drones
+                supply_cap = np.minimum(supply_cap + counts @ self.supply_given, 200)
+                hatcheries += counts[:, self.adds_hatchery].sum(axis=1)
+                new_extractors = counts[:, self.adds_extractor].sum(axis=1)
+                extractors += new_extractors
+                # three drones go to each new extractor
+                gas_workers = np.minimum(gas_workers + 3 * new_extractors, drones)
+                finished_orders = counts[:, 1:] > 0
+                done_at[finished_orders] = t
+                finish[completed] = np.inf
+
+            # what each variant does this step
+            active = next_order < n
+            j = np.minimum(next_order, n - 1)
+            trigger = self.supply_triggers[rows, j]
+            ready = ~(self.requires[j] & ~(done_at <= t)).any(axis=1)
+            place = (
+                active
+                & (supply_used == trigger)
+                & ready
+                & (minerals >= self.minerals_cost[j])
+                & (gas >= self.gas_cost[j])
+                & (larva >= self.larva_cost[j])
+                & (supply_used + self.supply_cost[j] <= supply_cap)
+            )
+            drone = (
+                active
+                & (supply_used != trigger)
+                & (larva > 0)
+                & (minerals >= ITEMS["DRONE"][0])
+                & (supply_used < supply_cap)
+            )
+
+            minerals -= np.where(place, self.minerals_cost[j], 0)
+            gas -= np.where(place, self.gas_cost[j], 0)
+            larva -= np.where(place, self.larva_cost[j], 0)
+            used_drones = np.where(place, self.drone_cost[j], 0)
+            drones -= used_drones
+            gas_workers = np.minimum(gas_workers, drones)
+            supply_used += np.where(place, self.supply_cost[j], 0) - used_drones
+            self.start(finish, what, place, t + self.build_time[j], j + 1)
+            next_order += place
+
+            minerals -= np.where(drone, ITEMS["DRONE"][0], 0)
+            larva -= drone
+            supply_used += drone
+            self.start(finish, what, drone, t + ITEMS["DRONE"][3], 0)
+
+        return {
+            "done_at": done_at,
+            "drones": drones,
+            "minerals": minerals,
+            "gas": gas,
+        }
+
+    @staticmethod
+    def start(finish: Any, what: Any, mask: Any, when: Any, item: Any) -> None:
+        """
+        Put an item in progress for the masked variants.
+
+        Args:
+            finish (ndarray): (variants, slots) completion times, inf is empty
+            what (ndarray): (variants, slots) item in each slot
+            mask (ndarray): variants starting the item
+            when (ndarray): completion time per variant
+            item (Any): item index per variant or one for all
+
+        Returns:
+            None
+        """
+        starting = np.flatnonzero(mask)
+        if not len(starting):
+            return
+        slots = np.argmax(np.isinf(finish[starting]), axis=1)
+        finish[starting, slots] = np.broadcast_to(when, mask.shape)[starting]
+        what[starting, slots] = np.broadcast_to(item, mask.shape)[starting]
+
+    def milestone(self, done_at: Any, name: str, occurrence: int = 1) -> Any:
+        """
+        Get when the nth order of a kind finished in each variant.
+
+        Args:
+            done_at (ndarray): done_at from run
+            name (str): order name, e.g. "HATCHERY"
+            occurrence (int): which of the orders with that name, from 1
+
+        Returns:
+            ndarray: completion time per variant, inf if it never finished
+        """
+        columns = [
+            j for j, order in enumerate(self.build_order) if order["name"] == name
+        ]
+        if len(columns) < occurrence:
+            return np.full(self.variants, np.inf)
+        return done_at[:, columns[occurrence - 1]]
+
+
+def supply_variants(
+    build_order: List[Dict], count: int, spread: int = 2, seed: int = 0
+) -> Any:
+    """
+    Make random supply timings around a build's own.
+
+    Args:
+        build_order (List[Dict]): the build
+        count (int): number of variants, the first is the build unchanged
+        spread (int): most supply each trigger is moved by
+        seed (int): random seed
+
+    Returns:
+        ndarray: (count, orders) supply triggers
+    """
+    base = np.array([order["supply"] for order in build_order], dtype=np.int32)
+    rng = np.random.default_rng(seed)
+    triggers = base + rng.integers(-spread, spread + 1, size=(count, len(base)))
+    triggers[0] = base
+    return np.maximum(triggers, 12)
+
+
+def main() -> None:
+    """Rank supply variants of a stored build by when a milestone finishes."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("build", nargs="?", default="builds/1312.pickle")
+    parser.add_argument("--variants", type=int, default=5000)
+    parser.add_argument("--spread", type=int, default=2)
+    parser.add_argument("--rank", default="HATCHERY", help="order name to rank by")
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+    with open(args.build, "rb") as f:
+        build_order = pickle.load(f)  # nosec
+    triggers = supply_variants(build_order, args.variants, args.spread)
+    simulator = BuildSimulator(build_order, triggers)
+    results = simulator.run()
+    done_at = results["done_at"]
+    ranked = simulator.milestone(done_at, args.rank)
+    # variants that finish the whole build first, ties go to more drones
+    unfinished = np.isinf(done_at).any(axis=1)
+    best = np.lexsort((-results["drones"], ranked, unfinished))
+    names = [order["name"] for order in build_order]
+    print(f"{args.rank} at {ranked[0]:.0f}s as written, best of {len(ranked)}:")
+    top = args.top
+    for row in best[:top]:
+        timings = ", ".join(
+            f"{name}@{supply}:{time:.0f}s"
+            for name, supply, time in zip(names, triggers[row], done_at[row])
+        )
+        print(f"  {ranked[row]:.0f}s, {results['drones'][row]} drones | {timings}")
+
+
+if __name__ == "__main__":
+    main()
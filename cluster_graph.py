@@ -0,0 +1,312 @@
+"""Coarse cluster graph over the pathing grid for long routes."""
+import heapq
+from math import floor, sqrt
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+
+from lazy_import import lazy_import
+
+# scipy.sparse is slow to import and only needed once the game has started
+sparse = lazy_import("scipy.sparse")
+csgraph = lazy_import("scipy.sparse.csgraph")
+
+Cell = Tuple[int, int]
+Cluster = Tuple[int, int]
+Border = Tuple[Cluster, Cluster]
+
+# cluster edge length in cells
+CLUSTER_SIZE = 16
+# entrances at least this wide get a node at each end instead of one in the middle
+WIDE_ENTRANCE = 6
+SQRT2 = sqrt(2)
+
+
+def octile(a: Cell, b: Cell) -> float:
+    """Return the 8-connected grid distance between two cells."""
+    dx, dy = abs(a[0] - b[0]), abs(a[1] - b[1])
+    return max(dx, dy) + (SQRT2 - 1) * min(dx, dy)
+
+
+class ClusterGraph:
+    """
+    Entrances between fixed-size clusters and the distances between them.
+
+    The grid is indexed [x][y] like map_grid. Plan a coarse route with
+    coarse_route, then path each segment at full resolution as it's needed.
+    """
+
+    def __init__(self, grid: Any, cluster_size: int = CLUSTER_SIZE) -> None:
+        """
+        Build the graph for the whole grid.
+
+        Args:
+            grid (ndarray): pathing grid, nonzero is pathable
+            cluster_size (int): cluster edge length in cells
+
+        Returns:
+            None
+        """
+        self.grid = np.asarray(grid) != 0
+        self.size = cluster_size
+        self.width, self.height = self.grid.shape
+        self.clusters_x = -(-self.width // cluster_size)
+        self.clusters_y = -(-self.height // cluster_size)
+        # entrance cell -> number of borders using it, per cluster
+        self.cluster_nodes: Dict[Cluster, Dict[Cell, int]] = {}
+        # entrance pairs on each border
+        self.border_pairs: Dict[Border, List[Tuple[Cell, Cell]]] = {}
+        # edges between clusters and within a cluster
+        self.inter: Dict[Cell, Dict[Cell, float]] = {}
+        self.intra: Dict[Cluster, Dict[Cell, Dict[Cell, float]]] = {}
+        self.rebuild(
+            {(cx, cy) for cx in range(self.clusters_x) for cy in range(self.clusters_y)}
+        )
+
+    def cluster_of(self, cell: Cell) -> Cluster:
+        """Return the cluster a cell is in."""
+        return cell[0] // self.size, cell[1] // self.size
+
+    def bounds(self, cluster: Cluster) -> Tuple[int, int, int, int]:
+        """Return x0, x1, y0, y1 of a cluster, end exclusive."""
+        x0, y0 = cluster[0] * self.size, cluster[1] * self.size
+        x1, y1 = min(x0 + self.size, self.width), min(y0 + self.size, self.height)
+        return x0, x1, y0, y1
+
+    def borders_of(self, cluster: Cluster) -> List[Border]:
+        """Return the borders between a cluster and each of its neighbours."""
+        cx, cy = cluster
+        borders = []
+        if cx + 1 < self.clusters_x:
+            borders.append(((cx, cy), (cx + 1, cy)))
+        if cy + 1 < self.clusters_y:
+            borders.append(((cx, cy), (cx, cy + 1)))
+        if cx > 0:
+            borders.append(((cx - 1, cy), (cx, cy)))
+        if cy > 0:
+            borders.append(((cx, cy - 1), (cx, cy)))
+        return borders
+
+    def find_entrances(self, border: Border) -> List[Tuple[Cell, Cell]]:
+        """
+        Find the entrance cell pairs across a border.
+
+        Args:
+            border (Border): (lower cluster, higher cluster)
+
+        Returns:
+            List[Tuple[Cell, Cell]]: (cell in lower, cell in higher) per entrance
+        """
+        low, high = border
+        x0, x1, y0, y1 = self.bounds(low)
+        if high[0] > low[0]:  # neighbours along x
+            line = np.arange(y0, y1)
+            open_cells = self.grid[x1 - 1, y0:y1] & self.grid[x1, y0:y1]
+
+            def pair(i: int) -> Tuple[Cell, Cell]:
+                return (x1 - 1, int(i)), (x1, int(i))
+
+        else:
+            line = np.arange(x0, x1)
+            open_cells = self.grid[x0:x1, y1 - 1] & self.grid[x0:x1, y1]
+
+            def pair(i: int) -> Tuple[Cell, Cell]:
+                return (int(i), y1 - 1), (int(i), y1)
+
+        # split into runs of open cells
+        padded = np.concatenate(([False], open_cells, [False])).astype(np.int8)
+        changes = np.flatnonzero(np.diff(padded))
+        pairs = []
+        for start, end in zip(changes[::2], changes[1::2]):
+            if end - start >= WIDE_ENTRANCE:
+                pairs.append(pair(line[start]))
+                pairs.append(pair(line[end - 1]))
+            else:
+                pairs.append(pair(line[(start + end - 1) // 2]))
+        return pairs
+
+    def local_distances(
+        self, cluster: Cluster, sources: List[Cell]
+    ) -> Tuple[Any, Any]:
+        """
+        Run Dijkstra inside one cluster from several cells at once.
+
+        Args:
+            cluster (Cluster): the cluster to search
+            sources (List[Cell]): pathable cells in the cluster
+
+        Returns:
+            Tuple[ndarray, Callable]: (len(sources), cells) distances and a function
+                                      that maps a cell to its column
+        """
+        x0, x1, y0, y1 = self.bounds(cluster)
+        sub = self.grid[x0:x1, y0:y1]
+        w, h = sub.shape
+        ids = np.arange(w * h).reshape(w, h)
+        rows, cols, costs = [], [], []
+        for dx, dy in ((1, 0), (0, 1), (1, 1), (1, -1)):
+            a = (slice(0, w - dx), slice(max(0, -dy), h - max(0, dy)))
+            b = (slice(dx, w), slice(max(0, dy), h - max(0, -dy)))
+            ok = sub[a] & sub[b]
+            if dx and dy:
+                # no corner cutting
+                ok &= sub[slice(0, w - 1), b[1]] & sub[slice(1, w), a[1]]
+            rows.append(ids[a][ok])
+            cols.append(ids[b][ok])
+            costs.append(np.full(int(ok.sum()), SQRT2 if dx and dy else 1.0))
+        rows_all, cols_all = np.concatenate(rows), np.concatenate(cols)
+        graph = sparse.coo_matrix(
+            (np.concatenate(costs), (rows_all, cols_all)), shape=(w * h, w * h)
+        ).tocsr()
+        source_ids = [(x - x0) * h + (y - y0) for x, y in sources]
+        distances = csgraph.dijkstra(graph, directed=False, indices=source_ids)
+
+        def column(cell: Cell) -> int:
+            return int((cell[0] - x0) * h + (cell[1] - y0))
+
+        return np.atleast_2d(distances), column
+
+    def rebuild(self, clusters: Set[Cluster]) -> None:
+        """
+        Recompute entrances on every border of the clusters and the affected edges.
+
+        Args:
+            clusters (Set[Cluster]): clusters whose cells changed
+
+        Returns:
+            None
+        """
+        borders = {
+            border for cluster in clusters for border in self.borders_of(cluster)
+        }
+        touched = set(clusters)
+        for border in borders:
+            for a, b in self.border_pairs.pop(border, []):
+                for cell, other, cluster in ((a, b, border[0]), (b, a, border[1])):
+                    self.inter.get(cell, {}).pop(other, None)
+                    if not self.inter.get(cell, True):
+                        del self.inter[cell]
+                    nodes = self.cluster_nodes[cluster]
+                    nodes[cell] -= 1
+                    if not nodes[cell]:
+                        del nodes[cell]
+            pairs = self.find_entrances(border)
+            self.border_pairs[border] = pairs
+            for a, b in pairs:
+                for cell, other, cluster in ((a, b, border[0]), (b, a, border[1])):
+                    self.inter.setdefault(cell, {})[other] = 1.0
+                    nodes = self.cluster_nodes.setdefault(cluster, {})
+                    nodes[cell] = nodes.get(cell, 0) + 1
+            touched.update(border)
+        for cluster in touched:
+            entrances: List[Cell] = list(self.cluster_nodes.get(cluster, {}))
+            edges: Dict[Cell, Dict[Cell, float]] = {node: {} for node in entrances}
+            if len(entrances) > 1:
+                distances, column = self.local_distances(cluster, entrances)
+                node_columns = [column(node) for node in entrances]
+                for i, node in enumerate(entrances):
+                    for j, other in enumerate(entrances):
+                        d = distances[i, node_columns[j]]
+                        if i != j and np.isfinite(d):
+                            edges[node][other] = float(d)
+            self.intra[cluster] = edges
+
+    def update_region(self, grid: Any, x0: int, y0: int, x1: int, y1: int) -> None:
+        """
+        Take a changed grid and rebuild only the clusters in the changed region.
+
+        Args:
+            grid (ndarray): the new pathing grid
+            x0 (int): first changed x
+            y0 (int): first changed y
+            x1 (int): last changed x, inclusive
+            y1 (int): last changed y, inclusive
+
+        Returns:
+            None
+        """
+        self.grid = np.asarray(grid) != 0
+        clusters = {
+            (cx, cy)
+            for cx in range(x0 // self.size, x1 // self.size + 1)
+            for cy in range(y0 // self.size, y1 // self.size + 1)
+        }
+        self.rebuild(clusters)
+
+    def connect(self, cell: Cell) -> Dict[Cell, float]:
+        """
+        Find the distance from a cell to each entrance of its cluster.
+
+        Args:
+            cell (Cell): a pathable cell
+
+        Returns:
+            Dict[Cell, float]: reachable entrance -> distance
+        """
+        cluster = self.cluster_of(cell)
+        nodes = list(self.cluster_nodes.get(cluster, {}))
+        if not nodes:
+            return {}
+        distances, column = self.local_distances(cluster, [cell])
+        found = {node: float(distances[0, column(node)]) for node in nodes}
+        return {node: d for node, d in found.items() if np.isfinite(d)}
+
+    def neighbours(self, cell: Cell) -> Iterable[Tuple[Cell, float]]:
+        """Return the entrances reachable from an entrance in one edge."""
+        yield from self.intra[self.cluster_of(cell)].get(cell, {}).items()
+        yield from self.inter.get(cell, {}).items()
+
+    def coarse_route(self, start: Any, goal: Any) -> List[Cell]:
+        """
+        Plan a route through cluster entrances.
+
+        Only reads the graph, so it's safe to call from a worker thread while the
+        main thread isn't rebuilding.
+
+        Args:
+            start (Any): Point2 or (x, y)
+            goal (Any): Point2 or (x, y)
+
+        Returns:
+            List[Cell]: waypoints after start, ending with goal. Just [goal] if both
+                        are in the same cluster and empty if no route was found
+        """
+        s = (floor(start[0]), floor(start[1]))
+        g = (floor(goal[0]), floor(goal[1]))
+        if self.cluster_of(s) == self.cluster_of(g):
+            return [g]
+        if not (self.grid[s] and self.grid[g]):
+            return []
+        start_edges = self.connect(s)
+        goal_edges = self.connect(g)
+        if not start_edges or not goal_edges:
+            return []
+        best: Dict[Cell, float] = {s: 0.0}
+        came_from: Dict[Cell, Cell] = {}
+        queue: List[Tuple[float, float, Cell]] = [(octile(s, g), 0.0, s)]
+        while queue:
+            _, cost, node = heapq.heappop(queue)
+            if node == g:
+                break
+            if cost > best.get(node, np.inf):
+                continue
+            if node == s:
+                edges: List[Tuple[Cell, float]] = list(start_edges.items())
+                edges += list(self.inter.get(s, {}).items())
+            else:
+                edges = list(self.neighbours(node))
+                if node in goal_edges:
+                    edges.append((g, goal_edges[node]))
+            for other, step in edges:
+                new_cost = cost + step
+                if new_cost < best.get(other, np.inf):
+                    best[other] = new_cost
+                    came_from[other] = node
+                    estimate = new_cost + octile(other, g)
+                    heapq.heappush(queue, (estimate, new_cost, other))
+        if g not in came_from:
+            return []
+        route = [g]
+        while came_from[route[-1]] != s:
+            route.append(came_from[route[-1]])
+        return route[::-1]
@@ -0,0 +1,182 @@
+"""Predict fights with Lanchester's square law, many candidate fights at once."""
+from typing import Any, Dict, Iterable, Tuple
+
+import numpy as np
+from sc2.unit import Unit
+
+# armor is taken off every attack, this is a typical number of attacks per second
+ATTACKS_PER_SECOND = 1.4
+# armor never takes away more than this share of a unit's damage
+MAX_ARMOR_REDUCTION = 0.75
+
+
+def army_arrays(units: Iterable[Unit]) -> Dict[str, Any]:
+    """
+    Collect the stats the estimator needs from a group of units.
+
+    Args:
+        units (Iterable[Unit]): our units or visible enemies
+
+    Returns:
+        Dict[str, ndarray]: one (n,) column per stat: ground_dps, air_dps, health
+                            (health plus shield), armor, ground_range, air_range,
+                            speed and flying
+    """
+    rows = [
+        (
+            unit.ground_dps,
+            unit.air_dps,
+            unit.health + unit.shield,
+            unit.armor,
+            unit.ground_range,
+            unit.air_range,
+            unit.movement_speed,
+            unit.is_flying,
+        )
+        for unit in units
+    ]
+    table = np.array(rows, dtype=np.float32).reshape(-1, 8)
+    names = (
+        "ground_dps",
+        "air_dps",
+        "health",
+        "armor",
+        "ground_range",
+        "air_range",
+        "speed",
+        "flying",
+    )
+    columns: Dict[str, Any] = {name: table[:, i] for i, name in enumerate(names)}
+    columns["flying"] = columns["flying"] > 0
+    return columns
+
+
+def side_stats(
+    attackers: Dict[str, Any], members: Any, targets: Dict[str, Any], opponents: Any
+) -> Tuple[Any, Any, Any, Any]:
+    """
+    Total one side's damage, health, range and speed in every candidate fight.
+
+    Args:
+        attackers (Dict[str, ndarray]): army_arrays of the side
+        members (ndarray): (k, n) bool, which of the side's units are in each fight
+        targets (Dict[str, ndarray]): army_arrays of the other side
+        opponents (ndarray): (k, m) bool, the other side's units in each fight
+
+    Returns:
+        Tuple[ndarray, ...]: (k,) damage per second against the other side's mix of
+                             air and ground after armor, health, damage weighted
+                             range and health weighted speed
+    """
+    members = members.astype(np.float32)
+    opponents = opponents.astype(np.float32)
+    target_health = opponents @ targets["health"]
+    air_share = np.divide(
+        opponents @ (targets["health"] * targets["flying"]),
+        target_health,
+        out=np.zeros(len(opponents), dtype=np.float32),
+        where=target_health > 0,
+    )
+    target_armor = np.divide(
+        opponents @ (targets["armor"] * targets["health"]),
+        target_health,
+        out=np.zeros(len(opponents), dtype=np.float32),
+        where=target_health > 0,
+    )
+    ground_dps = members @ attackers["ground_dps"]
+    air_dps = members @ attackers["air_dps"]
+    raw_dps = ground_dps * (1 - air_share) + air_dps * air_share
+    # armor per attack, over every attacking unit
+    attacking = members @ (
+        (attackers["ground_dps"] > 0) | (attackers["air_dps"] > 0)
+    ).astype(np.float32)
+    armor_loss = np.minimum(
+        ATTACKS_PER_SECOND * target_armor * attacking, MAX_ARMOR_REDUCTION * raw_dps
+    )
+    dps = raw_dps - armor_loss
+    health = members @ attackers["health"]
+    ground_reach = members @ (attackers["ground_range"] * attackers["ground_dps"])
+    air_reach = members @ (attackers["air_range"] * attackers["air_dps"])
+    weighted_range = ground_reach * (1 - air_share) + air_reach * air_share
+    reach = np.divide(
+        weighted_range,
+        raw_dps,
+        out=np.zeros(len(members), dtype=np.float32),
+        where=raw_dps > 0,
+    )
+    speed = np.divide(
+        members @ (attackers["speed"] * attackers["health"]),
+        health,
+        out=np.zeros(len(members), dtype=np.float32),
+        where=health > 0,
+    )
+    return dps, health, reach, speed
+
+
+def estimate(
+    ours: Dict[str, Any],
+    our_members: Any,
+    theirs: Dict[str, Any],
+    their_members: Any,
+) -> Tuple[Any, Any]:
+    """
+    Predict how much of each side survives every candidate fight.
+
+    The side with more range gets free damage in while the other closes the gap,
+    then the square law decides: strength is total damage per second times total
+    health, and the winner keeps sqrt(1 - loser strength / winner strength) of its
+    health.
+
+    Args:
+        ours (Dict[str, ndarray]): army_arrays of our units
+        our_members (ndarray): (k, n) bool, our units in each candidate fight
+        theirs (Dict[str, ndarray]): army_arrays of the enemy units
+        their_members (ndarray): (k, m) bool, enemy units in each candidate fight
+
+    Returns:
+        Tuple[ndarray, ndarray]: (k,) share of our health and of theirs left at the
+                                 end, one of them is 0 unless neither side can fight
+    """
+    our_members = np.atleast_2d(our_members)
+    their_members = np.atleast_2d(their_members)
+    our_dps, our_health, our_reach, our_speed = side_stats(
+        ours, our_members, theirs, their_members
+    )
+    their_dps, their_health, their_reach, their_speed = side_stats(
+        theirs, their_members, ours, our_members
+    )
+    # the outranged side walks the difference under fire
+    gap = our_reach - their_reach
+    their_walk = np.divide(
+        np.maximum(gap, 0), their_speed, out=np.zeros_like(gap), where=their_speed > 0
+    )
+    our_walk = np.divide(
+        np.maximum(-gap, 0), our_speed, out=np.zeros_like(gap), where=our_speed > 0
+    )
+    our_left = np.maximum(our_health - their_dps * our_walk, 0)
+    their_left = np.maximum(their_health - our_dps * their_walk, 0)
+    our_strength = our_dps * our_left
+    their_strength = their_dps * their_left
+    we_win = our_strength > their_strength
+    ratio = np.divide(
+        np.minimum(our_strength, their_strength),
+        np.maximum(our_strength, their_strength),
+        out=np.ones_like(our_strength),
+        where=np.maximum(our_strength, their_strength) > 0,
+    )
+    survivors = np.sqrt(1 - ratio)
+    our_share = np.divide(
+        our_left, our_health, out=np.zeros_like(our_left), where=our_health > 0
+    )
+    their_share = np.divide(
+        their_left, their_health, out=np.zeros_like(their_left), where=their_health > 0
+    )
+    # nobody can hurt anybody: both keep what they have
+    stalemate = (our_dps <= 0) & (their_dps <= 0)
+    ours_kept = np.where(
+        stalemate, our_share, np.where(we_win, our_share * survivors, 0)
+    )
+    theirs_kept = np.where(
+        stalemate, their_share, np.where(we_win, 0, their_share * survivors)
+    )
+    return ours_kept, theirs_kept
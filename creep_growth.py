@@ -0,0 +1,138 @@
+"""
+Predict where creep will be once it has finished spreading.
+
+Creep grows out from a hatchery or tumor over several seconds, so the observed
+creep lags behind what's already coming. Every source is kept as a patch of the
+game loop creep reaches each cell, merged into one arrival grid with a minimum.
+Sources are only added or removed when tumors and hatcheries appear, are ordered
+or die, so a frame costs nothing, and a prediction is one comparison.
+"""
+from typing import Any, Dict, Hashable, Tuple
+
+import numpy as np
+from sc2.ids.unit_typeid import UnitTypeId
+
+# full creep radius by source
+CREEP_RADIUS = {
+    UnitTypeId.HATCHERY: 12,
+    UnitTypeId.LAIR: 12,
+    UnitTypeId.HIVE: 12,
+    UnitTypeId.CREEPTUMORBURROWED: 10,
+}
+# cells creep spreads outward per game loop, about one a second at faster speed
+CREEP_GROWTH = 1 / 22.4
+# game loops from ordering a spread to the new tumor making creep
+SPREAD_LOOPS = 246
+NEVER = np.float32(np.inf)
+
+# (x, y, radius, game loop growth starts)
+Source = Tuple[float, float, int, int]
+
+
+def arrival_patch(x: float, y: float, radius: int, start: int) -> Tuple[Any, Any]:
+    """
+    Work out when creep from one source reaches each cell around it.
+
+    Args:
+        x (float): source x
+        y (float): source y
+        radius (int): full creep radius
+        start (int): game loop the creep starts growing
+
+    Returns:
+        Tuple[Any, ndarray]: (x0, y0) of the patch's lower left cell and the
+                             float32 arrival loop per cell, NEVER out of reach
+    """
+    x0, y0 = int(x) - radius, int(y) - radius
+    cells = np.arange(2 * radius + 1)
+    dx = x0 + cells + 0.5 - x
+    dy = y0 + cells + 0.5 - y
+    distance = np.sqrt(dx[:, None] ** 2 + dy[None, :] ** 2)
+    patch = (start + distance / CREEP_GROWTH).astype(np.float32)
+    patch[distance > radius] = NEVER
+    return (x0, y0), patch
+
+
+class CreepGrowth:
+    """Arrival loop of creep per cell from every known and ordered source."""
+
+    def __init__(self, shape: Tuple[int, int]) -> None:
+        """
+        Start with no sources.
+
+        Args:
+            shape (Tuple[int, int]): map size in cells, (width, height)
+
+        Returns:
+            None
+        """
+        self.arrival = np.full(shape, NEVER, dtype=np.float32)
+        # key -> source, and the game loop an ordered source is dropped if the
+        # tumor hasn't shown up by then
+        self.sources: Dict[Hashable, Source] = {}
+        self.expires: Dict[Hashable, int] = {}
+
+    def add(
+        self, key: Hashable, position: Any, radius: int, start: int, expires: int = 0
+    ) -> None:
+        """
+        Add a creep source.
+
+        Args:
+            key (Hashable): unit tag, or (kind, tag) for one that's only ordered
+            position (Any): (x, y) of the source
+            radius (int): full creep radius, see CREEP_RADIUS
+            start (int): game loop the creep starts growing
+            expires (int): game loop to drop it, 0 to keep it until forgotten
+
+        Returns:
+            None
+        """
+        if key in self.sources:
+            return
+        self.sources[key] = (position[0], position[1], radius, start)
+        if expires:
+            self.expires[key] = expires
+        self.merge(self.sources[key])
+
+    def forget(self, key: Hashable) -> None:
+        """Drop a source, e.g. a dead tumor, and rebuild the arrival grid."""
+        if self.sources.pop(key, None) is None:
+            return
+        self.expires.pop(key, None)
+        self.arrival.fill(NEVER)
+        for source in self.sources.values():
+            self.merge(source)
+
+    def merge(self, source: Source) -> None:
+        """Lower the arrival grid to one source's arrival loops."""
+        (x0, y0), patch = arrival_patch(*source)
+        width, height = self.arrival.shape
+        # clip the patch to the map
+        px0, py0 = max(-x0, 0), max(-y0, 0)
+        px1 = min(patch.shape[0], width - x0)
+        py1 = min(patch.shape[1], height - y0)
+        if px0 >= px1 or py0 >= py1:
+            return
+        x1, y1 = x0 + px1, y0 + py1
+        x0, y0 = x0 + px0, y0 + py0
+        view = self.arrival[x0:x1, y0:y1]
+        np.minimum(view, patch[px0:px1, py0:py1], out=view)
+
+    def expire(self, game_loop: int) -> None:
+        """Drop ordered sources whose tumor never showed up."""
+        for key in [k for k, loop in self.expires.items() if loop <= game_loop]:
+            self.forget(key)
+
+    def coverage(self, creep: Any, game_loop: int) -> Any:
+        """
+        Predict which cells will have creep.
+
+        Args:
+            creep (ndarray): bool creep grid observed now, [x][y]
+            game_loop (int): the game loop to predict for
+
+        Returns:
+            ndarray: new bool grid of cells with creep by then
+        """
+        return np.logical_or(creep, self.arrival <= game_loop)
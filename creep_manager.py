@@ -1,17 +1,72 @@
 """Spread creep."""
 from math import floor
-from typing import Any, Set
+from typing import Any, List, Set, Tuple
 
-import numpy as np  # noqa F401
+import numpy as np
 from sc2.bot_ai import BotAI
 from sc2.game_data import GameData
 from sc2.game_info import GameInfo  # , Ramp
 from sc2.game_state import GameState
 from sc2.position import Point2
-from sc2.unit import Unit
 
-from path_manager import PathManager
-from sc2pathlib import PathFind
+# offsets from a tumor to where it can spread
+RING = np.array(
+    [
+        (i, j)
+        for i in range(-10, 11)
+        for j in range(-10, 11)
+        if 81 <= i ** 2 + j ** 2 <= 105
+    ]
+)
+# how far sideways a new tumor's creep reaches, by rows away from it
+REACH = (10, 10, 10, 9, 9, 8, 8, 7, 6, 4, 2)
+# offsets from a new tumor to the cells its creep covers
+FOOTPRINT = np.array(
+    [(i, j) for j in range(-10, 11) for i in range(-REACH[abs(j)], REACH[abs(j)] + 1)]
+)
+# fewer new cells than this and the tumor spreads along the path to the enemy
+MIN_TILES = 75
+
+
+def candidate_cells(tumor_position: Point2, spreadable: Any) -> Any:
+    """
+    List the cells a tumor could spread to.
+
+    Args:
+        tumor_position (Point2): the tumor
+        spreadable (ndarray): bool mask of pathable cells with creep, [x][y]
+
+    Returns:
+        ndarray: (n, 2) cells, the ones find_position scores
+    """
+    cells = RING + (floor(tumor_position[0]), floor(tumor_position[1]))
+    inside = (
+        (cells >= 0).all(axis=1)
+        & (cells[:, 0] < spreadable.shape[0])
+        & (cells[:, 1] < spreadable.shape[1])
+    )
+    cells = cells[inside]
+    return cells[spreadable[cells[:, 0], cells[:, 1]]]
+
+
+def covered_tiles(cells: Any, uncovered: Any) -> Any:
+    """
+    Count the uncovered cells new tumors would put creep on.
+
+    Args:
+        cells (ndarray): (n, 2) cells the tumors would be at
+        uncovered (ndarray): bool mask of pathable cells without creep, [x][y]
+
+    Returns:
+        ndarray: (n,) int count per tumor, cells off the map count as covered
+    """
+    # (n, len(FOOTPRINT), 2) cells under each tumor's creep
+    footprints = cells[:, None, :] + FOOTPRINT
+    xs, ys = footprints[..., 0], footprints[..., 1]
+    width, height = uncovered.shape
+    inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    tiles = uncovered[np.clip(xs, 0, width - 1), np.clip(ys, 0, height - 1)]
+    return (tiles & inside).sum(axis=1)
 
 
 class Creeper:
@@ -40,91 +95,72 @@ class Creeper:
             client=None, player_id=1, game_info=game_info, game_data=game_data
         )
         self.bot._prepare_step(state=game_state, proto_game_info=raw_game_info)
-        self.pathing = PathManager(raw_game_data, raw_game_info, raw_observation)
-        self.pf = PathFind(self.pathing.map_grid)
 
-    def check_tumor_position(
-        self, possible_position: Point2, combined_grid: Any
-    ) -> int:
+    def check_tumor_position(self, possible_position: Point2, uncovered: Any) -> int:
         """
         Calculate the number of tiles the tumor position would cover.
 
         Arg:
             possible_position (Point2): the point being checked.
-            combined_grid (Any): ndarray that's the pathfinding lib's path map and the
-                                 creep map added together
+            uncovered (Any): bool ndarray of pathable cells without creep, [x][y]
 
         Returns:
             int: the number of tiles that would be covered.
         """
-        x, y = floor(possible_position[0]), floor(possible_position[1])
-        future_tiles = 0
-        for i in range(-10, 11):
-            for j in range(-10, 11):
-                if 8 <= abs(j) <= 10:
-                    if abs(i) <= 6 - 2 * (abs(j) - 8):
-                        future_tiles += combined_grid[Point2((x + i, y + j))] % 2
-                elif abs(j) == 7:
-                    if abs(i) <= 7:
-                        future_tiles += combined_grid[Point2((x + i, y + j))] % 2
-                elif 3 <= abs(j) <= 6:
-                    if abs(i) <= 9 - floor(abs(j) / 5):
-                        future_tiles += combined_grid[Point2((x + i, y + j))] % 2
-                else:
-                    if combined_grid[Point2((x + i, y + j))] == 1:
-                        future_tiles += 1
-        return future_tiles
-
-    async def find_position(
+        cell = np.array([[floor(possible_position[0]), floor(possible_position[1])]])
+        return int(covered_tiles(cell, uncovered)[0])
+
+    def find_position(
         self,
-        tumor: Unit,
+        tumor_position: Point2,
         tumor_positions: Set[Point2],
-        creep_grid: Any,
-        pathable_map: Any,
+        spreadable: Any,
+        uncovered: Any,
+        path_to_e_base: List[Tuple[int, int]],
     ) -> Point2:
         """
         Find the location to spread the tumor to.
 
+        Note: This is run in a worker thread, so it only reads its arguments. Every
+        candidate is scored in one NumPy pass, which keeps the GIL free for the
+        game thread.
+
         Args:
-            tumor (Unit): the creep tumor ready to be spread
+            tumor_position (Point2): position of the creep tumor ready to be spread
             tumor_positions (Set[Point2]): list of existing tumor locations
-            creep_grid (ndarray): the creep grid from the main bot
-            pathable_map (ndarray): the pathfinding lib's pathable map
+            spreadable (ndarray): bool mask of pathable cells with creep, [x][y]
+            uncovered (ndarray): bool mask of pathable cells that won't have creep
+                                 by the time the new tumor is up, [x][y]
+            path_to_e_base (List[Tuple[int, int]]): path from the tumor toward the
+                                                    enemy base, from the path service
 
         Returns:
             Point2: where to spread the tumor.
         """
-        path_creep_map = creep_grid + pathable_map
-        tposx, tposy = tumor.position.x, tumor.position.y
+        tposx, tposy = tumor_position.x, tumor_position.y
+        cells = candidate_cells(tumor_position, spreadable)
+        offsets = cells - (floor(tposx), floor(tposy))
+        free = np.array(
+            [Point2((tposx + i, tposy + j)) not in tumor_positions for i, j in offsets],
+            dtype=bool,
+        )
+        cells, offsets = cells[free], offsets[free]
         max_tiles = 0
         location = None
-        for i in range(-10, 11):
-            for j in range(-10, 11):
-                if 81 <= i ** 2 + j ** 2 <= 105:
-                    pos = Point2((tposx + i, tposy + j))
-                    if pos not in tumor_positions:
-                        if path_creep_map[floor(pos[0])][floor(pos[1])] != 2:
-                            continue
-                        tiles = self.check_tumor_position((pos), path_creep_map)
-                        if tiles > max_tiles:
-                            max_tiles = tiles
-                            location = pos
-        if max_tiles < 75:
-            floored_unit_pos = Point2((floor(tposx), floor(tposy)))
-            floored_e_base = Point2(
-                (
-                    floor(self.bot.enemy_start_locations[0].position.x),
-                    floor(self.bot.enemy_start_locations[0].position.y),
-                )
-            )
-            path_to_e_base = self.pf.find_path(floored_unit_pos, floored_e_base)[0]
-            if path_to_e_base:
-                for k in range(9, 5, -1):
-                    pos = path_to_e_base[k]
-                    if path_creep_map[pos[0]][pos[1]] == 2:
-                        location = Point2(pos)
-                        break
+        if len(cells):
+            tiles = covered_tiles(cells, uncovered)
+            best = int(np.argmax(tiles))
+            if tiles[best] > 0:
+                max_tiles = int(tiles[best])
+                i, j = offsets[best]
+                location = Point2((tposx + int(i), tposy + int(j)))
+        if max_tiles < MIN_TILES and path_to_e_base:
+            # the 10th to 7th cell along the path, as many of them as it has
+            for pos in path_to_e_base[9:5:-1]:
+                if spreadable[pos[0], pos[1]]:
+                    location = Point2(pos)
+                    break
         if location:
             return location
         else:
-            return tumor.position
+            return tumor_position
@@ -1,8 +1,11 @@
 """Draw the grids stored to check accuracy."""
 import numpy as np
 
+from grid_stack import load_grid
+
 NAME = "Triton LE"
-map_grid = np.load(f"map_grids/{NAME}_grid.npy").astype(int)
+# grids are stored [x][y], rotate so the drawing has north at the top
+map_grid = np.rot90(load_grid(NAME).astype(int))
 with open(f"drawn_grids/{NAME}_drawn.txt", "w") as f:
     for i in range(map_grid.shape[0]):
         for j in range(map_grid.shape[1]):
@@ -0,0 +1,176 @@
+"""Remember enemy units after they leave vision."""
+from typing import Callable, Dict, Iterable, List
+
+import numpy as np
+from sc2.unit import Unit
+
+# 30 seconds on faster
+DEFAULT_MAX_AGE = 672
+
+
+class EnemyMemory:
+    """Last-seen position, type and time per enemy tag, stored in arrays."""
+
+    def __init__(
+        self,
+        threat_value: Callable[[Unit], float],
+        max_age: int = DEFAULT_MAX_AGE,
+        capacity: int = 256,
+    ) -> None:
+        """
+        Set up the columns.
+
+        Args:
+            threat_value (Callable[[Unit], float]): how dangerous an enemy unit is
+            max_age (int): game loops before an unseen unit is forgotten, structures
+                           are kept until they die
+            capacity (int): starting number of slots, doubled when full
+
+        Returns:
+            None
+        """
+        self.threat_value = threat_value
+        self.max_age = max_age
+        self.tags = np.zeros(capacity, dtype=np.uint64)
+        self.types = np.zeros(capacity, dtype=np.uint16)
+        self.positions = np.zeros((capacity, 2), dtype=np.float32)
+        self.last_seen = np.zeros(capacity, dtype=np.int32)
+        self.threats = np.zeros(capacity, dtype=np.float32)
+        self.is_structure = np.zeros(capacity, dtype=bool)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.index: Dict[int, int] = {}  # tag -> slot
+        self.free_slots: List[int] = list(range(capacity - 1, -1, -1))
+
+    def __len__(self) -> int:
+        """Count remembered enemies."""
+        return len(self.index)
+
+    def grow(self) -> None:
+        """
+        Double the number of slots.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        old = len(self.tags)
+        for name in (
+            "tags",
+            "types",
+            "positions",
+            "last_seen",
+            "threats",
+            "is_structure",
+            "alive",
+        ):
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate((column, np.zeros_like(column))))
+        self.free_slots.extend(range(2 * old - 1, old - 1, -1))
+
+    def see(self, unit: Unit, game_loop: int) -> None:
+        """
+        Record one enemy sighting.
+
+        Args:
+            unit (Unit): the visible enemy
+            game_loop (int): current game loop
+
+        Returns:
+            None
+        """
+        slot = self.index.get(unit.tag)
+        if slot is None:
+            if not self.free_slots:
+                self.grow()
+            slot = self.free_slots.pop()
+            self.index[unit.tag] = slot
+            self.tags[slot] = unit.tag
+            self.alive[slot] = True
+        self.types[slot] = unit.type_id.value
+        self.positions[slot] = unit.position_tuple
+        self.last_seen[slot] = game_loop
+        self.threats[slot] = self.threat_value(unit)
+        self.is_structure[slot] = unit.is_structure
+
+    def update(self, enemies: Iterable[Unit], game_loop: int) -> None:
+        """
+        Record every visible enemy and drop old sightings.
+
+        Args:
+            enemies (Iterable[Unit]): visible enemy units and structures
+            game_loop (int): current game loop
+
+        Returns:
+            None
+        """
+        for unit in enemies:
+            self.see(unit, game_loop)
+        self.expire(game_loop)
+
+    def expire(self, game_loop: int) -> None:
+        """
+        Forget units that haven't been seen for max_age game loops.
+
+        Args:
+            game_loop (int): current game loop
+
+        Returns:
+            None
+        """
+        stale = (
+            self.alive
+            & ~self.is_structure
+            & (game_loop - self.last_seen > self.max_age)
+        )
+        for slot in np.flatnonzero(stale):
+            self.forget(int(self.tags[slot]))
+
+    def forget(self, unit_tag: int) -> None:
+        """
+        Drop an enemy, e.g. because it died.
+
+        Args:
+            unit_tag (int): the enemy's tag
+
+        Returns:
+            None
+        """
+        slot = self.index.pop(unit_tag, None)
+        if slot is None:
+            return
+        self.alive[slot] = False
+        self.threats[slot] = 0
+        self.free_slots.append(slot)
+
+    def threat_near(self, points: np.ndarray, radius: float) -> np.ndarray:
+        """
+        Sum remembered threat within radius of each point.
+
+        Args:
+            points (ndarray): (n, 2) positions, e.g. our townhalls
+            radius (float): search radius
+
+        Returns:
+            ndarray: (n,) total threat value per point
+        """
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        live = np.flatnonzero(self.alive & (self.threats > 0))
+        if not len(live) or not len(points):
+            return np.zeros(len(points), dtype=np.float32)
+        offsets = points[:, None, :] - self.positions[live][None, :, :]
+        in_range = np.einsum("ijk,ijk->ij", offsets, offsets) <= radius ** 2
+        return np.asarray(in_range @ self.threats[live], dtype=np.float32)
+
+    def last_known_positions(self, min_threat: float = 0) -> np.ndarray:
+        """
+        Get the last-seen position of every remembered enemy above a threat level.
+
+        Args:
+            min_threat (float): only include enemies with more threat than this
+
+        Returns:
+            ndarray: (n, 2) positions
+        """
+        return self.positions[self.alive & (self.threats > min_threat)]
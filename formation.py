@@ -0,0 +1,132 @@
+"""Spread melee units into a surround or a concave around a target."""
+from math import pi
+from typing import Any
+
+import numpy as np
+
+# distance between neighbouring slots, a bit more than a zergling's width
+SLOT_SPACING = 1.0
+# slots are laid out on this many rings at most
+MAX_RINGS = 8
+
+
+def arc_slots(
+    center: Any, radius: float, facing: float, arc: float, rings: int = MAX_RINGS
+) -> Any:
+    """
+    Lay out slots on rings around a point.
+
+    Args:
+        center (Any): (x, y) of the target
+        radius (float): radius of the innermost ring
+        facing (float): angle in radians the middle of the arc points at
+        arc (float): width of the arc in radians, 2 * pi for a full surround
+        rings (int): number of rings
+
+    Returns:
+        ndarray: (m, 2) slot positions, innermost ring first
+    """
+    slots = []
+    for ring in range(rings):
+        r = radius + ring * SLOT_SPACING
+        count = max(int(arc * r / SLOT_SPACING), 1)
+        if arc >= 2 * pi:
+            angles = facing + np.arange(count) * (2 * pi / count)
+        else:
+            angles = facing + np.linspace(-arc / 2, arc / 2, count)
+        slots.append(np.column_stack((np.cos(angles), np.sin(angles))) * r)
+    return np.concatenate(slots) + np.asarray(center, dtype=float)
+
+
+def pathable_slots(slots: Any, pathable: Any) -> Any:
+    """
+    Drop slots that are off the map or on unpathable cells.
+
+    Args:
+        slots (ndarray): (m, 2) slot positions
+        pathable (ndarray): bool pathing grid indexed [x][y]
+
+    Returns:
+        ndarray: the slots that can be stood on
+    """
+    cells = np.floor(slots).astype(int)
+    width, height = pathable.shape
+    inside = (
+        (cells[:, 0] >= 0)
+        & (cells[:, 0] < width)
+        & (cells[:, 1] >= 0)
+        & (cells[:, 1] < height)
+    )
+    keep = np.flatnonzero(inside)
+    keep = keep[pathable[cells[keep, 0], cells[keep, 1]]]
+    return slots[keep]
+
+
+def assign_slots(positions: Any, slots: Any, center: Any) -> Any:
+    """
+    Give every unit a slot, keeping total travel low.
+
+    Units and slots are both put in order around the center, so neighbours get
+    neighbouring slots and nobody crosses the formation. Of every way to line the
+    two orders up, the one with the least total distance is used.
+
+    Args:
+        positions (ndarray): (n, 2) unit positions
+        slots (ndarray): (m, 2) slots, m >= n, innermost first
+        center (Any): (x, y) the formation is around
+
+    Returns:
+        ndarray: (n, 2) slot per unit, in the order of positions
+    """
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    n = len(positions)
+    center = np.asarray(center, dtype=float)
+    # fill the inner slots first
+    chosen = slots[:n]
+    unit_order = np.argsort(np.arctan2(*(positions - center).T[::-1]))
+    slot_order = np.argsort(np.arctan2(*(chosen - center).T[::-1]))
+    ordered_units = positions[unit_order]
+    ordered_slots = chosen[slot_order]
+    offsets = ordered_units[:, None, :] - ordered_slots[None, :, :]
+    distances = np.sqrt(np.einsum("ijk,ijk->ij", offsets, offsets))
+    # cost of lining unit i up with slot (i + shift) % n, for every shift
+    shifted = (np.arange(n)[None, :] + np.arange(n)[:, None]) % n
+    costs = distances[np.arange(n)[None, :], shifted].sum(axis=1)
+    best = shifted[int(np.argmin(costs))]
+    result = np.empty_like(positions)
+    result[unit_order] = ordered_slots[best]
+    return result
+
+
+def formation_positions(
+    positions: Any, center: Any, radius: float, pathable: Any
+) -> Any:
+    """
+    Find a destination for every unit around a target.
+
+    A full surround is used when the units can fill the inner ring, otherwise a
+    concave facing them.
+
+    Args:
+        positions (ndarray): (n, 2) unit positions
+        center (Any): (x, y) of the target
+        radius (float): how far from center the inner ring is
+        pathable (ndarray): bool pathing grid indexed [x][y]
+
+    Returns:
+        ndarray: (n, 2) destinations, None if there aren't enough pathable slots
+    """
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    center = np.asarray(center, dtype=float)
+    approach = positions.mean(axis=0) - center
+    facing = float(np.arctan2(approach[1], approach[0]))
+    n = len(positions)
+    inner_ring = 2 * pi * radius / SLOT_SPACING
+    arc = 2 * pi if n >= inner_ring else n * SLOT_SPACING / radius
+    # enough rings for twice the units, some slots may be unpathable
+    capacity = np.cumsum(arc * (radius + np.arange(MAX_RINGS) * SLOT_SPACING))
+    rings = min(int(np.searchsorted(capacity / SLOT_SPACING, 2 * n)) + 1, MAX_RINGS)
+    slots = pathable_slots(arc_slots(center, radius, facing, arc, rings), pathable)
+    if len(slots) < len(positions):
+        return None
+    return assign_slots(positions, slots, center)
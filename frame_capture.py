@@ -0,0 +1,251 @@
+"""
+Record what every frame cost and what the game looked like, for after the game.
+
+A capture is a file of fixed size chunks of CHUNK_ROWS frames, each chunk holding
+one float32 block per column, plus a JSON header next to it. Appending only copies
+a row into a preallocated chunk and writes the chunk when it's full, so it's cheap
+enough for ladder games. Reading memory-maps the file.
+
+Compare step times with game state over many games:
+    python frame_capture.py captures/*.cap --slowest 20
+"""
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+# game state per frame
+STATE = (
+    "game_loop",
+    "units",
+    "structures",
+    "enemies",
+    "role_none",
+    "role_inject",
+    "role_creep",
+    "role_scout",
+    "tumors",
+    "paths_cached",
+    "path_requests",
+)
+# milliseconds per part of on_step, "step" is the whole of it
+TIMINGS = (
+    "step_ms",
+    "enemies_ms",
+    "grids_ms",
+    "abilities_ms",
+    "inject_ms",
+    "micro_ms",
+    "creep_ms",
+    "paths_ms",
+    "build_ms",
+)
+COLUMNS = STATE + TIMINGS
+INDEX = {name: i for i, name in enumerate(COLUMNS)}
+CHUNK_ROWS = 1024
+
+
+def capture_file(map_name: str) -> str:
+    """Return a new capture path for a game on a map."""
+    return f"captures/{map_name}_{time.strftime('%Y%m%d-%H%M%S')}.cap"
+
+
+class FrameCapture:
+    """Append-only writer of one game's frames."""
+
+    def __init__(
+        self, path: str, metadata: Dict[str, Any], chunk_rows: int = CHUNK_ROWS
+    ) -> None:
+        """
+        Create the capture file and its header.
+
+        Args:
+            path (str): where to write, the header goes to path + ".json"
+            metadata (Dict[str, Any]): stored in the header, e.g. map and opponent
+            chunk_rows (int): frames per chunk
+
+        Returns:
+            None
+        """
+        self.path = path
+        self.header = {
+            "columns": COLUMNS,
+            "chunk_rows": chunk_rows,
+            "rows": None,
+            **metadata,
+        }
+        self.chunk = np.zeros((len(COLUMNS), chunk_rows), dtype=np.float32)
+        self.filled = 0
+        self.rows = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(path, "wb")
+        self.write_header()
+
+    def write_header(self) -> None:
+        """Write the header, rows stays None until the capture is closed."""
+        with open(self.path + ".json", "w") as f:
+            json.dump(self.header, f)
+
+    def append(self, frame: Any) -> None:
+        """
+        Add one frame.
+
+        Args:
+            frame (ndarray): (len(COLUMNS),) values in COLUMNS order
+
+        Returns:
+            None
+        """
+        self.chunk[:, self.filled] = frame
+        self.filled += 1
+        self.rows += 1
+        if self.filled == self.chunk.shape[1]:
+            self.chunk.tofile(self.file)
+            self.file.flush()
+            self.filled = 0
+
+    def close(self, **metadata: Any) -> None:
+        """
+        Write the last, partly filled chunk and finish the header.
+
+        Args:
+            **metadata (Any): added to the header, e.g. the game result
+
+        Returns:
+            None
+        """
+        filled = self.filled
+        if filled:
+            self.chunk[:, filled:] = np.nan
+            self.chunk.tofile(self.file)
+        self.file.close()
+        self.header.update(rows=self.rows, **metadata)
+        self.write_header()
+
+
+class CaptureReader:
+    """Memory-mapped columns of one capture."""
+
+    def __init__(self, path: str) -> None:
+        """
+        Open a capture.
+
+        Args:
+            path (str): the capture file
+
+        Returns:
+            None
+        """
+        self.path = path
+        with open(path + ".json") as f:
+            self.header = json.load(f)
+        columns = self.header["columns"]
+        chunk_rows = self.header["chunk_rows"]
+        data = np.memmap(path, dtype=np.float32, mode="r")
+        chunks = len(data) // (len(columns) * chunk_rows)
+        self.data = data[: chunks * len(columns) * chunk_rows].reshape(
+            chunks, len(columns), chunk_rows
+        )
+        # a game that crashed only has its full chunks
+        rows = self.header["rows"]
+        self.rows = int(chunks * chunk_rows if rows is None else rows)
+        self.index = {name: i for i, name in enumerate(columns)}
+
+    def __len__(self) -> int:
+        """Count frames."""
+        return self.rows
+
+    def column(self, name: str) -> Any:
+        """
+        Read one column.
+
+        Args:
+            name (str): one of the header's columns
+
+        Returns:
+            ndarray: (rows,) values, only this column is read from disk
+        """
+        return self.data[:, self.index[name], :].reshape(-1)[: self.rows]
+
+
+def load_table(readers: List[CaptureReader]) -> Dict[str, Any]:
+    """
+    Put many captures' frames in one table.
+
+    Args:
+        readers (List[CaptureReader]): the captures
+
+    Returns:
+        Dict[str, ndarray]: column -> values of every frame, plus "capture", the
+                            index of the reader each frame came from
+    """
+    table = {
+        name: np.concatenate([reader.column(name) for reader in readers])
+        for name in COLUMNS
+    }
+    table["capture"] = np.repeat(np.arange(len(readers)), [len(r) for r in readers])
+    return table
+
+
+def correlations(table: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Correlate step time with every other column.
+
+    Args:
+        table (Dict[str, ndarray]): frames, see load_table
+
+    Returns:
+        Dict[str, float]: column -> Pearson correlation with step_ms
+    """
+    step = table["step_ms"]
+    result = {}
+    for name in COLUMNS:
+        values = table[name]
+        if name != "step_ms" and values.std() > 0 and step.std() > 0:
+            result[name] = float(np.corrcoef(values, step)[0, 1])
+    return result
+
+
+def main() -> None:
+    """Summarize captures: where the time went, what it follows, the worst frames."""
+    parser = argparse.ArgumentParser(description="Compare step times to game state.")
+    parser.add_argument("captures", nargs="+", help="capture files")
+    parser.add_argument(
+        "--slowest", type=int, default=10, help="how many of the slowest frames to list"
+    )
+    args = parser.parse_args()
+    readers = [CaptureReader(path) for path in args.captures]
+    readers = [reader for reader in readers if len(reader)]
+    if not readers:
+        print("no frames")
+        return
+    table = load_table(readers)
+    step = table["step_ms"]
+    p50, p95, p99 = np.percentile(step, [50, 95, 99])
+    print(
+        f"{len(readers)} games, {len(step)} frames, step ms: mean {step.mean():.2f} "
+        f"p50 {p50:.2f} p95 {p95:.2f} p99 {p99:.2f} max {step.max():.2f}"
+    )
+    print("\nshare of step time")
+    for name in TIMINGS[1:]:
+        print(f"  {name:<14}{table[name].sum() / step.sum():>7.1%}")
+    print("\ncorrelation with step_ms")
+    ranked = sorted(correlations(table).items(), key=lambda item: -abs(item[1]))
+    for name, r in ranked:
+        print(f"  {name:<14}{r:>7.2f}")
+    print(f"\n{args.slowest} slowest frames")
+    parts = np.column_stack([table[name] for name in TIMINGS[1:]])
+    for i in np.argsort(-step)[: args.slowest]:
+        worst = TIMINGS[1:][int(np.argmax(parts[i]))]
+        print(
+            f"  {os.path.basename(readers[table['capture'][i]].path)} loop "
+            f"{int(table['game_loop'][i])}: {step[i]:.1f} ms, most in {worst}, "
+            f"{int(table['units'][i])} units, {int(table['enemies'][i])} enemies"
+        )
+
+
+if __name__ == "__main__":
+    main()
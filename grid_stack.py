@@ -0,0 +1,167 @@
+"""Map grids stored together in one orientation."""
+import glob
+import os
+from math import floor
+from typing import Any, Iterable, List
+
+import numpy as np
+
+# layers, in the order they're stored
+PATHING = 0
+PLACEMENT = 1
+CREEP = 2
+VISIBILITY = 3
+LAYERS = ("pathing", "placement", "creep", "visibility")
+# layers that only hold 0 or 1 and are exposed as bool
+BOOL_LAYERS = {PATHING, PLACEMENT, CREEP}
+
+
+def grid_file(map_name: str) -> str:
+    """Return where a map's pathing grid is stored."""
+    return f"map_grids/{map_name}_grid.npy"
+
+
+def stored_maps() -> List[str]:
+    """List the maps that have a stored pathing grid."""
+    return [
+        os.path.basename(path)[: -len("_grid.npy")]
+        for path in glob.glob(grid_file("*"))
+    ]
+
+
+def load_grid(map_name: str) -> Any:
+    """
+    Load a map's stored pathing grid.
+
+    Args:
+        map_name (str): map name as given by game_info
+
+    Returns:
+        ndarray: pathing grid indexed [x][y], nonzero where ground units can walk
+    """
+    return np.load(grid_file(map_name))
+
+
+def save_grid(map_name: str, pathing: Any) -> None:
+    """
+    Store a map's pathing grid for the offline tables and the mock client.
+
+    The grid only depends on the map, so a stored one is kept as it is.
+
+    Args:
+        map_name (str): map name as given by game_info
+        pathing (ndarray): pathing grid indexed [x][y]
+
+    Returns:
+        None
+    """
+    if not os.path.exists(grid_file(map_name)):
+        np.save(grid_file(map_name), pathing)
+
+
+class GridStack:
+    """
+    Every map layer in one uint8 array, indexed [layer][x][y].
+
+    Cells are indexed [x][y] like Point2 and the cells of a path, so a position can
+    be used as an index directly. Layers are views into the one array: pathing,
+    placement and creep as bool, visibility (0 hidden, 1 fogged, 2 visible) as
+    uint8. They are updated in place, so hand a worker thread a mask or a copy, not
+    a layer.
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+        """
+        Allocate every layer.
+
+        Args:
+            width (int): map width in cells
+            height (int): map height in cells
+
+        Returns:
+            None
+        """
+        self.data = np.zeros((len(LAYERS), width, height), dtype=np.uint8)
+        self.pathing = self.data[PATHING].view(bool)
+        self.placement = self.data[PLACEMENT].view(bool)
+        self.creep = self.data[CREEP].view(bool)
+        self.visibility = self.data[VISIBILITY]
+
+    @classmethod
+    def from_game_info(cls, game_info: Any) -> Any:
+        """
+        Make a stack for a map and fill in the layers that don't change.
+
+        Args:
+            game_info (GameInfo): the map's game info
+
+        Returns:
+            GridStack: the new stack
+        """
+        stack = cls(game_info.map_size.width, game_info.map_size.height)
+        # PixelMap data is [y][x], the transpose is a view
+        np.not_equal(game_info.pathing_grid.data_numpy.T, 0, out=stack.pathing)
+        np.not_equal(game_info.placement_grid.data_numpy.T, 0, out=stack.placement)
+        return stack
+
+    def update(self, state: Any) -> None:
+        """
+        Copy this frame's creep and visibility into their layers.
+
+        Args:
+            state (GameState): the current game state
+
+        Returns:
+            None
+        """
+        np.not_equal(state.creep.data_numpy.T, 0, out=self.creep)
+        np.copyto(self.visibility, state.visibility.data_numpy.T, casting="unsafe")
+
+    def layer(self, name: str) -> Any:
+        """
+        Get a layer by name.
+
+        Args:
+            name (str): one of LAYERS
+
+        Returns:
+            ndarray: view of the layer, bool or uint8
+        """
+        index = LAYERS.index(name)
+        return self.data[index].view(bool) if index in BOOL_LAYERS else self.data[index]
+
+    def mask(self, *names: str, exclude: Iterable[str] = (), out: Any = None) -> Any:
+        """
+        Combine layers into one mask of cells set in all of them.
+
+        Args:
+            *names (str): layers that must be set
+            exclude (Iterable[str]): layers that must not be set
+            out (ndarray): bool array to write into, a new one if None
+
+        Returns:
+            ndarray: the bool mask
+        """
+        if out is None:
+            out = np.ones(self.data.shape[1:], dtype=bool)
+        else:
+            out.fill(True)
+        for name in names:
+            np.logical_and(out, self.layer(name), out=out)
+        for name in exclude:
+            # out and not layer, without a temporary
+            np.greater(out, self.layer(name), out=out)
+        return out
+
+    def at(self, name: str, position: Any) -> int:
+        """
+        Look up one cell.
+
+        Args:
+            name (str): one of LAYERS
+            position (Any): Point2 or (x, y)
+
+        Returns:
+            int: the cell's value
+        """
+        return int(self.layer(name)[floor(position[0]), floor(position[1])])
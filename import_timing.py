@@ -0,0 +1,77 @@
+"""
+Report how long each module takes to import when Paul starts.
+
+Runs a fresh interpreter with -X importtime, saves its report to importtime.txt
+in the same format and prints the slowest top-level imports.
+"""
+import argparse
+import subprocess  # nosec
+import sys
+from typing import List, Tuple
+
+REPORT_FILE = "importtime.txt"
+PREFIX = "import time:"
+
+
+def parse_report(lines: List[str]) -> List[Tuple[int, int, str]]:
+    """
+    Parse -X importtime output.
+
+    Args:
+        lines (List[str]): lines of the report
+
+    Returns:
+        List[Tuple[int, int, str]]: self us, cumulative us and module name, with the
+                                    module indented by its import depth
+    """
+    rows = []
+    for line in lines:
+        if not line.startswith(PREFIX) or "[us]" in line:
+            continue
+        start = len(PREFIX)
+        self_us, cumulative_us, name = line[start:].split("|")
+        # drop the separator space, two spaces of indent per level remain
+        rows.append((int(self_us), int(cumulative_us), name[1:].rstrip()))
+    return rows
+
+
+def main() -> None:
+    """Time the imports of a module, Paul by default."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("module", nargs="?", default="Paul")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+    result = subprocess.run(  # nosec
+        [sys.executable, "-X", "importtime", "-c", f"import {args.module}"],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    with open(REPORT_FILE, "w") as f:
+        f.write(result.stderr)
+    rows = parse_report(result.stderr.splitlines())
+    if result.returncode:
+        print(result.stderr.splitlines()[-1])
+    # the timed module is the last unindented row, its direct imports are the rows
+    # one level in that were reported since the unindented row before it
+    roots = [i for i, row in enumerate(rows) if not row[2].startswith(" ")]
+    if not roots:
+        return
+    first = roots[-2] + 1 if len(roots) > 1 else 0
+    last = roots[-1]
+    target = rows[last]
+    children = [
+        row
+        for row in rows[first:last]
+        if row[2].startswith("  ") and not row[2].startswith("   ")
+    ]
+    children.sort(key=lambda row: row[1], reverse=True)
+    print(f"{target[2]}: {target[1] / 1000:.0f} ms in {len(rows)} imports")
+    print(f"{'self [us]':>10} | {'cumulative':>10} | module")
+    top = args.top
+    for self_us, cumulative_us, name in children[:top]:
+        print(f"{self_us:>10} | {cumulative_us:>10} | {name.strip()}")
+    print(f"Full report in {REPORT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Run CPU-heavy grid work in threads and pick up the results on a later frame."""
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+# NumPy and sc2pathlib release the GIL, so a couple of threads is enough
+DEFAULT_WORKERS = 2
+
+
+class JobQueue:
+    """One background job per key, results are collected by polling."""
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS) -> None:
+        """
+        Start the thread pool.
+
+        Args:
+            max_workers (int): number of threads
+
+        Returns:
+            None
+        """
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="paul-jobs"
+        )
+        self.pending: Dict[Hashable, Future] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Check if a job is pending or finished but not collected."""
+        return key in self.pending
+
+    def submit(self, key: Hashable, function: Callable, *args: Any) -> bool:
+        """
+        Start a job unless one with the same key hasn't been collected yet.
+
+        Arguments must not change while the job runs, so pass positions and
+        per-frame arrays, not Unit objects.
+
+        Args:
+            key (Hashable): identifies the job, usually (kind, unit tag)
+            function (Callable): the work to do
+            *args (Any): arguments for function
+
+        Returns:
+            bool: True if a new job was started
+        """
+        if key in self.pending:
+            return False
+        self.pending[key] = self.executor.submit(function, *args)
+        return True
+
+    def pop_result(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Collect a finished job.
+
+        Args:
+            key (Hashable): the job's key
+
+        Returns:
+            Tuple[bool, Any]: (False, None) if there is no finished job for the key,
+                              otherwise (True, result)
+        """
+        future = self.pending.get(key)
+        if future is None or not future.done():
+            return False, None
+        del self.pending[key]
+        return True, future.result()
+
+    def forget(self, unit_tag: int) -> None:
+        """
+        Drop every job keyed on a unit.
+
+        Args:
+            unit_tag (int): tag of the unit that's gone
+
+        Returns:
+            None
+        """
+        for key in [k for k in self.pending if isinstance(k, tuple) and unit_tag in k]:
+            self.pending.pop(key).cancel()
+
+    def shutdown(self) -> None:
+        """
+        Stop the thread pool without waiting for running jobs.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,34 @@
+"""Defer heavy imports until a module attribute is first used."""
+import importlib
+import importlib.util
+from types import ModuleType
+from typing import Any
+
+
+class LazyModule(ModuleType):
+    """Stand-in that imports the real module on first attribute lookup."""
+
+    def __getattr__(self, attribute: str) -> Any:
+        """Import the module, keep its attributes and return the one asked for."""
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(vars(module))
+        return getattr(module, attribute)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Import a module lazily.
+
+    The top-level package is looked up now, so a missing dependency still fails at
+    startup, but no module code runs until an attribute is first used.
+
+    Args:
+        name (str): full module name, e.g. "scipy.sparse.csgraph"
+
+    Returns:
+        ModuleType: stand-in for the module
+    """
+    package = name.partition(".")[0]
+    if importlib.util.find_spec(package) is None:
+        raise ModuleNotFoundError(f"No module named {package!r}", name=package)
+    return LazyModule(name)
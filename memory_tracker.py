@@ -0,0 +1,179 @@
+"""
+Find which part of Paul holds on to memory or churns through it in long games.
+
+Every interval game loops a tracemalloc snapshot is taken and compared with the
+previous one. Allocations are charged to the most recent frame in one of Paul's own
+modules, so numpy arrays made by path_manager count for path_manager even though
+numpy allocated them. Each sample is written to the log with the growth and the
+number of live allocations per module, the live numpy arrays per module, the size of
+every store Paul reports and, on Python 3.9+, the peak of short-lived allocations
+per on_step section.
+"""
+import os
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, Tuple
+
+# numpy registers its array buffers with tracemalloc under this domain
+NUMPY_DOMAIN = 389047
+# frames kept per allocation, enough to get from numpy or the library back to Paul
+TRACE_FRAMES = 16
+# lines listed per sample
+TOP_LINES = 10
+REPO = os.path.dirname(os.path.abspath(__file__))
+
+
+def memory_file(map_name: str) -> str:
+    """Return a new memory log path for a game on a map."""
+    return f"memory/{map_name}_{time.strftime('%Y%m%d-%H%M%S')}.log"
+
+
+def owner(traceback: Any) -> Tuple[str, int]:
+    """
+    Find the line of Paul's code that caused an allocation.
+
+    Args:
+        traceback (tracemalloc.Traceback): oldest frame first
+
+    Returns:
+        Tuple[str, int]: module name and line, ("other", 0) outside Paul's code
+    """
+    for frame in reversed(traceback):
+        if frame.filename.startswith(REPO) and frame.filename != __file__:
+            return os.path.basename(frame.filename)[:-3], frame.lineno
+    return "other", 0
+
+
+def megabytes(size: float, change: bool = False) -> str:
+    """Format a byte count, with its sign if it's a change."""
+    return f"{size / 2 ** 20:{'+' if change else ''}.2f} MB"
+
+
+class MemoryTracker:
+    """Periodic tracemalloc snapshots, written as differences to a log."""
+
+    def __init__(self, path: str, interval: int) -> None:
+        """
+        Start tracing allocations.
+
+        Args:
+            path (str): the log file
+            interval (int): game loops between samples
+
+        Returns:
+            None
+        """
+        self.path = path
+        self.interval = interval
+        self.next_loop = 0
+        tracemalloc.start(TRACE_FRAMES)
+        self.previous: Dict[str, Any] = {}
+        self.stores: Dict[str, int] = {}
+        # bytes allocated and freed again within each section since the last sample
+        self.section_peaks: Counter = Counter()
+        self.can_reset_peak = hasattr(tracemalloc, "reset_peak")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.log = open(path, "w")
+
+    def section(self, name: str) -> None:
+        """
+        Note the most memory a section had in use on top of what it kept.
+
+        Called right after the section ends, the next one is measured from here.
+
+        Args:
+            name (str): the section, see Paul.lap
+
+        Returns:
+            None
+        """
+        if not self.can_reset_peak:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        self.section_peaks[name] = max(self.section_peaks[name], peak - current)
+        tracemalloc.reset_peak()
+
+    def due(self, game_loop: int) -> bool:
+        """Check if a sample should be taken this frame."""
+        return game_loop >= self.next_loop
+
+    def sample(self, game_loop: int, stores: Dict[str, int]) -> None:
+        """
+        Take a snapshot and write how it differs from the last one.
+
+        Args:
+            game_loop (int): the current game loop
+            stores (Dict[str, int]): store name -> number of entries
+
+        Returns:
+            None
+        """
+        self.next_loop = game_loop + self.interval
+        snapshot = tracemalloc.take_snapshot()
+        modules: Counter = Counter()
+        allocations: Counter = Counter()
+        arrays: Counter = Counter()
+        array_bytes: Counter = Counter()
+        lines: Counter = Counter()
+        for trace in snapshot.traces:
+            module, line = owner(trace.traceback)
+            modules[module] += trace.size
+            allocations[module] += 1
+            lines[module, line] += trace.size
+            if trace.domain == NUMPY_DOMAIN:
+                arrays[module] += 1
+                array_bytes[module] += trace.size
+        total = sum(modules.values())
+        write = self.log.write
+        write(
+            f"loop {game_loop}: {megabytes(total)} traced "
+            f"({megabytes(total - self.previous.get('total', total), True)}), "
+            f"{sum(arrays.values())} numpy arrays in "
+            f"{megabytes(sum(array_bytes.values()))}\n"
+        )
+        write("  stores:")
+        for name, size in stores.items():
+            change = size - self.stores.get(name, size)
+            write(f" {name} {size}" + (f" ({change:+d})" if change else ""))
+        write("\n  by module:\n")
+        previous_modules = self.previous.get("modules", modules)
+        previous_allocations = self.previous.get("allocations", allocations)
+        previous_arrays = self.previous.get("arrays", arrays)
+        for module, size in modules.most_common():
+            write(
+                f"    {module:<18}{megabytes(size):>12} "
+                f"({megabytes(size - previous_modules[module], True)}), "
+                f"{allocations[module]} allocations "
+                f"({allocations[module] - previous_allocations[module]:+d}), "
+                f"{arrays[module]} numpy arrays "
+                f"({arrays[module] - previous_arrays[module]:+d})\n"
+            )
+        previous_lines = self.previous.get("lines", lines)
+        growth = Counter(
+            {key: size - previous_lines[key] for key, size in lines.items()}
+        )
+        write("  growing lines:\n")
+        for (module, line), change in growth.most_common(TOP_LINES):
+            if change > 0:
+                write(f"    {module}:{line} {megabytes(change, True)}\n")
+        if self.section_peaks:
+            write("  short-lived peak by section:")
+            for name, size in self.section_peaks.most_common():
+                write(f" {name} {megabytes(size)}")
+            write("\n")
+            self.section_peaks.clear()
+        self.log.flush()
+        self.previous = {
+            "total": total,
+            "modules": modules,
+            "allocations": allocations,
+            "arrays": arrays,
+            "lines": lines,
+        }
+        self.stores = dict(stores)
+
+    def close(self) -> None:
+        """Stop tracing and close the log."""
+        tracemalloc.stop()
+        self.log.close()
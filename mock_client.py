@@ -0,0 +1,1029 @@
+"""
+Run Paul without the game.
+
+MockWebSocket stands in for the connection to the SC2 client: every request the
+library sends is answered by a MockWorld instead. The world starts from fixtures
+recorded in a real game (fixtures/{map_name}/*.pb) where they exist, and otherwise
+from a scripted setup built out of map_grids/{map_name}_grid.npy and the map's key
+points. It's a crude game: workers mine at a flat rate, larva, eggs, buildings and
+research finish on time, units walk in straight lines and nobody fights. That's
+enough for the whole on_start/on_step lifecycle to run headless at full speed, so
+step latency can be measured on machines without the game.
+
+Record fixtures on a machine with the game:
+    python mock_client.py --record --map "Triton LE"
+Run anywhere:
+    python mock_client.py --map "Triton LE" --loops 13440
+"""
+import argparse
+import asyncio
+import os
+import time
+from math import atan2, cos, hypot, pi, sin
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import sc2
+from s2clientprotocol import common_pb2 as common_pb
+from s2clientprotocol import data_pb2 as data_pb
+from s2clientprotocol import error_pb2 as error_pb
+from s2clientprotocol import raw_pb2 as raw_pb
+from s2clientprotocol import sc2api_pb2 as sc_pb
+from sc2 import Difficulty
+from sc2.client import Client
+from sc2.data import Race
+from sc2.dicts.unit_research_abilities import RESEARCH_INFO
+from sc2.dicts.unit_train_build_abilities import TRAIN_INFO
+from sc2.ids.ability_id import AbilityId
+from sc2.ids.unit_typeid import UnitTypeId
+from sc2.main import _play_game_ai
+from sc2.player import Bot, Computer
+
+from base_distances import EXPANSION, START, points_file
+from grid_stack import load_grid
+from Paul import Paul
+
+FIXTURES = ("data", "game_info", "observation")
+# scripted unit types: minerals, vespene, supply, supply given, build time in game
+# loops, speed, radius, health, footprint edge (0 for units)
+TYPES = {
+    "DRONE": (50, 0, 1, 0, 272, 2.8125, 0.375, 40, 0),
+    "OVERLORD": (100, 0, 0, 8, 403, 0.644, 1.0, 200, 0),
+    "ZERGLING": (25, 0, 0.5, 0, 381, 2.9531, 0.375, 35, 0),
+    "QUEEN": (150, 0, 2, 0, 806, 0.9375, 0.875, 175, 0),
+    "ROACH": (75, 25, 2, 0, 426, 2.25, 0.625, 145, 0),
+    "LARVA": (0, 0, 0, 0, 0, 0, 0.25, 25, 0),
+    "EGG": (0, 0, 0, 0, 0, 0, 0.25, 200, 0),
+    "HATCHERY": (300, 0, 0, 6, 1590, 0, 2.75, 1500, 5),
+    "EXTRACTOR": (25, 0, 0, 0, 470, 0, 1.5, 500, 3),
+    "SPAWNINGPOOL": (200, 0, 0, 0, 1030, 0, 1.5, 1000, 3),
+    "EVOLUTIONCHAMBER": (75, 0, 0, 0, 560, 0, 1.5, 750, 3),
+    "ROACHWARREN": (150, 0, 0, 0, 874, 0, 1.5, 850, 3),
+    "SPINECRAWLER": (100, 0, 0, 0, 806, 0, 1.0, 300, 2),
+    "SPORECRAWLER": (75, 0, 0, 0, 470, 0, 1.0, 400, 2),
+    "CREEPTUMORBURROWED": (0, 0, 0, 0, 246, 0, 0.5, 50, 1),
+    "MINERALFIELD": (0, 0, 0, 0, 0, 0, 1.0, 0, 0),
+    "VESPENEGEYSER": (0, 0, 0, 0, 0, 0, 1.5, 0, 0),
+}
+# damage, attacks, range, seconds between attacks
+WEAPONS = {
+    "DRONE": (5, 1, 0.1, 1.07),
+    "ZERGLING": (5, 1, 0.1, 0.497),
+    "QUEEN": (4, 2, 5, 0.71),
+    "ROACH": (16, 1, 4, 1.43),
+}
+# tumors of every kind are reported burrowed once they're placed
+TUMORS = {UnitTypeId.CREEPTUMOR, UnitTypeId.CREEPTUMORQUEEN}
+CREEP_RADIUS = {UnitTypeId.HATCHERY: 12, UnitTypeId.CREEPTUMORBURROWED: 10}
+ENERGY_COST = {
+    AbilityId.EFFECT_INJECTLARVA.value: 25,
+    AbilityId.BUILD_CREEPTUMOR_QUEEN.value: 25,
+}
+# minerals per worker per game loop, about 60 a minute
+MINING_RATE = 0.045
+# a hatchery makes a larva this often while it has fewer than MAX_LARVA
+LARVA_LOOPS = 246
+MAX_LARVA = 3
+INJECT_LOOPS = 650
+# queen energy per game loop
+ENERGY_RATE = 0.7875 / 22.4
+# game loops in a "normal speed" second, unit speeds are given per one of those
+LOOPS_PER_SECOND = 16
+
+
+def action_result(name: str) -> int:
+    """Return the ActionResult code with this name."""
+    return int(error_pb.ActionResult.Value(name))
+
+
+SUCCESS = action_result("Success")
+
+
+def fixture_dir(map_name: str) -> str:
+    """Return where a map's recorded responses are stored."""
+    return f"fixtures/{map_name}"
+
+
+def image(grid: Any, bits: int) -> Any:
+    """
+    Pack a grid the way the game sends it.
+
+    Args:
+        grid (ndarray): grid indexed [x][y]
+        bits (int): 1 for bool grids, 8 for uint8 ones
+
+    Returns:
+        ImageData: the grid, rows of y
+    """
+    width, height = grid.shape
+    rows = np.ascontiguousarray(grid.T)
+    data = np.packbits(rows != 0) if bits == 1 else rows.astype(np.uint8)
+    return common_pb.ImageData(
+        bits_per_pixel=bits,
+        size=common_pb.Size2DI(x=width, y=height),
+        data=data.tobytes(),
+    )
+
+
+def unpack(image_data: Any) -> Any:
+    """Unpack a 1 bit ImageData into a bool grid indexed [x][y]."""
+    width, height = image_data.size.x, image_data.size.y
+    bits = np.unpackbits(np.frombuffer(image_data.data, dtype=np.uint8))
+    return bits[: width * height].reshape(height, width).T.astype(bool)
+
+
+def scripted_data() -> Any:
+    """
+    Make game data for the scripted world.
+
+    Every unit type TRAIN_INFO mentions gets an entry, with costs, supply and build
+    times from TYPES where they're known. Zerg structures cost 50 more, like in the
+    real data, since the drone is included.
+
+    Args:
+        None
+
+    Returns:
+        ResponseData: the data
+    """
+    data = sc_pb.ResponseData()
+    creators: Dict[UnitTypeId, AbilityId] = {}
+    footprints: Dict[AbilityId, int] = {}
+    for products in TRAIN_INFO.values():
+        for product, info in products.items():
+            creators.setdefault(product, info["ability"])
+            if product.name in TYPES:
+                footprints[info["ability"]] = TYPES[product.name][8]
+    types = set(creators) | set(TRAIN_INFO) | {UnitTypeId[name] for name in TYPES}
+    for type_id in sorted(types, key=lambda t: t.value):
+        row = TYPES.get(type_id.name, (0, 0, 0, 0, 0, 0, 0.5, 100, 0))
+        unit = data.units.add(
+            unit_id=type_id.value,
+            name=type_id.name,
+            available=True,
+            mineral_cost=row[0] + (50 if row[8] > 1 else 0),
+            vespene_cost=row[1],
+            food_required=row[2],
+            food_provided=row[3],
+            ability_id=creators[type_id].value if type_id in creators else 0,
+            race=Race.Zerg.value if type_id.name in TYPES else Race.NoRace.value,
+            build_time=row[4],
+            movement_speed=row[5],
+            has_minerals="MINERAL" in type_id.name,
+            has_vespene="GEYSER" in type_id.name,
+        )
+        if row[8] or type_id in TUMORS:
+            unit.attributes.append(data_pb.Attribute.Value("Structure"))
+        if type_id.name in WEAPONS:
+            damage, attacks, reach, speed = WEAPONS[type_id.name]
+            unit.weapons.add(
+                type=data_pb.Weapon.TargetType.Value("Ground"),
+                damage=damage,
+                attacks=attacks,
+                range=reach,
+                speed=speed,
+            )
+    abilities = {
+        info["ability"]
+        for products in (*TRAIN_INFO.values(), *RESEARCH_INFO.values())
+        for info in products.values()
+    }
+    abilities |= {
+        AbilityId.MOVE,
+        AbilityId.ATTACK,
+        AbilityId.STOP,
+        AbilityId.SMART,
+        AbilityId.EFFECT_INJECTLARVA,
+    }
+    for ability in sorted(abilities, key=lambda a: a.value):
+        data.abilities.add(
+            ability_id=ability.value,
+            link_name=ability.name,
+            button_name=ability.name,
+            available=True,
+            footprint_radius=footprints.get(ability, 0) / 2,
+        )
+    for products in RESEARCH_INFO.values():
+        for upgrade, info in products.items():
+            data.upgrades.add(
+                upgrade_id=upgrade.value,
+                name=upgrade.name,
+                mineral_cost=100,
+                vespene_cost=100,
+                research_time=info.get("time", 2464),
+                ability_id=info["ability"].value,
+            )
+    return data
+
+
+def scripted_game_info(map_name: str) -> Tuple[Any, List[Any], List[Any]]:
+    """
+    Make game info from a map's stored pathing grid and key points.
+
+    The placement grid is the pathing grid and the terrain is flat. Without key
+    points, the two mains go near opposite corners and there are no other bases.
+
+    Args:
+        map_name (str): map name as given by game_info
+
+    Returns:
+        Tuple[ResponseGameInfo, List, List]: the game info, our start followed by
+                                             the enemy's and every base to put
+                                             resources at
+    """
+    pathing = load_grid(map_name) != 0
+    width, height = pathing.shape
+    if os.path.exists(points_file(map_name)):
+        points = np.load(points_file(map_name))
+        starts = [tuple(p[:2]) for p in points if p[2] == START]
+        bases = [tuple(p[:2]) for p in points if p[2] == EXPANSION] or starts
+    else:
+        cells = np.argwhere(pathing)
+        starts = []
+        for corner in ((0.2, 0.8), (0.8, 0.2)):
+            offsets = cells - (width * corner[0], height * corner[1])
+            x, y = cells[np.argmin(np.einsum("ij,ij->i", offsets, offsets))]
+            starts.append((x + 0.5, y + 0.5))
+        bases = starts
+    info = sc_pb.ResponseGameInfo(map_name=map_name)
+    info.player_info.add(
+        player_id=1,
+        type=sc_pb.PlayerType.Value("Participant"),
+        race_requested=Race.Zerg.value,
+        race_actual=Race.Zerg.value,
+    )
+    info.player_info.add(
+        player_id=2,
+        type=sc_pb.PlayerType.Value("Computer"),
+        race_requested=Race.Zerg.value,
+        race_actual=Race.Zerg.value,
+        difficulty=Difficulty.Easy.value,
+    )
+    raw = info.start_raw
+    raw.map_size.x, raw.map_size.y = width, height
+    raw.pathing_grid.CopyFrom(image(pathing, 1))
+    raw.placement_grid.CopyFrom(image(pathing, 1))
+    raw.terrain_height.CopyFrom(image(np.full((width, height), 127), 8))
+    raw.playable_area.p1.x, raw.playable_area.p1.y = width, height
+    for x, y in starts[1:]:
+        raw.start_locations.add(x=x, y=y)
+    return info, starts, bases
+
+
+class MockWorld:
+    """The game as far as the bot can tell, answering one request at a time."""
+
+    def __init__(self, data: Any, game_info: Any, max_loops: int) -> None:
+        """
+        Set up an empty world.
+
+        Args:
+            data (ResponseData): unit, ability and upgrade data
+            game_info (ResponseGameInfo): the map
+            max_loops (int): the game ends in a tie at this game loop
+
+        Returns:
+            None
+        """
+        self.max_loops = max_loops
+        self.status = sc_pb.Status.Value("in_game")
+        self.game_loop = 0
+        self.minerals = 50.0
+        self.vespene = 0.0
+        self.upgrades: List[int] = []
+        self.types = {unit.unit_id: unit for unit in data.units}
+        self.abilities = {ability.ability_id: ability for ability in data.abilities}
+        self.upgrade_data = {u.ability_id: u for u in data.upgrades}
+        # ability -> unit type it makes
+        self.creates = {
+            info["ability"].value: product.value
+            for products in TRAIN_INFO.values()
+            for product, info in products.items()
+        }
+        self.units: Dict[int, Any] = {}
+        self.next_tag = 1 << 32
+        # tag -> where the unit is walking to
+        self.destinations: Dict[int, Tuple[float, float]] = {}
+        # (done at, producer tag, unit type or -upgrade, count)
+        self.production: List[Tuple[int, int, int, int]] = []
+        self.larva_timers: Dict[int, int] = {}
+        self.spent_tumors: set = set()
+        self.errors: List[Any] = []
+        raw = game_info.start_raw
+        self.pathing = unpack(raw.pathing_grid)
+        self.placement = unpack(raw.placement_grid)
+        # cells taken by structures and resources
+        self.blocked = np.zeros_like(self.placement)
+        self.creep = np.zeros_like(self.placement)
+        self.creep_dirty = True
+        self.creep_image: Any = None
+        self.visibility = image(np.full(self.pathing.shape, 2), 8)
+        self.data_bytes = self.wrap(data=data)
+        self.game_info_bytes = self.wrap(game_info=game_info)
+
+    def wrap(self, **kwargs: Any) -> bytes:
+        """Serialize a response once so it can be sent again and again."""
+        return bytes(sc_pb.Response(status=self.status, **kwargs).SerializeToString())
+
+    @classmethod
+    def load(cls, map_name: str, max_loops: int) -> Any:
+        """
+        Make the world for a map, from fixtures where they were recorded.
+
+        Args:
+            map_name (str): map name as given by game_info
+            max_loops (int): the game ends in a tie at this game loop
+
+        Returns:
+            MockWorld: the world at game loop 0
+        """
+        recorded = {}
+        for name in FIXTURES:
+            path = f"{fixture_dir(map_name)}/{name}.pb"
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    recorded[name] = sc_pb.Response.FromString(f.read())
+        data = recorded["data"].data if "data" in recorded else scripted_data()
+        if "game_info" in recorded:
+            game_info = recorded["game_info"].game_info
+            starts: List[Any] = []
+        else:
+            game_info, starts, bases = scripted_game_info(map_name)
+        world = cls(data, game_info, max_loops)
+        if "observation" in recorded:
+            observation = recorded["observation"].observation.observation
+            world.minerals = observation.player_common.minerals
+            for unit in observation.raw_data.units:
+                world.units[unit.tag] = unit
+                world.next_tag = max(world.next_tag, unit.tag + 1)
+                world.block(unit, True)
+        elif starts:
+            world.setup(starts, bases)
+        else:
+            raise FileNotFoundError(
+                f"{fixture_dir(map_name)} has game info but no observation"
+            )
+        return world
+
+    def setup(self, starts: List[Any], bases: List[Any]) -> None:
+        """
+        Put resources at every base and the usual starting units at both mains.
+
+        Args:
+            starts (List[Any]): our start location, then the enemy's
+            bases (List[Any]): every base
+
+        Returns:
+            None
+        """
+        width, height = self.pathing.shape
+        center = (width / 2, height / 2)
+        for x, y in bases:
+            # the mineral line faces away from the middle of the map
+            facing = atan2(y - center[1], x - center[0])
+            spots = [(7.0, facing + a * pi / 12, "MINERALFIELD") for a in range(-4, 4)]
+            spots += [(7.5, facing + a * pi / 2, "VESPENEGEYSER") for a in (-1, 1)]
+            for distance, angle, name in spots:
+                position = (
+                    round((x + distance * cos(angle)) * 2) / 2,
+                    round((y + distance * sin(angle)) * 2) / 2,
+                )
+                if 0 <= position[0] < width and 0 <= position[1] < height:
+                    self.spawn(UnitTypeId[name], position, "Neutral")
+        for owner, (x, y) in ((1, starts[0]), (2, starts[1])):
+            alliance = "Self" if owner == 1 else "Enemy"
+            self.spawn(UnitTypeId.HATCHERY, (x, y), alliance)
+            self.spawn(UnitTypeId.OVERLORD, (x, y + 4), alliance)
+            for i in range(12):
+                angle = 2 * pi * i / 12
+                position = (x + 4 * cos(angle), y + 4 * sin(angle))
+                self.spawn(UnitTypeId.DRONE, position, alliance)
+            for i in range(MAX_LARVA):
+                self.spawn(UnitTypeId.LARVA, (x + i - 1, y - 2), alliance)
+
+    def spawn(
+        self,
+        type_id: UnitTypeId,
+        position: Any,
+        alliance: str = "Self",
+        build_progress: float = 1.0,
+    ) -> Any:
+        """
+        Add a unit to the world.
+
+        Args:
+            type_id (UnitTypeId): what to add
+            position (Any): (x, y) of the unit
+            alliance (str): Self, Enemy or Neutral
+            build_progress (float): below 1 for a structure being built
+
+        Returns:
+            Unit: the unit's proto, it's the world's state and can be changed
+        """
+        row = TYPES.get(type_id.name, (0, 0, 0, 0, 0, 0, 0.5, 100, 0))
+        unit = raw_pb.Unit(
+            display_type=raw_pb.DisplayType.Value("Visible"),
+            alliance=raw_pb.Alliance.Value(alliance),
+            tag=self.next_tag,
+            unit_type=type_id.value,
+            owner={"Self": 1, "Enemy": 2}.get(alliance, 16),
+            radius=row[6],
+            build_progress=build_progress,
+            cloak=raw_pb.CloakState.Value("NotCloaked"),
+            health=row[7] * max(build_progress, 0.1),
+            health_max=row[7],
+            is_flying=type_id == UnitTypeId.OVERLORD,
+            is_burrowed=type_id == UnitTypeId.CREEPTUMORBURROWED,
+        )
+        unit.pos.x, unit.pos.y = position[0], position[1]
+        if type_id == UnitTypeId.QUEEN:
+            unit.energy, unit.energy_max = 25, 200
+        elif type_id.name == "MINERALFIELD":
+            unit.mineral_contents = 1800
+        elif type_id.name == "VESPENEGEYSER":
+            unit.vespene_contents = 2250
+        self.next_tag += 1
+        self.units[unit.tag] = unit
+        self.block(unit, True)
+        if type_id in CREEP_RADIUS:
+            self.creep_dirty = True
+        return unit
+
+    def footprint(self, type_id: int) -> int:
+        """Return a unit type's footprint edge, 0 if it doesn't block building."""
+        name = UnitTypeId(type_id).name
+        if name in TYPES:
+            return TYPES[name][8]
+        if self.types.get(type_id) and self.types[type_id].has_vespene:
+            return 3
+        return 2 if self.types.get(type_id) and self.types[type_id].has_minerals else 0
+
+    def cells(self, position: Any, size: int) -> Tuple[slice, slice]:
+        """Return the cells a footprint of one size covers at a position."""
+        x, y = int(position[0] - size / 2 + 0.5), int(position[1] - size / 2 + 0.5)
+        return slice(max(x, 0), x + size), slice(max(y, 0), y + size)
+
+    def block(self, unit: Any, blocked: bool) -> None:
+        """Mark a structure or resource's cells as taken, or free them."""
+        size = self.footprint(unit.unit_type)
+        if size > 1:
+            self.blocked[self.cells((unit.pos.x, unit.pos.y), size)] = blocked
+
+    def can_place(self, type_id: int, position: Any) -> bool:
+        """
+        Check whether a structure fits at a position.
+
+        Args:
+            type_id (int): the structure's unit type
+            position (Any): (x, y) of its center
+
+        Returns:
+            bool: True if every cell is placeable and free, and on creep where zerg
+                  needs it
+        """
+        size = max(self.footprint(type_id), 1)
+        x, y = self.cells(position, size)
+        if x.stop > self.placement.shape[0] or y.stop > self.placement.shape[1]:
+            return False
+        if not self.placement[x, y].all() or self.blocked[x, y].any():
+            return False
+        return type_id == UnitTypeId.HATCHERY.value or bool(self.creep[x, y].all())
+
+    def respond(self, request: Any) -> bytes:
+        """
+        Answer one request.
+
+        Args:
+            request (Request): the request the library sent
+
+        Returns:
+            bytes: the serialized Response
+        """
+        kind = request.WhichOneof("request")
+        if kind == "data":
+            return self.data_bytes
+        if kind == "game_info":
+            return self.game_info_bytes
+        response = sc_pb.Response()
+        handler = getattr(self, f"on_{kind}", None)
+        if handler:
+            handler(getattr(request, kind), response)
+        else:
+            getattr(response, kind).SetInParent()
+        if kind == "leave_game":
+            self.status = sc_pb.Status.Value("ended")
+        elif kind == "quit":
+            self.status = sc_pb.Status.Value("quit")
+        response.status = self.status
+        return bytes(response.SerializeToString())
+
+    def on_observation(self, request: Any, response: Any) -> None:
+        """Report the world as it is now."""
+        result = response.observation
+        observation = result.observation
+        observation.game_loop = self.game_loop
+        common = observation.player_common
+        common.player_id = 1
+        common.minerals = int(self.minerals)
+        common.vespene = int(self.vespene)
+        mine = [u for u in self.units.values() if u.alliance == 1]
+        ready = [u for u in mine if u.build_progress >= 1]
+        used = sum(self.types[u.unit_type].food_required for u in mine)
+        used += sum(
+            self.types[product].food_required * count
+            for _, _, product, count in self.production
+            if product > 0
+        )
+        common.food_used = int(used)
+        common.food_cap = int(
+            min(sum(self.types[u.unit_type].food_provided for u in ready), 200)
+        )
+        common.food_workers = sum(u.unit_type == UnitTypeId.DRONE.value for u in mine)
+        common.larva_count = sum(u.unit_type == UnitTypeId.LARVA.value for u in mine)
+        raw = observation.raw_data
+        raw.units.extend(self.units.values())
+        raw.player.upgrade_ids.extend(self.upgrades)
+        if self.creep_dirty:
+            self.spread_creep()
+        raw.map_state.creep.CopyFrom(self.creep_image)
+        raw.map_state.visibility.CopyFrom(self.visibility)
+        result.action_errors.extend(self.errors)
+        self.errors = []
+        if self.game_loop >= self.max_loops:
+            self.status = sc_pb.Status.Value("ended")
+            for player_id in (1, 2):
+                result.player_result.add(
+                    player_id=player_id, result=sc_pb.Result.Value("Tie")
+                )
+
+    def spread_creep(self) -> None:
+        """Put creep around every hatchery and tumor."""
+        self.creep.fill(False)
+        xs, ys = np.ogrid[: self.creep.shape[0], : self.creep.shape[1]]
+        for unit in self.units.values():
+            radius = CREEP_RADIUS.get(UnitTypeId(unit.unit_type))
+            if radius and unit.build_progress >= 1:
+                disk = (xs + 0.5 - unit.pos.x) ** 2 + (ys + 0.5 - unit.pos.y) ** 2
+                self.creep |= disk <= radius ** 2
+        self.creep &= self.pathing
+        self.creep_image = image(self.creep, 1)
+        self.creep_dirty = False
+
+    def on_action(self, request: Any, response: Any) -> None:
+        """Carry out a batch of actions, one result per action."""
+        for action in request.actions:
+            result = SUCCESS
+            if action.action_raw.HasField("unit_command"):
+                command = action.action_raw.unit_command
+                for tag in command.unit_tags:
+                    if tag in self.units:
+                        outcome = self.command(self.units[tag], command)
+                        if outcome != SUCCESS:
+                            result = outcome
+                            self.errors.append(
+                                sc_pb.ActionError(
+                                    unit_tag=tag,
+                                    ability_id=command.ability_id,
+                                    result=outcome,
+                                )
+                            )
+            response.action.result.append(result)
+
+    def command(self, unit: Any, command: Any) -> int:
+        """
+        Carry out one unit's part of a command.
+
+        Args:
+            unit (Unit): proto of the unit given the command
+            command (ActionRawUnitCommand): the command
+
+        Returns:
+            int: ActionResult
+        """
+        ability = command.ability_id
+        if unit.energy < ENERGY_COST.get(ability, 0):
+            return action_result("NotEnoughEnergy")
+        unit.energy -= ENERGY_COST.get(ability, 0)
+        target = None
+        if command.HasField("target_world_space_pos"):
+            point = command.target_world_space_pos
+            target = (point.x, point.y)
+        elif command.target_unit_tag in self.units:
+            other = self.units[command.target_unit_tag]
+            target = (other.pos.x, other.pos.y)
+        if ability in self.creates:
+            return self.produce(unit, ability, self.creates[ability], target)
+        if ability in self.upgrade_data:
+            upgrade = self.upgrade_data[ability]
+            if self.minerals < upgrade.mineral_cost:
+                return action_result("NotEnoughMinerals")
+            if self.vespene < upgrade.vespene_cost:
+                return action_result("NotEnoughVespene")
+            self.minerals -= upgrade.mineral_cost
+            self.vespene -= upgrade.vespene_cost
+            done = self.game_loop + int(upgrade.research_time)
+            self.production.append((done, unit.tag, -upgrade.upgrade_id, 1))
+            unit.orders.add(ability_id=ability)
+            return SUCCESS
+        if ability == AbilityId.EFFECT_INJECTLARVA.value:
+            done = self.game_loop + INJECT_LOOPS
+            self.production.append(
+                (done, command.target_unit_tag, UnitTypeId.LARVA.value, 3)
+            )
+            return SUCCESS
+        if target and self.types[unit.unit_type].movement_speed > 0:
+            self.destinations[unit.tag] = target
+            del unit.orders[:]
+            if ability in self.abilities:
+                order = unit.orders.add(ability_id=ability)
+                order.target_world_space_pos.x, order.target_world_space_pos.y = target
+        return SUCCESS
+
+    def produce(self, unit: Any, ability: int, product: int, target: Any) -> int:
+        """
+        Start a unit, structure or tumor.
+
+        Args:
+            unit (Unit): the larva, drone, townhall, queen or tumor making it
+            ability (int): the ability used
+            product (int): unit type made
+            target (Any): (x, y) to build at, None for units
+
+        Returns:
+            int: ActionResult
+        """
+        data = self.types[product]
+        count = 2 if product == UnitTypeId.ZERGLING.value else 1
+        structure = self.footprint(product) > 0 or UnitTypeId(product) in TUMORS
+        drone = unit.unit_type == UnitTypeId.DRONE.value
+        # structure costs include the drone
+        minerals = data.mineral_cost * count - (50 if structure and drone else 0)
+        if self.minerals < minerals:
+            return action_result("NotEnoughMinerals")
+        if self.vespene < data.vespene_cost * count:
+            return action_result("NotEnoughVespene")
+        if not structure:
+            used = sum(
+                self.types[u.unit_type].food_required
+                for u in self.units.values()
+                if u.alliance == 1
+            )
+            cap = sum(
+                self.types[u.unit_type].food_provided
+                for u in self.units.values()
+                if u.alliance == 1 and u.build_progress >= 1
+            )
+            if data.food_required * count > cap - used:
+                return action_result("NotEnoughFood")
+        if structure:
+            if target is None:
+                return action_result("Error")
+            if UnitTypeId(product) in TUMORS:
+                if unit.tag in self.spent_tumors:
+                    return action_result("Error")
+                product = UnitTypeId.CREEPTUMORBURROWED.value
+                if unit.unit_type == product:
+                    self.spent_tumors.add(unit.tag)
+            elif product != UnitTypeId.EXTRACTOR.value and not self.can_place(
+                product, target
+            ):
+                return action_result("CantBuildLocationInvalid")
+            if drone:
+                # the drone turns into the building
+                self.destinations.pop(unit.tag, None)
+                del self.units[unit.tag]
+            self.spawn(UnitTypeId(product), target, build_progress=0.0)
+        elif unit.unit_type == UnitTypeId.LARVA.value:
+            unit.unit_type = UnitTypeId.EGG.value
+            unit.orders.add(ability_id=ability)
+            done = self.game_loop + int(data.build_time)
+            self.production.append((done, unit.tag, product, count))
+        else:
+            unit.orders.add(ability_id=ability)
+            done = self.game_loop + int(data.build_time)
+            self.production.append((done, unit.tag, product, count))
+        self.minerals -= minerals
+        self.vespene -= data.vespene_cost * count
+        return SUCCESS
+
+    def on_query(self, request: Any, response: Any) -> None:
+        """Answer pathing, placement and available ability queries."""
+        query = response.query
+        for pathing in request.pathing:
+            if pathing.HasField("start_pos"):
+                start = (pathing.start_pos.x, pathing.start_pos.y)
+            else:
+                unit = self.units.get(pathing.unit_tag)
+                start = (unit.pos.x, unit.pos.y) if unit else pathing.end_pos
+            end = (pathing.end_pos.x, pathing.end_pos.y)
+            inside = 0 <= end[0] < self.pathing.shape[0] and (
+                0 <= end[1] < self.pathing.shape[1]
+            )
+            reachable = inside and self.pathing[int(end[0]), int(end[1])]
+            distance = hypot(end[0] - start[0], end[1] - start[1])
+            query.pathing.add(distance=distance if reachable else 0)
+        for placement in request.placements:
+            product = self.creates.get(placement.ability_id, 0)
+            position = (placement.target_pos.x, placement.target_pos.y)
+            placeable = product and self.can_place(product, position)
+            query.placements.add(
+                result=SUCCESS
+                if placeable
+                else action_result("CantBuildLocationInvalid")
+            )
+        for asked in request.abilities:
+            unit = self.units.get(asked.unit_tag)
+            answer = query.abilities.add(unit_tag=asked.unit_tag)
+            if unit:
+                answer.unit_type_id = unit.unit_type
+                ignore = request.ignore_resource_requirements
+                for ability in self.available(unit, ignore):
+                    answer.abilities.add(ability_id=ability)
+
+    def available(self, unit: Any, ignore_resources: bool) -> List[int]:
+        """
+        List the abilities a unit can use right now.
+
+        Args:
+            unit (Unit): the unit's proto
+            ignore_resources (bool): don't leave out what we can't afford
+
+        Returns:
+            List[int]: ability ids
+        """
+        if unit.build_progress < 1:
+            return []
+        type_id = UnitTypeId(unit.unit_type)
+        abilities = []
+        if self.types[unit.unit_type].movement_speed > 0:
+            abilities += [AbilityId.MOVE.value, AbilityId.STOP.value]
+        ready = {
+            u.unit_type
+            for u in self.units.values()
+            if u.alliance == 1 and u.build_progress >= 1
+        }
+        if type_id == UnitTypeId.CREEPTUMORBURROWED:
+            if unit.tag not in self.spent_tumors:
+                abilities.append(AbilityId.BUILD_CREEPTUMOR_TUMOR.value)
+            return abilities
+        if type_id == UnitTypeId.QUEEN and unit.energy >= 25:
+            abilities.append(AbilityId.EFFECT_INJECTLARVA.value)
+        for product, info in TRAIN_INFO.get(type_id, {}).items():
+            ability = info["ability"].value
+            needed = info.get("requires_tech_building")
+            if needed and needed.value not in ready:
+                continue
+            if unit.energy < ENERGY_COST.get(ability, 0):
+                continue
+            data = self.types.get(product.value)
+            if not ignore_resources and data and data.mineral_cost > self.minerals:
+                continue
+            abilities.append(ability)
+        return abilities
+
+    def on_step(self, request: Any, response: Any) -> None:
+        """Advance the world by the requested number of game loops."""
+        loops = request.count or 1
+        self.game_loop += loops
+        mine = [u for u in self.units.values() if u.alliance == 1]
+        drones = sum(u.unit_type == UnitTypeId.DRONE.value for u in mine)
+        self.minerals += MINING_RATE * drones * loops
+        for unit in mine:
+            data = self.types[unit.unit_type]
+            if unit.build_progress < 1:
+                progress = loops / max(data.build_time, 1)
+                unit.build_progress = min(unit.build_progress + progress, 1.0)
+                unit.health = max(unit.health, unit.health_max * unit.build_progress)
+                if unit.build_progress >= 1 and unit.unit_type in CREEP_RADIUS:
+                    self.creep_dirty = True
+            elif unit.unit_type == UnitTypeId.HATCHERY.value:
+                self.grow_larva(unit, loops)
+            if unit.energy_max:
+                unit.energy = min(unit.energy + ENERGY_RATE * loops, unit.energy_max)
+        self.walk(loops)
+        finished = [entry for entry in self.production if entry[0] <= self.game_loop]
+        if finished:
+            self.production = [e for e in self.production if e[0] > self.game_loop]
+            for entry in finished:
+                self.finish(*entry[1:])
+
+    def grow_larva(self, hatchery: Any, loops: int) -> None:
+        """Add a larva to a hatchery every LARVA_LOOPS while it has fewer than 3."""
+        larva = [
+            u
+            for u in self.units.values()
+            if u.unit_type == UnitTypeId.LARVA.value
+            and hypot(u.pos.x - hatchery.pos.x, u.pos.y - hatchery.pos.y) < 4
+        ]
+        if len(larva) >= MAX_LARVA:
+            self.larva_timers[hatchery.tag] = 0
+            return
+        waited = self.larva_timers.get(hatchery.tag, 0) + loops
+        if waited >= LARVA_LOOPS:
+            waited -= LARVA_LOOPS
+            offset = len(larva) - 1
+            self.spawn(UnitTypeId.LARVA, (hatchery.pos.x + offset, hatchery.pos.y - 2))
+        self.larva_timers[hatchery.tag] = waited
+
+    def walk(self, loops: int) -> None:
+        """Move every unit with somewhere to go, in a straight line."""
+        for tag, (x, y) in list(self.destinations.items()):
+            unit = self.units.get(tag)
+            if not unit:
+                del self.destinations[tag]
+                continue
+            step = self.types[unit.unit_type].movement_speed / LOOPS_PER_SECOND * loops
+            dx, dy = x - unit.pos.x, y - unit.pos.y
+            distance = hypot(dx, dy)
+            if distance <= step:
+                unit.pos.x, unit.pos.y = x, y
+                del self.destinations[tag]
+                del unit.orders[:]
+            else:
+                unit.pos.x += dx / distance * step
+                unit.pos.y += dy / distance * step
+
+    def finish(self, producer: int, product: int, count: int) -> None:
+        """
+        Complete something that was being made.
+
+        Args:
+            producer (int): tag of the egg, structure or hatchery it came from
+            product (int): unit type made, -upgrade id for research
+            count (int): how many units
+
+        Returns:
+            None
+        """
+        unit = self.units.get(producer)
+        if not unit:
+            return
+        if product < 0:
+            self.upgrades.append(-product)
+        elif unit.unit_type == UnitTypeId.EGG.value:
+            del self.units[producer]
+            for i in range(count):
+                self.spawn(UnitTypeId(product), (unit.pos.x + i * 0.5, unit.pos.y))
+        else:
+            for i in range(count):
+                position = (unit.pos.x + i - 1, unit.pos.y - 2)
+                self.spawn(UnitTypeId(product), position)
+        if unit.orders:
+            del unit.orders[0]
+
+
+class MockWebSocket:
+    """Just enough of aiohttp's websocket for sc2.protocol, backed by a MockWorld."""
+
+    def __init__(self, world: MockWorld) -> None:
+        """
+        Connect to a world.
+
+        Args:
+            world (MockWorld): the world that answers requests
+
+        Returns:
+            None
+        """
+        self.world = world
+        self.closed = False
+        self.pending: bytes = b""
+        # seconds from each observation to the step that followed it
+        self.step_times: List[float] = []
+        self.observed_at: float = None
+
+    async def send_bytes(self, data: bytes) -> None:
+        """Answer a request right away, the answer is picked up by receive_bytes."""
+        request = sc_pb.Request.FromString(data)
+        kind = request.WhichOneof("request")
+        if kind == "step" and self.observed_at is not None:
+            self.step_times.append(time.perf_counter() - self.observed_at)
+        self.pending = self.world.respond(request)
+        if kind == "observation":
+            self.observed_at = time.perf_counter()
+
+    async def receive_bytes(self) -> bytes:
+        """Return the answer to the last request."""
+        return self.pending
+
+    async def close(self) -> None:
+        """Close the connection."""
+        self.closed = True
+
+
+class Recorder(Paul):
+    """Paul, saving what the game answers at the start for the mock to use."""
+
+    async def on_start(self) -> None:
+        """
+        Save the game data, game info and first observation, then start as usual.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        directory = fixture_dir(self._game_info.map_name)
+        os.makedirs(directory, exist_ok=True)
+        responses = {
+            "data": await self._client._execute(
+                data=sc_pb.RequestData(
+                    ability_id=True,
+                    unit_type_id=True,
+                    upgrade_id=True,
+                    buff_id=True,
+                    effect_id=True,
+                )
+            ),
+            "game_info": await self._client._execute(
+                game_info=sc_pb.RequestGameInfo()
+            ),
+            "observation": await self._client._execute(
+                observation=sc_pb.RequestObservation()
+            ),
+        }
+        for name, response in responses.items():
+            with open(f"{directory}/{name}.pb", "wb") as f:
+                f.write(response.SerializeToString())
+        await super().on_start()
+
+
+async def run(map_name: str, max_loops: int, bot: Any) -> Tuple[Any, List[float]]:
+    """
+    Play one game against the mock.
+
+    Args:
+        map_name (str): map name as given by game_info
+        max_loops (int): the game ends in a tie at this game loop
+        bot (BotAI): the bot to run
+
+    Returns:
+        Tuple[Result, List[float]]: the result and the seconds each step took
+    """
+    socket = MockWebSocket(MockWorld.load(map_name, max_loops))
+    client = Client(socket)
+    client._player_id = 1
+    result = await _play_game_ai(client, 1, bot, False, None, None)
+    return result, socket.step_times
+
+
+def main() -> None:
+    """Run Paul against the mock and report step times, or record fixtures."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--map", default="Triton LE", help="map name")
+    parser.add_argument(
+        "--loops", type=int, default=13440, help="game loops to play (13440 = 10 min)"
+    )
+    parser.add_argument(
+        "--record", action="store_true", help="record fixtures in a real game"
+    )
+    parser.add_argument(
+        "--capture", action="store_true", help="write a frame capture to captures/"
+    )
+    parser.add_argument(
+        "--memory",
+        type=int,
+        default=0,
+        help="game loops between memory samples written to memory/, 0 for none",
+    )
+    parser.add_argument(
+        "--visualize",
+        choices=("window", "png"),
+        default="",
+        help="draw the grids live in a window or as PNG frames in visuals/",
+    )
+    args = parser.parse_args()
+    if args.record:
+        sc2.run_game(
+            sc2.maps.get(args.map.replace(" ", "")),
+            [Bot(Race.Zerg, Recorder()), Computer(Race.Protoss, Difficulty.Hard)],
+            realtime=False,
+            game_time_limit=1,
+        )
+        return
+    start = time.perf_counter()
+    result, step_times = asyncio.run(
+        run(
+            args.map,
+            args.loops,
+            Paul(
+                capture=args.capture,
+                memory_interval=args.memory,
+                visualize=args.visualize,
+            ),
+        )
+    )
+    total = time.perf_counter() - start
+    times = np.array(step_times) * 1000
+    print(f"{result} after {args.loops} loops, {len(times)} steps in {total:.1f} s")
+    if len(times):
+        p50, p95, p99 = np.percentile(times, [50, 95, 99])
+        print(
+            f"step ms: mean {times.mean():.2f} p50 {p50:.2f} p95 {p95:.2f} "
+            f"p99 {p99:.2f} max {times.max():.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
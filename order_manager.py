@@ -0,0 +1,120 @@
+"""Filter out repeated unit orders and batch the rest."""
+from typing import Any, Dict, List, Tuple
+
+from sc2.ids.ability_id import AbilityId
+from sc2.position import Point2
+from sc2.unit import Unit
+from sc2.unit_command import UnitCommand
+
+# (ability, target) as remembered per unit tag
+OrderKey = Tuple[AbilityId, Any]
+
+
+class OrderManager:
+    """Remember the last order given to each unit."""
+
+    def __init__(self) -> None:
+        """
+        Set up variables for use within OrderManager.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.last_orders: Dict[int, OrderKey] = {}
+        self.skipped: int = 0  # redundant orders dropped this game
+
+    @staticmethod
+    def order_key(action: UnitCommand) -> OrderKey:
+        """
+        Reduce a command to a hashable (ability, target) pair.
+
+        Args:
+            action (UnitCommand): the command being issued
+
+        Returns:
+            OrderKey: ability and target tag, rounded position or None
+        """
+        target = action.target
+        if isinstance(target, Unit):
+            return action.ability, target.tag
+        if isinstance(target, Point2):
+            return action.ability, (round(target.x, 2), round(target.y, 2))
+        return action.ability, target
+
+    def is_redundant(self, action: UnitCommand) -> bool:
+        """
+        Check if the unit is already carrying out this exact order.
+
+        Queued commands are never redundant. An idle unit has finished or lost its
+        last order, so it always gets the command again.
+
+        Args:
+            action (UnitCommand): the command being issued
+
+        Returns:
+            bool: True if the command can be skipped
+        """
+        if action.queue or not action.unit.orders:
+            return False
+        if self.last_orders.get(action.unit.tag) == self.order_key(action):
+            self.skipped += 1
+            return True
+        return False
+
+    def record(self, action: UnitCommand) -> None:
+        """
+        Store the command as the unit's last order.
+
+        Args:
+            action (UnitCommand): the command that was issued
+
+        Returns:
+            None
+        """
+        if not action.queue:
+            self.last_orders[action.unit.tag] = self.order_key(action)
+
+    def forget(self, unit_tag: int) -> None:
+        """
+        Drop a unit's last order.
+
+        Args:
+            unit_tag (int): tag of the unit that's gone
+
+        Returns:
+            None
+        """
+        self.last_orders.pop(unit_tag, None)
+
+    def batch(self, actions: List[UnitCommand]) -> List[UnitCommand]:
+        """
+        Put identical orders next to each other so they combine into one command.
+
+        The library only merges neighbouring commands with the same ability, target
+        and queue flag, so this keeps the first-seen order of each group. A unit's
+        own commands stay in the order they were given: one only joins an earlier
+        group if none of that unit's previous commands went into a later group,
+        otherwise it starts a new group.
+
+        Args:
+            actions (List[UnitCommand]): this frame's commands
+
+        Returns:
+            List[UnitCommand]: the same commands, grouped
+        """
+        groups: List[List[UnitCommand]] = []
+        # latest group per (order, queue) and the group of each unit's last command
+        open_groups: Dict[Tuple[OrderKey, bool], int] = {}
+        unit_groups: Dict[int, int] = {}
+        for action in actions:
+            key = (self.order_key(action), action.queue)
+            index = open_groups.get(key)
+            if index is None or unit_groups.get(action.unit.tag, -1) > index:
+                index = open_groups[key] = len(groups)
+                groups.append([])
+            groups[index].append(action)
+            unit_groups[action.unit.tag] = index
+        return [action for group in groups for action in group]
@@ -0,0 +1,279 @@
+"""
+Spread overlords where they see the most of what matters.
+
+Which spots are worth watching is worked out once per map. Cells near expansions,
+ramps and along the ground routes between start locations get a weight. Every
+candidate spot on a coarse lattice gets its vision footprint over those cells as
+a bitmask. Both are saved to map_grids/{map_name}_vision.npz. In game, each new
+overlord takes the spot that adds the most uncovered weight, greedily, and a dead
+overlord hands its cells back. Only the gains of the spots that see the changed
+cells are updated, so nothing is recomputed per frame.
+
+Build the files for every map with stored key points:
+    python overlord_scouting.py
+"""
+import os
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from base_distances import EXPANSION, RAMP, START, BaseDistances, points_file
+from grid_stack import load_grid, stored_maps
+
+OVERLORD_SIGHT = 11
+# cells between candidate spots
+CANDIDATE_STEP = 4
+# weight per cell near each kind of key point, and along routes between starts
+KEY_POINT_WEIGHTS = {EXPANSION: (8, 4.0), RAMP: (4, 3.0)}
+ROUTE_WIDTH = 3
+ROUTE_WEIGHT = 2.0
+# spots this close to an enemy start get the overlord killed
+ENEMY_START_DISTANCE = 30
+
+Spot = Tuple[float, float]
+
+
+def vision_file(map_name: str) -> str:
+    """Return where a map's overlord vision table is stored."""
+    return f"map_grids/{map_name}_vision.npz"
+
+
+def stamp(weights: Any, points: Iterable[Any], radius: float, weight: float) -> None:
+    """
+    Raise the weight of every cell within radius of any of the points.
+
+    Args:
+        weights (ndarray): float32 weight per cell, [x][y], changed in place
+        points (Iterable[Any]): (x, y) centers
+        radius (float): reach of each point
+        weight (float): the weight to raise cells to
+
+    Returns:
+        None
+    """
+    width, height = weights.shape
+    reach = int(np.ceil(radius))
+    for x, y in points:
+        x0, y0 = max(int(x) - reach, 0), max(int(y) - reach, 0)
+        x1, y1 = min(int(x) + reach + 1, width), min(int(y) + reach + 1, height)
+        xs = np.arange(x0, x1)[:, None] + 0.5 - x
+        ys = np.arange(y0, y1)[None, :] + 0.5 - y
+        view = weights[x0:x1, y0:y1]
+        view[(xs ** 2 + ys ** 2 <= radius ** 2) & (view < weight)] = weight
+
+
+class VisionTable:
+    """Weighted cells and the vision footprint of every candidate spot on a map."""
+
+    def __init__(self, tables: Any) -> None:
+        """
+        Wrap loaded or freshly built tables.
+
+        Args:
+            tables (Any): mapping with spots, cells, weights and footprints
+
+        Returns:
+            None
+        """
+        self.spots = np.asarray(tables["spots"], dtype=float)
+        self.cells = np.asarray(tables["cells"])
+        self.weights = np.asarray(tables["weights"], dtype=float)
+        self.packed = np.asarray(tables["footprints"])
+        # (spots, cells) bool, what each spot sees
+        self.footprints = np.unpackbits(
+            self.packed, axis=1, count=len(self.cells)
+        ).astype(bool)
+
+    @classmethod
+    def build(
+        cls,
+        pathing: Any,
+        key_points: Any,
+        routes: Iterable[List[Tuple[int, int]]] = (),
+    ) -> Any:
+        """
+        Work out the table for a map.
+
+        Args:
+            pathing (ndarray): pathing grid indexed [x][y], sets the map's size
+            key_points (ndarray): (n, 3) x, y and kind rows, as in the points file
+            routes (Iterable[List[Tuple[int, int]]]): ground routes between start
+                                                      locations, None if unknown
+
+        Returns:
+            VisionTable: the table
+        """
+        width, height = pathing.shape
+        weights = np.zeros((width, height), dtype=np.float32)
+        key_points = np.asarray(key_points).reshape(-1, 3)
+        for kind, (radius, weight) in KEY_POINT_WEIGHTS.items():
+            stamp(weights, key_points[key_points[:, 2] == kind, :2], radius, weight)
+        for route in routes:
+            if route:
+                stamp(weights, route, ROUTE_WIDTH, ROUTE_WEIGHT)
+        xs, ys = np.nonzero(weights)
+        # column of each weighted cell, -1 for the rest
+        columns = np.full((width, height), -1, dtype=np.int32)
+        columns[xs, ys] = np.arange(len(xs))
+        start = CANDIDATE_STEP // 2
+        spots = []
+        footprints = []
+        # vision is a circle, overlords see over cliffs
+        for x in range(start, width, CANDIDATE_STEP):
+            for y in range(start, height, CANDIDATE_STEP):
+                x0, y0 = max(x - OVERLORD_SIGHT, 0), max(y - OVERLORD_SIGHT, 0)
+                x1 = min(x + OVERLORD_SIGHT + 1, width)
+                y1 = min(y + OVERLORD_SIGHT + 1, height)
+                dx = np.arange(x0, x1)[:, None] + 0.5 - x
+                dy = np.arange(y0, y1)[None, :] + 0.5 - y
+                window = columns[x0:x1, y0:y1]
+                in_sight = dx ** 2 + dy ** 2 <= OVERLORD_SIGHT ** 2
+                seen = window[in_sight & (window >= 0)]
+                if len(seen):
+                    footprint = np.zeros(len(xs), dtype=bool)
+                    footprint[seen] = True
+                    spots.append((x, y))
+                    footprints.append(footprint)
+        return cls(
+            {
+                "spots": np.array(spots, dtype=np.float32).reshape(-1, 2),
+                "cells": np.column_stack((xs, ys)).astype(np.int16),
+                "weights": weights[xs, ys],
+                "footprints": np.packbits(
+                    np.array(footprints, dtype=bool).reshape(-1, len(xs)), axis=1
+                ),
+            }
+        )
+
+    @classmethod
+    def load(cls, map_name: str) -> Any:
+        """
+        Load a map's table.
+
+        Args:
+            map_name (str): map name as given by game_info
+
+        Returns:
+            VisionTable: the table, None if it hasn't been built for this map
+        """
+        if not os.path.exists(vision_file(map_name)):
+            return None
+        with np.load(vision_file(map_name)) as tables:
+            return cls(tables)
+
+    def save(self, map_name: str) -> None:
+        """
+        Store the table for later games.
+
+        Args:
+            map_name (str): map name as given by game_info
+
+        Returns:
+            None
+        """
+        np.savez(
+            vision_file(map_name),
+            spots=self.spots.astype(np.float32),
+            cells=self.cells,
+            weights=self.weights.astype(np.float32),
+            footprints=self.packed,
+        )
+
+
+class OverlordPlanner:
+    """Greedy weighted max coverage of the vision table, one overlord at a time."""
+
+    def __init__(self, table: VisionTable, enemy_starts: Iterable[Any] = ()) -> None:
+        """
+        Start with every spot free.
+
+        Args:
+            table (VisionTable): the map's table
+            enemy_starts (Iterable[Any]): (x, y) of start locations to stay away from
+
+        Returns:
+            None
+        """
+        self.table = table
+        # overlords seeing each cell
+        self.seen_by = np.zeros(len(table.cells), dtype=np.int32)
+        # uncovered weight each spot would add
+        self.gains = np.array(
+            [table.weights[footprint].sum() for footprint in table.footprints]
+        )
+        for start in enemy_starts:
+            offsets = table.spots - np.array([start[0], start[1]])
+            near = np.einsum("ij,ij->i", offsets, offsets) < ENEMY_START_DISTANCE ** 2
+            self.gains[near] = -np.inf
+        self.assignments: Dict[int, int] = {}  # overlord tag -> spot row
+
+    def assign(self, tag: int) -> Spot:
+        """
+        Give an overlord the spot that adds the most uncovered weight.
+
+        Args:
+            tag (int): the overlord
+
+        Returns:
+            Spot: where to send it, None if no spot adds anything
+        """
+        spot = self.assignments.get(tag)
+        if spot is None:
+            if not len(self.gains):
+                return None
+            spot = int(np.argmax(self.gains))
+            if self.gains[spot] <= 0:
+                return None
+            self.assignments[tag] = spot
+            self.update(spot, 1)
+        x, y = self.table.spots[spot]
+        return float(x), float(y)
+
+    def release(self, tag: int) -> None:
+        """Hand a dead overlord's cells back to the other spots."""
+        spot = self.assignments.pop(tag, None)
+        if spot is not None:
+            self.update(spot, -1)
+
+    def update(self, spot: int, change: int) -> None:
+        """
+        Add or remove one overlord at a spot and fix the gains it affects.
+
+        Args:
+            spot (int): row of the spot
+            change (int): 1 for an overlord arriving, -1 for one leaving
+
+        Returns:
+            None
+        """
+        cells = np.flatnonzero(self.table.footprints[spot])
+        before = self.seen_by[cells] > 0
+        self.seen_by[cells] += change
+        # only cells that went from unseen to seen or back change any gain
+        flipped = cells[before != (self.seen_by[cells] > 0)]
+        if not len(flipped):
+            return
+        delta = self.table.footprints[:, flipped] @ self.table.weights[flipped]
+        self.gains -= change * delta
+
+
+def main() -> None:
+    """Build vision tables for every map with a stored grid and key points."""
+    for map_name in stored_maps():
+        if not os.path.exists(points_file(map_name)):
+            continue
+        points = np.load(points_file(map_name))
+        distances = BaseDistances.load(map_name)
+        starts = points[points[:, 2] == START, :2]
+        routes: List[List[Tuple[int, int]]] = []
+        if distances:
+            for i, start in enumerate(starts):
+                later = i + 1
+                routes.extend(distances.route(start, end) for end in starts[later:])
+        table = VisionTable.build(load_grid(map_name) != 0, points, routes)
+        table.save(map_name)
+        print(f"{map_name}: {len(table.spots)} spots over {len(table.cells)} cells")
+
+
+if __name__ == "__main__":
+    main()
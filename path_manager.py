@@ -1,7 +1,7 @@
 """Manage pathing for Paul."""
-import os
 from math import floor
-from typing import Any, Dict
+from threading import Lock
+from typing import Any, Dict, Hashable, List, Tuple
 
 import numpy as np
 from mypy_extensions import TypedDict
@@ -13,17 +13,66 @@ from sc2.ids.unit_typeid import UnitTypeId
 from sc2.position import Point2
 from sc2.unit import Unit
 
-from sc2pathlib import PathFind
+from base_distances import BaseDistances
+from cluster_graph import CLUSTER_SIZE, ClusterGraph, octile
+from grid_stack import PATHING, GridStack, save_grid
+from job_queue import JobQueue
+from lazy_import import lazy_import
 
-# used for self.pathing_dict
-PathDict = TypedDict("PathDict", {"path": list, "step": int})
+sc2pathlib = lazy_import("sc2pathlib")
+
+# used for self.pathing_dict: path holds the corners of the current segment, step
+# the corner being walked to, leg its length, loop when it was started,
+# waypoints the coarse route left after path, creep whether it's creep weighted and
+# segment the owner of the request for the next segment, None once it's delivered
+PathDict = TypedDict(
+    "PathDict",
+    {
+        "path": list,
+        "step": int,
+        "leg": float,
+        "loop": int,
+        "waypoints": list,
+        "creep": bool,
+        "segment": Any,
+    },
+)
+
+# what a path request returns: every cell, just the corners, or find_route's corners
+# and coarse waypoints
+PATH = "path"
+CORNERS = "corners"
+ROUTE = "route"
+# (kind, start cell, destination cell, creep)
+RequestKey = Tuple[str, Tuple[int, int], Tuple[int, int], bool]
+# most requests solved in one batch, the rest wait for the next one
+MAX_PATHS_PER_BATCH = 16
+BATCH_JOB = "path_batch"
+
+# unit speeds are per game second on normal, which is 16 game loops
+LOOPS_PER_SECOND = 16
+# a unit this close to its corner moves on to the next one
+ARRIVAL_DISTANCE = 2
+
+# routes longer than this are planned on the cluster graph first
+HIERARCHICAL_DISTANCE = 64
+
+# cell costs for creep weighted paths, queens are about 2.7 times faster on creep
+CREEP_COST = 10
+OFF_CREEP_COST = 27
+# game loops between pushes of the cost grid to the pathfinder
+CREEP_PUSH_INTERVAL = 22
 
 
 class PathManager:
     """Manage unit pathing."""
 
     def __init__(
-        self, raw_game_data: Any, raw_game_info: Any, raw_observation: Any
+        self,
+        raw_game_data: Any,
+        raw_game_info: Any,
+        raw_observation: Any,
+        jobs: JobQueue = None,
     ) -> None:
         """
         Set up variables for use within PathMangager.
@@ -32,6 +81,7 @@ class PathManager:
             raw_game_data (Any): self.game_data from main instance
             raw_game_info (Any): self.game_info from main instance
             raw_observation (Any): self.game_state from main instance
+            jobs (JobQueue): thread pool for path queries, None to path inline
 
         Returns:
             None
@@ -47,41 +97,492 @@ class PathManager:
         self.bot._prepare_step(state=game_state, proto_game_info=raw_game_info)
         map_name = game_info.map_name
         self.pathing_dict: Dict[int, PathDict] = {}
-        map_width = game_info.map_size.width
-        map_height = game_info.map_size.height
-        raw_grid = np.zeros((map_width, map_height))
-        for x in range(map_width):
-            for y in range(map_height):
-                pos = Point2((x, y))
-                raw_grid[x][y] = game_info.pathing_grid[pos]
-        self.map_grid = np.rot90(raw_grid.astype(int))
-        np.save(f"map_grids/{map_name}_grid", self.map_grid)
-        self.pf = PathFind(self.map_grid)
-
-    def add_to_path_dict(self, unit: Unit, destination: Point2) -> None:
+        # every grid is indexed [x][y], map_grid is the pathing layer as uint8
+        self.grids = GridStack.from_game_info(game_info)
+        self.map_grid = self.grids.data[PATHING]
+        save_grid(map_name, self.map_grid)
+        self.pf = sc2pathlib.PathFind(self.map_grid)
+        self.pf_lock = Lock()
+        self.jobs = jobs
+        # built by the first long find_route, in a worker when there's a job queue
+        self.clusters: Any = None  # ClusterGraph
+        self.clusters_lock = Lock()
+        # creep weighted costs, kept in step with the creep bitmap by update_creep
+        self.creep_grid = np.zeros(self.map_grid.shape, dtype=bool)
+        self.cost_grid = np.where(self.map_grid != 0, OFF_CREEP_COST, 0)
+        self.creep_pf = sc2pathlib.PathFind(self.cost_grid)
+        self.creep_pf_lock = Lock()
+        self.creep_pushed_loop = 0
+        self.creep_dirty = True
+        # built offline by base_distances.py, None until then
+        self.base_distances = BaseDistances.load(map_name)
+        # path service: queued requests, who is waiting on what, delivered results
+        # and the requests in the batch being solved
+        self.path_requests: Dict[RequestKey, None] = {}
+        self.path_owners: Dict[Hashable, RequestKey] = {}
+        self.path_results: Dict[RequestKey, Any] = {}
+        self.solving: Dict[RequestKey, None] = {}
+        # structures and rocks standing on the grid: tag -> lower left cell and a
+        # bool mask of the cells under it to reopen once it's gone
+        self.blockers: Dict[int, Tuple[int, int, Any]] = {}
+
+    def update_creep(self, creep_grid: Any, game_loop: int) -> None:
+        """
+        Apply creep changes to the cost grid and push it to the pathfinder.
+
+        Only changed cells are rewritten. The whole grid goes to the pathfinder in
+        one assignment, at most once every CREEP_PUSH_INTERVAL game loops.
+
+        Args:
+            creep_grid (ndarray): the creep layer of grids
+            game_loop (int): current game loop
+
+        Returns:
+            None
+        """
+        changed = (creep_grid != 0) != self.creep_grid
+        if changed.any():
+            self.creep_grid[changed] = ~self.creep_grid[changed]
+            self.cost_grid[changed] = np.where(
+                self.creep_grid[changed], CREEP_COST, OFF_CREEP_COST
+            ) * (self.map_grid[changed] != 0)
+            self.creep_dirty = True
+        if self.creep_dirty and (
+            game_loop - self.creep_pushed_loop >= CREEP_PUSH_INTERVAL
+        ):
+            weights = self.cost_grid.tolist()
+            with self.creep_pf_lock:
+                self.creep_pf.map = weights
+            self.creep_pushed_loop = game_loop
+            self.creep_dirty = False
+
+    def find_path(
+        self, start: Point2, destination: Point2, creep: bool = False
+    ) -> List[Tuple[int, int]]:
+        """
+        Find a path between two points, safe to call from worker threads.
+
+        Args:
+            start (Point2): where the path starts
+            destination (Point2): where the path ends
+            creep (bool): prefer creep, for units that are much faster on it
+
+        Returns:
+            List[Tuple[int, int]]: grid cells along the path, empty if none
+        """
+        floored_start = (floor(start[0]), floor(start[1]))
+        floored_dest = (floor(destination[0]), floor(destination[1]))
+        path: List[Tuple[int, int]]
+        if creep:
+            with self.creep_pf_lock:
+                path, _ = self.creep_pf.find_path_influence(floored_start, floored_dest)
+        else:
+            with self.pf_lock:
+                path, _ = self.pf.find_path(floored_start, floored_dest)
+        return path
+
+    def segment_goal(
+        self, start: Point2, waypoints: List[Tuple[int, int]]
+    ) -> Tuple[Tuple[int, int], List[Tuple[int, int]]]:
+        """
+        Pick the first coarse waypoint that's at least a cluster away.
+
+        Args:
+            start (Point2): where the segment starts
+            waypoints (List[Tuple[int, int]]): coarse route still to follow
+
+        Returns:
+            Tuple[Tuple[int, int], List]: the waypoint and the waypoints after it
+        """
+        k = len(waypoints) - 1
+        for i, waypoint in enumerate(waypoints):
+            if octile((floor(start[0]), floor(start[1])), waypoint) >= CLUSTER_SIZE:
+                k = i
+                break
+        remaining = k + 1
+        return waypoints[k], waypoints[remaining:]
+
+    def next_segment(
+        self, start: Point2, waypoints: List[Tuple[int, int]], creep: bool = False
+    ) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """
+        Path to the first coarse waypoint that's at least a cluster away.
+
+        Args:
+            start (Point2): where the segment starts
+            waypoints (List[Tuple[int, int]]): coarse route still to follow
+            creep (bool): prefer creep
+
+        Returns:
+            Tuple[List, List]: full resolution segment and the waypoints after it
+        """
+        goal, rest = self.segment_goal(start, waypoints)
+        return self.compress(self.find_path(start, goal, creep)), rest
+
+    def request_path(
+        self,
+        owner: Hashable,
+        start: Point2,
+        destination: Point2,
+        creep: bool = False,
+        kind: str = PATH,
+    ) -> bool:
+        """
+        Ask for a path to be solved in the next batch.
+
+        Requests for the same cells and kind are solved once, whoever made them.
+        An owner has one request at a time, further requests are ignored until it
+        collects the result with path_result or drops it with cancel_request.
+
+        Args:
+            owner (Hashable): who's asking, usually (purpose, unit tag)
+            start (Point2): where the path starts
+            destination (Point2): where the path ends
+            creep (bool): prefer creep
+            kind (str): PATH for every cell, CORNERS or ROUTE
+
+        Returns:
+            bool: True if the request was taken
+        """
+        if owner in self.path_owners:
+            return False
+        key = (
+            kind,
+            (floor(start[0]), floor(start[1])),
+            (floor(destination[0]), floor(destination[1])),
+            creep,
+        )
+        self.path_owners[owner] = key
+        if key not in self.path_results and key not in self.solving:
+            self.path_requests[key] = None
+        return True
+
+    def path_result(self, owner: Hashable) -> Tuple[bool, Any]:
+        """
+        Collect the result of an owner's request.
+
+        Args:
+            owner (Hashable): who asked
+
+        Returns:
+            Tuple[bool, Any]: (False, None) until the request is solved, otherwise
+                              (True, result) in the requested kind
+        """
+        key = self.path_owners.get(owner)
+        if key is None or key not in self.path_results:
+            return False, None
+        del self.path_owners[owner]
+        return True, self.path_results[key]
+
+    def cancel_request(self, owner: Hashable) -> None:
+        """Drop an owner's request, it's not solved if nobody else wants it."""
+        self.path_owners.pop(owner, None)
+
+    def solve_batch(self, keys: List[RequestKey]) -> Dict[RequestKey, Any]:
+        """
+        Solve a batch of requests.
+
+        Note: This runs in a worker thread when there's a job queue.
+
+        Args:
+            keys (List[RequestKey]): the requests
+
+        Returns:
+            Dict[RequestKey, Any]: result per request
+        """
+        results: Dict[RequestKey, Any] = {}
+        for key in keys:
+            kind, start, destination, creep = key
+            if kind == ROUTE:
+                results[key] = self.find_route(start, destination, creep)
+            else:
+                path = self.find_path(start, destination, creep)
+                results[key] = self.compress(path) if kind == CORNERS else path
+        return results
+
+    def solve_requests(self) -> None:
+        """
+        Deliver the last batch and start solving the next one.
+
+        Called once per frame after every request has been made. Only one batch is
+        solved at a time and it holds at most MAX_PATHS_PER_BATCH requests, so the
+        pathing done per frame is bounded.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if self.jobs and self.solving:
+            done, results = self.jobs.pop_result(BATCH_JOB)
+            if not done:
+                return
+            self.path_results.update(results)
+            self.solving.clear()
+        # keep only what someone is still waiting for
+        wanted = set(self.path_owners.values())
+        self.path_results = {
+            key: result for key, result in self.path_results.items() if key in wanted
+        }
+        queued = [key for key in self.path_requests if key in wanted]
+        batch = queued[:MAX_PATHS_PER_BATCH]
+        self.path_requests = dict.fromkeys(queued[MAX_PATHS_PER_BATCH:])
+        if not batch:
+            return
+        if self.jobs:
+            self.solving = dict.fromkeys(batch)
+            self.jobs.submit(BATCH_JOB, self.solve_batch, batch)
+        else:
+            self.path_results.update(self.solve_batch(batch))
+
+    def find_route(
+        self, start: Point2, destination: Point2, creep: bool = False
+    ) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """
+        Find a path, planning long ones on the cluster graph.
+
+        Short routes are pathed in full. Long routes get a coarse route and only the
+        first segment is pathed, the rest is refined as the unit gets there. Paths
+        come back compressed to their corners.
+
+        Args:
+            start (Point2): where the path starts
+            destination (Point2): where the path ends
+            creep (bool): prefer creep, the coarse route ignores it
+
+        Returns:
+            Tuple[List, List]: corners of the path and the coarse waypoints after it
+        """
+        floored_start = (floor(start[0]), floor(start[1]))
+        floored_dest = (floor(destination[0]), floor(destination[1]))
+        if octile(floored_start, floored_dest) < HIERARCHICAL_DISTANCE:
+            return self.compress(self.find_path(start, destination, creep)), []
+        with self.clusters_lock:
+            if self.clusters is None:
+                self.clusters = ClusterGraph(self.map_grid)
+            waypoints = self.clusters.coarse_route(floored_start, floored_dest)
+        if not waypoints:
+            return self.compress(self.find_path(start, destination, creep)), []
+        return self.next_segment(start, waypoints, creep)
+
+    def in_line_of_sight(self, a: Tuple[int, int], b: Tuple[int, int]) -> bool:
+        """
+        Check that every cell on the straight line between two cells is pathable.
+
+        Args:
+            a (Tuple[int, int]): first cell
+            b (Tuple[int, int]): second cell
+
+        Returns:
+            bool: True if a unit can walk straight from a to b
+        """
+        samples = 2 * max(abs(b[0] - a[0]), abs(b[1] - a[1])) + 1
+        xs = np.rint(np.linspace(a[0], b[0], samples)).astype(int)
+        ys = np.rint(np.linspace(a[1], b[1], samples)).astype(int)
+        return bool(self.map_grid[xs, ys].all())
+
+    def compress(self, path: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """
+        Reduce a path to the corners a unit has to turn at.
+
+        Cells where the direction doesn't change are dropped first, then corners
+        that can be skipped in a straight line.
+
+        Args:
+            path (List[Tuple[int, int]]): every cell of the path
+
+        Returns:
+            List[Tuple[int, int]]: corners after the start, ending with the last cell
+        """
+        if len(path) < 3:
+            return [(int(x), int(y)) for x, y in path[1:]] or list(path)
+        cells = np.asarray(path)
+        steps = np.diff(cells, axis=0)
+        turns = np.flatnonzero(np.any(steps[1:] != steps[:-1], axis=1)) + 1
+        corners = [tuple(cells[0])] + [tuple(cells[i]) for i in turns]
+        corners.append(tuple(cells[-1]))
+        kept = []
+        anchor = 0
+        while anchor < len(corners) - 1:
+            reach = anchor + 1
+            while reach + 1 < len(corners) and self.in_line_of_sight(
+                corners[anchor], corners[reach + 1]
+            ):
+                reach += 1
+            kept.append((int(corners[reach][0]), int(corners[reach][1])))
+            anchor = reach
+        return kept
+
+    def store_path(
+        self,
+        unit: Unit,
+        path: List[Tuple[int, int]],
+        waypoints: List[Tuple[int, int]],
+        game_loop: int,
+        creep: bool = False,
+    ) -> None:
+        """
+        Start a unit on a compressed path.
+
+        Args:
+            unit (Unit): the unit for pathing
+            path (List[Tuple[int, int]]): corners to follow
+            waypoints (List[Tuple[int, int]]): coarse route after path
+            game_loop (int): current game loop
+            creep (bool): whether the path is creep weighted
+
+        Returns:
+            None
+        """
+        leg = unit.distance_to(Point2(path[0])) if path else 0
+        self.pathing_dict[unit.tag] = {
+            "path": path,
+            "step": 0,
+            "leg": leg,
+            "loop": game_loop,
+            "waypoints": waypoints,
+            "creep": creep,
+            "segment": None,
+        }
+
+    def update_grid(
+        self, x0: int, y0: int, x1: int, y1: int, value: int, mask: Any = None
+    ) -> None:
+        """
+        Change pathability of a block of cells and update only what depends on it.
+
+        Args:
+            x0 (int): first x
+            y0 (int): first y
+            x1 (int): last x, inclusive
+            y1 (int): last y, inclusive
+            value (int): 1 for pathable, 0 for blocked
+            mask (ndarray): bool mask over the block of the cells to change, all
+                            of them if None
+
+        Returns:
+            None
+        """
+        x_end, y_end = x1 + 1, y1 + 1
+        block = self.map_grid[x0:x_end, y0:y_end]
+        if mask is None:
+            block[:] = value
+        else:
+            block[mask] = value
+        creep = self.creep_grid[x0:x_end, y0:y_end]
+        costs = np.where(creep, CREEP_COST, OFF_CREEP_COST) * (block != 0)
+        self.cost_grid[x0:x_end, y0:y_end] = costs
+        self.creep_dirty = True
+        with self.pf_lock:
+            self.pf = sc2pathlib.PathFind(self.map_grid)
+        with self.clusters_lock:
+            # a graph built later starts from the changed grid anyway
+            if self.clusters is not None:
+                self.clusters.update_region(self.map_grid, x0, y0, x1, y1)
+
+    def add_to_path_dict(
+        self, unit: Unit, destination: Point2, game_loop: int, creep: bool = False
+    ) -> None:
         """
         Add unit's path to the path storage dictionary.
 
         Args:
             unit (Unit): the unit for pathing
             destination (Point2): where the unit is going
+            game_loop (int): current game loop
+            creep (bool): prefer creep
+        Returns:
+            None
+        """
+        path, waypoints = self.find_route(unit.position, destination, creep)
+        self.store_path(unit, path, waypoints, game_loop, creep)
+
+    def block(self, tag: int, position: Any, size: int) -> None:
+        """
+        Take the cells under a new structure out of the grid.
+
+        Args:
+            tag (int): the structure, its cells are reopened when it's forgotten
+            position (Any): (x, y) center of the structure
+            size (int): footprint edge length
+
         Returns:
             None
         """
-        self.pathing_dict[unit.tag] = {"path": [], "step": 0}
-        raw_unit_pos = unit.position
-        floored_unit_pos = Point2((floor(raw_unit_pos.x), floor(raw_unit_pos.y)))
-        floored_dest = Point2((floor(destination[0]), floor(destination[1])))
-        self.pathing_dict[unit.tag]["path"] = self.pf.find_path(
-            floored_unit_pos, floored_dest
-        )[0]
+        x0, y0 = round(position[0] - size / 2), round(position[1] - size / 2)
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1 = min(x0 + size, self.map_grid.shape[0]) - 1
+        y1 = min(y0 + size, self.map_grid.shape[1]) - 1
+        x_end, y_end = x1 + 1, y1 + 1
+        # only what was walkable before is handed back
+        mask = self.map_grid[x0:x_end, y0:y_end] != 0
+        if mask.any():
+            self.blockers[tag] = (x0, y0, mask)
+            self.update_grid(x0, y0, x1, y1, 0, mask)
 
-    def follow_path(self, unit: Unit, default: Point2) -> Point2:
+    def add_rock(self, tag: int, position: Any, radius: float) -> None:
+        """
+        Note a rock the grid already has as blocked, to reopen its cells once it dies.
+
+        Args:
+            tag (int): the rock
+            position (Any): (x, y) center of the rock
+            radius (float): the rock's radius
+
+        Returns:
+            None
+        """
+        reach = int(radius)
+        x0, y0 = max(floor(position[0]) - reach, 0), max(floor(position[1]) - reach, 0)
+        x_end = min(floor(position[0]) + reach + 1, self.map_grid.shape[0])
+        y_end = min(floor(position[1]) + reach + 1, self.map_grid.shape[1])
+        dx = np.arange(x0, x_end)[:, None] + 0.5 - position[0]
+        dy = np.arange(y0, y_end)[None, :] + 0.5 - position[1]
+        # blocked cells the rock covers, not the cliffs next to it
+        mask = (dx ** 2 + dy ** 2 <= radius ** 2) & (
+            self.map_grid[x0:x_end, y0:y_end] == 0
+        )
+        if mask.any():
+            self.blockers[tag] = (x0, y0, mask)
+
+    def forget(self, unit_tag: int) -> None:
+        """
+        Drop a unit's stored path and path requests, reopen a structure's cells.
+
+        Args:
+            unit_tag (int): tag of the unit that's gone
+
+        Returns:
+            None
+        """
+        blocker = self.blockers.pop(unit_tag, None)
+        if blocker:
+            x0, y0, mask = blocker
+            width, height = mask.shape
+            self.update_grid(x0, y0, x0 + width - 1, y0 + height - 1, 1, mask)
+        self.pathing_dict.pop(unit_tag, None)
+        for owner in [
+            o for o in self.path_owners if isinstance(o, tuple) and unit_tag in o
+        ]:
+            del self.path_owners[owner]
+
+    def follow_path(
+        self, unit: Unit, default: Point2, game_loop: int, creep: bool = False
+    ) -> Point2:
         """
         Follow the path set or set a new one if none exists.
 
+        The unit is sent to one corner at a time. It moves on to the next corner
+        once it's close to the current one or has had time to walk the leg at its
+        movement speed. Paths come from the path service, so the unit walks straight
+        at its target until its path is solved.
+
         Args:
             unit (Unit): the unit moving
+            default (Point2): where the unit is going
+            game_loop (int): current game loop
+            creep (bool): prefer creep, used when a new path is made
 
         Returns:
             Point2: the location to attack
@@ -96,15 +597,55 @@ class PathManager:
             < 2
         ):
             if unit.tag not in self.pathing_dict:
-                self.add_to_path_dict(unit, tuple(default))
-            advance_factor = int(unit.movement_speed) + 2
-            self.pathing_dict[unit.tag]["step"] += advance_factor
-            curr_step = self.pathing_dict[unit.tag]["step"]
-            if curr_step >= len(self.pathing_dict[unit.tag]["path"]):
-                curr_step = len(self.pathing_dict[unit.tag]["path"]) - 1
-            if curr_step < 0:
-                return default
-            a_move_to = Point2(self.pathing_dict[unit.tag]["path"][curr_step])
-            if curr_step == len(self.pathing_dict[unit.tag]["path"]) - 1:
+                owner = ("route", unit.tag)
+                self.request_path(owner, unit.position, default, creep, ROUTE)
+                done, route = self.path_result(owner)
+                if not done:
+                    return default
+                self.store_path(unit, route[0], route[1], game_loop, creep)
+            entry = self.pathing_dict[unit.tag]
+            if entry["segment"]:
+                done, segment = self.path_result(entry["segment"])
+                if done and segment:
+                    self.store_path(
+                        unit, segment, entry["waypoints"], game_loop, entry["creep"]
+                    )
+                    entry = self.pathing_dict[unit.tag]
+                elif done:
+                    entry["segment"] = None
+            if not entry["path"]:
                 del self.pathing_dict[unit.tag]
-            return a_move_to
+                return default
+            corner = entry["path"][entry["step"]]
+            elapsed = game_loop - entry["loop"]
+            travelled = elapsed * unit.movement_speed / LOOPS_PER_SECOND
+            if (
+                travelled >= entry["leg"]
+                or unit.distance_to(Point2(corner)) <= ARRIVAL_DISTANCE
+            ):
+                if entry["step"] + 1 < len(entry["path"]):
+                    entry["step"] += 1
+                elif entry["waypoints"]:
+                    # refine the next part of a long route, walking straight at its
+                    # waypoint until the segment is solved
+                    goal, entry["waypoints"] = self.segment_goal(
+                        corner, entry["waypoints"]
+                    )
+                    # a segment still being solved ends where the unit already is
+                    if entry["segment"]:
+                        self.cancel_request(entry["segment"])
+                    # keyed on the goal, so a late result can't land on a newer one
+                    entry["segment"] = ("segment", unit.tag, goal)
+                    self.request_path(
+                        entry["segment"], corner, goal, entry["creep"], CORNERS
+                    )
+                    entry["path"] = [goal]
+                    entry["step"] = 0
+                else:
+                    del self.pathing_dict[unit.tag]
+                    return Point2(corner)
+                next_corner = entry["path"][entry["step"]]
+                entry["leg"] = octile(corner, next_corner)
+                entry["loop"] = game_loop
+                corner = next_corner
+            return Point2(corner)
@@ -0,0 +1,246 @@
+"""
+Per-map expansion order and building spots, worked out once and saved.
+
+The first game on a map finds every expansion and, around each of them, the spots
+where a 2x2 and a 3x3 building fit on the placement grid, away from the mineral
+line. It's saved to map_grids/{map_name}_placement.npz and loaded in later games,
+so only spots that turn out to be blocked need a live placement query.
+"""
+import os
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+
+# footprint edge length by building name
+FOOTPRINTS = {
+    "SPAWNINGPOOL": 3,
+    "EVOLUTIONCHAMBER": 3,
+    "ROACHWARREN": 3,
+    "BANELINGNEST": 3,
+    "HYDRALISKDEN": 3,
+    "INFESTATIONPIT": 3,
+    "SPIRE": 2,
+    "SPINECRAWLER": 2,
+    "SPORECRAWLER": 2,
+}
+SIZES = (2, 3)
+# spots are searched between these distances from the townhall
+MIN_SPOT_DISTANCE = 6
+MAX_SPOT_DISTANCE = 10
+
+Spot = Tuple[float, float]
+
+
+def placement_file(map_name: str) -> str:
+    """Return where a map's placement cache is stored."""
+    return f"map_grids/{map_name}_placement.npz"
+
+
+def find_spots(
+    placeable: Any, base: Any, resources: Iterable[Any], size: int
+) -> List[Spot]:
+    """
+    Find every spot near a base where a building of one size fits.
+
+    Args:
+        placeable (ndarray): bool placement grid indexed [x][y]
+        base (Any): (x, y) townhall position
+        resources (Iterable[Any]): (x, y) of the base's minerals and geysers
+        size (int): footprint edge length
+
+    Returns:
+        List[Spot]: building centers, closest to the base first
+    """
+    width, height = placeable.shape
+    # sum over every size x size window, indexed by its lower left cell
+    summed = np.zeros((width + 1, height + 1), dtype=np.int32)
+    summed[1:, 1:] = placeable.astype(np.int32).cumsum(axis=0).cumsum(axis=1)
+    end_x, end_y = width + 1 - size, height + 1 - size
+    windows = (
+        summed[size:, size:]
+        - summed[:end_x, size:]
+        - summed[size:, :end_y]
+        + summed[:end_x, :end_y]
+    )
+    xs, ys = np.nonzero(windows == size * size)
+    centers = np.column_stack((xs, ys)) + size / 2
+    offsets = centers - np.asarray(base, dtype=float)
+    distances = np.sqrt(np.einsum("ij,ij->i", offsets, offsets))
+    keep = (distances >= MIN_SPOT_DISTANCE) & (distances <= MAX_SPOT_DISTANCE)
+    resources = np.asarray(list(resources), dtype=float).reshape(-1, 2)
+    if len(resources):
+        # stay on the far side of the townhall from the mineral line
+        mineral_line = resources.mean(axis=0)
+        line_offsets = centers - mineral_line
+        from_line = np.sqrt(np.einsum("ij,ij->i", line_offsets, line_offsets))
+        keep &= from_line > np.linalg.norm(np.asarray(base) - mineral_line)
+    order = np.argsort(distances[keep], kind="stable")
+    return [(float(x), float(y)) for x, y in centers[keep][order]]
+
+
+class PlacementCache:
+    """Ordered expansions and building spots per base for one map."""
+
+    def __init__(self, tables: Any) -> None:
+        """
+        Wrap loaded or freshly built tables.
+
+        Args:
+            tables (Any): mapping with expansions, starts, orders and spots_{size},
+                          offsets_{size} for every size in SIZES
+
+        Returns:
+            None
+        """
+        self.expansions = np.asarray(tables["expansions"], dtype=float)
+        self.starts = np.asarray(tables["starts"], dtype=float)
+        self.orders = np.asarray(tables["orders"], dtype=int)
+        self.spots = {size: np.asarray(tables[f"spots_{size}"]) for size in SIZES}
+        self.offsets = {size: np.asarray(tables[f"offsets_{size}"]) for size in SIZES}
+        # spots handed out or found blocked this game
+        self.claimed: Dict[int, Set[Spot]] = {size: set() for size in SIZES}
+
+    @classmethod
+    def build(
+        cls,
+        placeable: Any,
+        start_locations: List[Any],
+        resources_by_base: Dict[Any, List[Any]],
+        distances: Any = None,
+    ) -> Any:
+        """
+        Work out the cache for a map.
+
+        Args:
+            placeable (ndarray): bool placement grid indexed [x][y]
+            start_locations (List[Any]): (x, y) of every start location
+            resources_by_base (Dict[Any, List[Any]]): expansion location -> (x, y)
+                                                      of its minerals and geysers
+            distances (BaseDistances): ground distances, straight lines if None
+
+        Returns:
+            PlacementCache: the cache
+        """
+        bases = list(resources_by_base)
+        expansions = np.array([(b[0], b[1]) for b in bases], dtype=float)
+        orders = []
+        for start in start_locations:
+            keys = np.linalg.norm(expansions - np.asarray(start), axis=1)
+            for i, base in enumerate(bases):
+                # ground distance where the table has it
+                ground = distances.distance(start, base) if distances else None
+                if ground is not None:
+                    keys[i] = ground
+            orders.append(np.argsort(keys, kind="stable"))
+        tables = {
+            "expansions": expansions,
+            "starts": np.array([(s[0], s[1]) for s in start_locations], dtype=float),
+            "orders": np.array(orders, dtype=int),
+        }
+        for size in SIZES:
+            cells: List[Spot] = []
+            offsets = [0]
+            for base in bases:
+                cells.extend(find_spots(placeable, base, resources_by_base[base], size))
+                offsets.append(len(cells))
+            tables[f"spots_{size}"] = np.array(cells, dtype=np.float32).reshape(-1, 2)
+            tables[f"offsets_{size}"] = np.array(offsets, dtype=np.int32)
+        return cls(tables)
+
+    @classmethod
+    def load(cls, map_name: str) -> Any:
+        """
+        Load a map's cache.
+
+        Args:
+            map_name (str): map name as given by game_info
+
+        Returns:
+            PlacementCache: the cache, None if it hasn't been built for this map
+        """
+        if not os.path.exists(placement_file(map_name)):
+            return None
+        with np.load(placement_file(map_name)) as tables:
+            return cls(tables)
+
+    def save(self, map_name: str) -> None:
+        """
+        Store the cache for later games.
+
+        Args:
+            map_name (str): map name as given by game_info
+
+        Returns:
+            None
+        """
+        tables: Dict[str, Any] = {
+            "expansions": self.expansions,
+            "starts": self.starts,
+            "orders": self.orders,
+        }
+        for size in SIZES:
+            tables[f"spots_{size}"] = self.spots[size]
+            tables[f"offsets_{size}"] = self.offsets[size]
+        np.savez(placement_file(map_name), **tables)
+
+    def nearest(self, points: Any, position: Any) -> int:
+        """Return the row of the point closest to position."""
+        offsets = points - np.array([position[0], position[1]])
+        return int(np.argmin(np.einsum("ij,ij->i", offsets, offsets)))
+
+    def expansions_from(self, start_location: Any) -> List[Spot]:
+        """
+        List every expansion, closest to a start location first.
+
+        Args:
+            start_location (Any): (x, y) of our start location
+
+        Returns:
+            List[Spot]: expansion locations
+        """
+        order = self.orders[self.nearest(self.starts, start_location)]
+        return [(float(x), float(y)) for x, y in self.expansions[order]]
+
+    def base_of(self, position: Any) -> int:
+        """Return the index of the expansion closest to a position."""
+        return self.nearest(self.expansions, position)
+
+    def next_spot(self, base: int, size: int) -> Spot:
+        """
+        Get the closest spot at a base that doesn't overlap a claimed one.
+
+        Args:
+            base (int): expansion index, see base_of
+            size (int): footprint edge length
+
+        Returns:
+            Spot: the building center, None if every spot is taken
+        """
+        begin, end = self.offsets[size][base], self.offsets[size][base + 1]
+        for x, y in self.spots[size][begin:end]:
+            spot = (float(x), float(y))
+            if not any(
+                abs(spot[0] - cx) < (size + other) / 2
+                and abs(spot[1] - cy) < (size + other) / 2
+                for other in SIZES
+                for cx, cy in self.claimed[other]
+            ):
+                return spot
+        return None
+
+    def claim(self, size: int, spot: Spot) -> None:
+        """
+        Mark a spot as built on or blocked so it's not handed out again.
+
+        Args:
+            size (int): footprint edge length
+            spot (Spot): the building center
+
+        Returns:
+            None
+        """
+        self.claimed[size].add((float(spot[0]), float(spot[1])))
+
+    def release(self, size: int, spot: Spot) -> None:
+        """Hand a claimed spot out again, it was only held while being checked."""
+        self.claimed[size].discard((float(spot[0]), float(spot[1])))
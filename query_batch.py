@@ -0,0 +1,120 @@
+"""Collect a frame's game queries and send them together."""
+from typing import Any, Dict, Hashable, List, Tuple
+
+from s2clientprotocol import common_pb2 as common_pb
+from s2clientprotocol import error_pb2 as error_pb
+from s2clientprotocol import query_pb2 as query_pb
+from sc2.ids.ability_id import AbilityId
+
+SUCCESS = error_pb.ActionResult.Value("Success")
+# answers that mean something stands on the spot or the ground doesn't allow it,
+# rather than something that changes by itself like resources or vision
+PLACEMENT_ERRORS = frozenset(
+    error_pb.ActionResult.Value(name)
+    for name in (
+        "CantBuildOnThat",
+        "CantBuildLocationInvalid",
+        "CantBuildTooCloseToResources",
+        "CantBuildTooCloseToDropOff",
+        "CantBuildTooCloseToCreepSource",
+        "CantBuildOnDenseTerrain",
+        "CantFindPlacementLocation",
+    )
+)
+
+
+class QueryBatch:
+    """
+    One frame's ability and placement queries.
+
+    The client has one connection and answers requests in order, so queries can't
+    run side by side. Instead every stage adds what it needs to know, the batch is
+    sent once and the stages read the answers. Abilities and placements go in
+    separate requests since they need different resource handling.
+    """
+
+    def __init__(self) -> None:
+        """
+        Set up an empty batch.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.ability_tags: List[int] = []
+        self.placement_keys: List[Hashable] = []
+        self.placements: List[Tuple[int, Any]] = []
+        self.abilities: Dict[int, List[AbilityId]] = {}
+        self.placement_results: Dict[Hashable, int] = {}
+        self.placeable: Dict[Hashable, bool] = {}
+
+    def ask_abilities(self, tags: List[int]) -> None:
+        """Ask for the available abilities of units."""
+        self.ability_tags.extend(tags)
+
+    def ask_placement(self, key: Hashable, ability: AbilityId, position: Any) -> None:
+        """
+        Ask if a building fits somewhere.
+
+        Args:
+            key (Hashable): identifies the answer, see placeable
+            ability (AbilityId): the ability that places the building
+            position (Any): (x, y) building center
+
+        Returns:
+            None
+        """
+        self.placement_keys.append(key)
+        self.placements.append((ability.value, position))
+
+    def blocked(self, key: Hashable) -> bool:
+        """Check if the game said a building can't stand at an asked spot."""
+        return self.placement_results.get(key) in PLACEMENT_ERRORS
+
+    async def send(self, client: Any) -> None:
+        """
+        Send the ability queries and the placement queries and keep the answers.
+
+        Abilities keep the resource requirements, so the ones we can't afford are
+        left out. Placements ignore them, so a spot only comes back as not
+        placeable when a building can't stand there, not because we're short on
+        minerals while the worker walks over.
+
+        Args:
+            client (Client): the bot's client
+
+        Returns:
+            None
+        """
+        if self.ability_tags:
+            response = await client._execute(
+                query=query_pb.RequestQuery(
+                    abilities=[
+                        query_pb.RequestQueryAvailableAbilities(unit_tag=tag)
+                        for tag in self.ability_tags
+                    ],
+                    ignore_resource_requirements=False,
+                )
+            )
+            for tag, answer in zip(self.ability_tags, response.query.abilities):
+                self.abilities[tag] = [
+                    AbilityId(a.ability_id) for a in answer.abilities
+                ]
+        if self.placements:
+            response = await client._execute(
+                query=query_pb.RequestQuery(
+                    placements=[
+                        query_pb.RequestQueryBuildingPlacement(
+                            ability_id=ability,
+                            target_pos=common_pb.Point2D(x=position[0], y=position[1]),
+                        )
+                        for ability, position in self.placements
+                    ],
+                    ignore_resource_requirements=True,
+                )
+            )
+            for key, answer in zip(self.placement_keys, response.query.placements):
+                self.placement_results[key] = answer.result
+                self.placeable[key] = answer.result == SUCCESS
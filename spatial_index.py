@@ -0,0 +1,171 @@
+"""Answer proximity queries with KD-trees built once per frame."""
+from typing import Any, Dict, List, Tuple, Union
+
+import numpy as np
+from sc2.position import Point2
+from sc2.unit import Unit
+from sc2.units import Units
+
+from lazy_import import lazy_import
+
+spatial = lazy_import("scipy.spatial")
+
+
+class SpatialIndex:
+    """KD-tree over the positions of one group of units."""
+
+    def __init__(self, units: Units) -> None:
+        """
+        Build the tree.
+
+        Args:
+            units (Units): the units to index
+
+        Returns:
+            None
+        """
+        self.units = units
+        self.unit_list: List[Unit] = list(units)
+        self.positions = np.array(
+            [unit.position_tuple for unit in self.unit_list], dtype=float
+        ).reshape(-1, 2)
+        self.tree: Any = spatial.cKDTree(self.positions) if self.unit_list else None
+
+    def __len__(self) -> int:
+        """Count indexed units."""
+        return len(self.unit_list)
+
+    @staticmethod
+    def as_points(positions: Any) -> Any:
+        """
+        Turn a unit, point or group of either into an (n, 2) array.
+
+        Args:
+            positions (Any): Unit, Point2, Units, list of points or ndarray
+
+        Returns:
+            ndarray: one row per position
+        """
+        if isinstance(positions, Unit):
+            return np.array([positions.position_tuple])
+        if isinstance(positions, Units):
+            return np.array([unit.position_tuple for unit in positions]).reshape(-1, 2)
+        return np.asarray(positions, dtype=float).reshape(-1, 2)
+
+    def nearest_k(self, positions: Any, k: int = 1) -> Tuple[Any, Any]:
+        """
+        Find the k closest indexed units to every query position at once.
+
+        Args:
+            positions (Any): query positions, see as_points
+            k (int): number of neighbours per position
+
+        Returns:
+            Tuple[ndarray, ndarray]: (n, k) distances and indices into unit_list,
+                                     missing neighbours have index len(self)
+        """
+        points = self.as_points(positions)
+        if not self.unit_list:
+            return (
+                np.full((len(points), k), np.inf),
+                np.zeros((len(points), k), dtype=int),
+            )
+        distances, indices = self.tree.query(points, k=k)
+        return distances.reshape(len(points), k), indices.reshape(len(points), k)
+
+    def in_radius(self, positions: Any, radius: float) -> List[List[int]]:
+        """
+        Find every indexed unit within radius of each query position.
+
+        Args:
+            positions (Any): query positions, see as_points
+            radius (float): search radius
+
+        Returns:
+            List[List[int]]: indices into unit_list per query position
+        """
+        points = self.as_points(positions)
+        if not self.unit_list:
+            return [[] for _ in range(len(points))]
+        return list(self.tree.query_ball_point(points, radius))
+
+    def closest_to(self, position: Union[Unit, Point2]) -> Unit:
+        """
+        Drop-in for Units.closest_to.
+
+        Args:
+            position (Union[Unit, Point2]): where to search from
+
+        Returns:
+            Unit: the closest indexed unit, None if there are none
+        """
+        if not self.unit_list:
+            return None
+        _, indices = self.nearest_k(position)
+        return self.unit_list[indices[0][0]]
+
+    def closest_distance_to(self, position: Union[Unit, Point2]) -> float:
+        """
+        Get the distance to the closest indexed unit.
+
+        Args:
+            position (Union[Unit, Point2]): where to search from
+
+        Returns:
+            float: the distance, inf if nothing is indexed
+        """
+        distances, _ = self.nearest_k(position)
+        return float(distances[0][0])
+
+    def closest_n_units(self, position: Union[Unit, Point2], n: int) -> Units:
+        """
+        Drop-in for Units.closest_n_units.
+
+        Args:
+            position (Union[Unit, Point2]): where to search from
+            n (int): number of units to return
+
+        Returns:
+            Units: up to n units, closest first
+        """
+        n = min(n, len(self.unit_list))
+        if n < 1:
+            return self.units.subgroup([])
+        _, indices = self.nearest_k(position, n)
+        return self.units.subgroup(self.unit_list[i] for i in indices[0])
+
+
+class FrameIndexes:
+    """Cache of SpatialIndex objects that is cleared every game loop."""
+
+    def __init__(self) -> None:
+        """
+        Set up the cache.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.game_loop: int = -1
+        self.indexes: Dict[str, SpatialIndex] = {}
+
+    def get(self, name: str, units: Units, game_loop: int) -> SpatialIndex:
+        """
+        Return this frame's index for a group of units, building it on first use.
+
+        Args:
+            name (str): cache key, the same name must always mean the same group
+            units (Units): the group, only read when the index is built
+            game_loop (int): current game loop
+
+        Returns:
+            SpatialIndex: the index
+        """
+        if game_loop != self.game_loop:
+            self.indexes.clear()
+            self.game_loop = game_loop
+        if name not in self.indexes:
+            self.indexes[name] = SpatialIndex(units)
+        return self.indexes[name]
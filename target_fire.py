@@ -0,0 +1,105 @@
+"""Pick focus-fire targets for a whole army at once."""
+from typing import Any
+
+import numpy as np
+
+# attackers are assigned until their damage over this many seconds kills the target
+KILL_WINDOW = 1.0
+# how far out of range a unit may be and still be given a target to close in on
+RANGE_SLACK = 1.0
+# rounds of reassigning attackers freed from targets that are already dead
+ROUNDS = 3
+
+
+def assign_targets(
+    positions: Any,
+    radii: Any,
+    ground_range: Any,
+    air_range: Any,
+    ground_dps: Any,
+    air_dps: Any,
+    enemy_positions: Any,
+    enemy_radii: Any,
+    enemy_flying: Any,
+    enemy_health: Any,
+    enemy_priority: Any,
+) -> Any:
+    """
+    Assign each attacker an enemy in range without overkilling any enemy.
+
+    Every attacker takes the highest priority enemy it can reach, nearest first on
+    ties. For each enemy, attackers are kept nearest first until their damage over
+    KILL_WINDOW covers its health, the rest are freed and assigned again among the
+    enemies that aren't covered yet.
+
+    Args:
+        positions (ndarray): (a, 2) attacker positions
+        radii (ndarray): (a,) attacker radii
+        ground_range (ndarray): (a,) range against ground, 0 if it can't hit ground
+        air_range (ndarray): (a,) range against air, 0 if it can't hit air
+        ground_dps (ndarray): (a,) damage per second against ground
+        air_dps (ndarray): (a,) damage per second against air
+        enemy_positions (ndarray): (e, 2) enemy positions
+        enemy_radii (ndarray): (e,) enemy radii
+        enemy_flying (ndarray): (e,) bool, True for air units
+        enemy_health (ndarray): (e,) health plus shield
+        enemy_priority (ndarray): (e,) higher is shot first
+
+    Returns:
+        ndarray: (a,) index of each attacker's target, -1 if none is in range
+    """
+    positions = np.asarray(positions, dtype=np.float32).reshape(-1, 2)
+    enemy_positions = np.asarray(enemy_positions, dtype=np.float32).reshape(-1, 2)
+    a, e = len(positions), len(enemy_positions)
+    targets = np.full(a, -1)
+    if not a or not e:
+        return targets
+    radii, enemy_radii = np.asarray(radii), np.asarray(enemy_radii)
+    ground_range, air_range = np.asarray(ground_range), np.asarray(air_range)
+    ground_dps, air_dps = np.asarray(ground_dps), np.asarray(air_dps)
+    flying = np.asarray(enemy_flying, dtype=bool)[None, :]
+    offsets = positions[:, None, :] - enemy_positions[None, :, :]
+    distances = np.sqrt(np.einsum("ijk,ijk->ij", offsets, offsets))
+    gaps = distances - np.add.outer(radii, enemy_radii)
+    reach = np.where(flying, air_range[:, None], ground_range[:, None])
+    damage = np.where(flying, air_dps[:, None], ground_dps[:, None])
+    usable = (reach > 0) & (damage > 0) & (gaps <= reach + RANGE_SLACK)
+    # priority decides, distance only breaks ties
+    score = np.asarray(enemy_priority)[None, :] - 1e-3 * gaps
+    needed = np.asarray(enemy_health, dtype=np.float32) / KILL_WINDOW
+    free = usable.any(axis=1)
+    for _ in range(ROUNDS):
+        if not free.any():
+            break
+        assigned = np.flatnonzero(targets >= 0)
+        hit = targets[assigned]
+        # damage already committed per enemy, covered enemies are off limits
+        committed = np.bincount(hit, weights=damage[assigned, hit], minlength=e)
+        open_enemies = committed < needed
+        options = usable & open_enemies[None, :] & free[:, None]
+        choosers = options.any(axis=1)
+        if not choosers.any():
+            break
+        choice = np.argmax(np.where(options, score, -np.inf), axis=1)
+        targets[choosers] = choice[choosers]
+        free[choosers] = False
+        # keep the nearest attackers on each enemy until it's covered
+        assigned = np.flatnonzero(targets >= 0)
+        hit = targets[assigned]
+        order = np.lexsort((gaps[assigned, hit], hit))
+        assigned, hit = assigned[order], hit[order]
+        dealt = damage[assigned, hit]
+        running = np.cumsum(dealt)
+        group_start = np.flatnonzero(np.r_[True, hit[1:] != hit[:-1]])
+        group_sizes = np.diff(np.r_[group_start, len(hit)])
+        before = np.repeat(running[group_start] - dealt[group_start], group_sizes)
+        surplus = running - dealt - before >= needed[hit]
+        released = assigned[surplus]
+        targets[released] = -1
+        free[released] = True
+    # anyone still without a target shoots the best enemy in range anyway
+    leftover = free & usable.any(axis=1)
+    if leftover.any():
+        best = np.argmax(np.where(usable, score, -np.inf), axis=1)
+        targets[leftover] = best[leftover]
+    return targets
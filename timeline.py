@@ -0,0 +1,125 @@
+"""Priority queue of game loops at which a unit needs looking at again."""
+import heapq
+from itertools import count
+from typing import Dict, List, Tuple
+
+# queen energy regeneration, 0.7875 per second on faster is 0.5625 per game second
+# on normal, which is 16 game loops
+ENERGY_PER_LOOP = 0.5625 / 16
+# energy cost of inject larva and of a queen's creep tumor
+QUEEN_ABILITY_ENERGY = 25
+# inject larva takes 29 seconds on faster
+INJECT_LOOPS = 650
+# how long to wait before checking again when the game says "not yet" and there's
+# no better estimate
+RETRY_LOOPS = 22
+
+# entry kinds: a queen's inject or creep tumor, a tumor's spread and the end of a
+# townhall's inject timer
+INJECT = "inject"
+CREEP = "creep"
+TUMOR = "tumor"
+LARVA = "larva"
+KINDS = (INJECT, CREEP, TUMOR, LARVA)
+
+# (kind, unit tag)
+Entry = Tuple[str, int]
+
+
+def loops_until_energy(energy: float, needed: float = QUEEN_ABILITY_ENERGY) -> int:
+    """
+    Estimate how long until a unit has enough energy.
+
+    Args:
+        energy (float): current energy
+        needed (float): energy the ability costs
+
+    Returns:
+        int: game loops, 0 if it already has enough
+    """
+    if energy >= needed:
+        return 0
+    return int((needed - energy) / ENERGY_PER_LOOP) + 1
+
+
+class Timeline:
+    """Entries keyed by (kind, tag), each due at one game loop."""
+
+    def __init__(self) -> None:
+        """
+        Set up the queue.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.queue: List[Tuple[int, int, Entry]] = []
+        # latest due loop per entry, older queue items for the same entry are skipped
+        self.scheduled: Dict[Entry, int] = {}
+        self.counter = count()
+
+    def __contains__(self, entry: Entry) -> bool:
+        """Check if an entry is scheduled."""
+        return entry in self.scheduled
+
+    def schedule(self, kind: str, tag: int, game_loop: int) -> None:
+        """
+        Schedule an entry, replacing any earlier schedule for it.
+
+        Args:
+            kind (str): what to look at, e.g. "inject"
+            tag (int): the unit's tag
+            game_loop (int): when it's due
+
+        Returns:
+            None
+        """
+        entry = (kind, tag)
+        self.scheduled[entry] = game_loop
+        heapq.heappush(self.queue, (game_loop, next(self.counter), entry))
+
+    def due(self, game_loop: int) -> List[Entry]:
+        """
+        Remove and return every entry due by now.
+
+        Args:
+            game_loop (int): current game loop
+
+        Returns:
+            List[Entry]: the due (kind, tag) entries, earliest first
+        """
+        entries = []
+        while self.queue and self.queue[0][0] <= game_loop:
+            loop, _, entry = heapq.heappop(self.queue)
+            if self.scheduled.get(entry) == loop:
+                del self.scheduled[entry]
+                entries.append(entry)
+        return entries
+
+    def cancel(self, kind: str, tag: int) -> None:
+        """
+        Unschedule an entry.
+
+        Args:
+            kind (str): the entry's kind
+            tag (int): the unit's tag
+
+        Returns:
+            None
+        """
+        self.scheduled.pop((kind, tag), None)
+
+    def forget(self, unit_tag: int) -> None:
+        """
+        Unschedule every entry for a unit.
+
+        Args:
+            unit_tag (int): tag of the unit that's gone
+
+        Returns:
+            None
+        """
+        for kind in KINDS:
+            self.scheduled.pop((kind, unit_tag), None)
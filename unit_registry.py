@@ -0,0 +1,195 @@
+"""Keep track of every friendly unit Paul has assigned a job to."""
+from typing import Callable, Dict, List, Set
+
+import numpy as np
+from sc2.ids.unit_typeid import UnitTypeId
+
+# roles are stored as small integers in the role column
+ROLE_NONE = 0
+ROLE_INJECT = 1
+ROLE_CREEP = 2
+ROLE_SCOUT = 3
+ROLES = ("none", "inject", "creep", "scout")
+
+# subscription events
+REMOVED = "removed"
+ROLE_CHANGED = "role_changed"
+
+
+class UnitRegistry:
+    """Store type and role per tag in columns, with a tag to slot index."""
+
+    def __init__(self, capacity: int = 256) -> None:
+        """
+        Set up the columns.
+
+        Args:
+            capacity (int): starting number of slots, doubled when full
+
+        Returns:
+            None
+        """
+        self.tags = np.zeros(capacity, dtype=np.uint64)
+        self.types = np.zeros(capacity, dtype=np.uint16)
+        self.roles = np.zeros(capacity, dtype=np.uint8)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.index: Dict[int, int] = {}  # tag -> slot
+        self.free_slots: List[int] = list(range(capacity - 1, -1, -1))
+        self.role_counts = np.zeros(len(ROLES), dtype=np.int32)
+        self.subscribers: Dict[str, List[Callable]] = {REMOVED: [], ROLE_CHANGED: []}
+
+    def __contains__(self, tag: int) -> bool:
+        """Check if the tag is registered."""
+        return tag in self.index
+
+    def __len__(self) -> int:
+        """Count registered units."""
+        return len(self.index)
+
+    def subscribe(self, event: str, callback: Callable) -> None:
+        """
+        Call back whenever a registered unit is removed or changes role.
+
+        Args:
+            event (str): REMOVED, called as callback(tag), or ROLE_CHANGED, called as
+                         callback(tag, old_role, new_role)
+            callback (Callable): the function to call
+
+        Returns:
+            None
+        """
+        self.subscribers[event].append(callback)
+
+    def grow(self) -> None:
+        """
+        Double the number of slots.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        old = len(self.tags)
+        self.tags = np.concatenate((self.tags, np.zeros(old, dtype=self.tags.dtype)))
+        self.types = np.concatenate((self.types, np.zeros(old, dtype=self.types.dtype)))
+        self.roles = np.concatenate((self.roles, np.zeros(old, dtype=self.roles.dtype)))
+        self.alive = np.concatenate((self.alive, np.zeros(old, dtype=bool)))
+        self.free_slots.extend(range(2 * old - 1, old - 1, -1))
+
+    def add(self, tag: int, type_id: UnitTypeId, role: int = ROLE_NONE) -> None:
+        """
+        Register a unit, or update its type if it's already registered.
+
+        Args:
+            tag (int): the unit's tag
+            type_id (UnitTypeId): the unit's type
+            role (int): one of the ROLE_ constants
+
+        Returns:
+            None
+        """
+        if tag in self.index:
+            self.types[self.index[tag]] = type_id.value
+            self.set_role(tag, role)
+            return
+        if not self.free_slots:
+            self.grow()
+        slot = self.free_slots.pop()
+        self.index[tag] = slot
+        self.tags[slot] = tag
+        self.types[slot] = type_id.value
+        self.roles[slot] = role
+        self.alive[slot] = True
+        self.role_counts[role] += 1
+
+    def remove(self, tag: int) -> None:
+        """
+        Drop a unit and tell every subscriber.
+
+        Args:
+            tag (int): tag of the unit that's gone
+
+        Returns:
+            None
+        """
+        for callback in self.subscribers[REMOVED]:
+            callback(tag)
+        slot = self.index.pop(tag, None)
+        if slot is None:
+            return
+        self.role_counts[self.roles[slot]] -= 1
+        self.alive[slot] = False
+        self.roles[slot] = ROLE_NONE
+        self.free_slots.append(slot)
+
+    def set_role(self, tag: int, role: int) -> None:
+        """
+        Give a registered unit a new role.
+
+        Args:
+            tag (int): the unit's tag
+            role (int): one of the ROLE_ constants
+
+        Returns:
+            None
+        """
+        slot = self.index[tag]
+        old_role = int(self.roles[slot])
+        if old_role == role:
+            return
+        self.roles[slot] = role
+        self.role_counts[old_role] -= 1
+        self.role_counts[role] += 1
+        for callback in self.subscribers[ROLE_CHANGED]:
+            callback(tag, old_role, role)
+
+    def role_of(self, tag: int) -> int:
+        """
+        Look up a unit's role.
+
+        Args:
+            tag (int): the unit's tag
+
+        Returns:
+            int: the role, ROLE_NONE if the tag isn't registered
+        """
+        slot = self.index.get(tag)
+        return ROLE_NONE if slot is None else int(self.roles[slot])
+
+    def type_of(self, tag: int) -> UnitTypeId:
+        """
+        Look up a unit's type.
+
+        Args:
+            tag (int): the unit's tag
+
+        Returns:
+            UnitTypeId: the type the unit was registered with
+        """
+        return UnitTypeId(int(self.types[self.index[tag]]))
+
+    def count(self, role: int) -> int:
+        """
+        Count the units with a role.
+
+        Args:
+            role (int): one of the ROLE_ constants
+
+        Returns:
+            int: number of registered units with that role
+        """
+        return int(self.role_counts[role])
+
+    def tags_with_role(self, role: int) -> Set[int]:
+        """
+        Get the tags of every unit with a role.
+
+        Args:
+            role (int): one of the ROLE_ constants
+
+        Returns:
+            Set[int]: the matching tags
+        """
+        mask = self.alive & (self.roles == role)
+        return {int(tag) for tag in self.tags[mask]}
@@ -0,0 +1,187 @@
+"""
+Live picture of the grids while a game runs, drawn off the game thread.
+
+The game thread only hands over references to its layers, paths and points, and
+only when a frame is due, so the bot doesn't wait on drawing. A background thread
+turns them into cells and positions with an optional prepare function and draws
+the latest of them at most MAX_FPS times a second, to a window or to PNG files for
+runs without a display. Layers are updated in place by the game thread,
+so a drawn frame can mix two game loops; that's fine for looking at. OpenCV is
+only imported when a Visualizer starts, so games that don't draw never load it.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+MAX_FPS = 4
+# screen pixels per map cell
+SCALE = 4
+# BGR color per layer, drawn in this order where the layer is set
+LAYER_COLORS = {
+    "pathing": (70, 70, 70),
+    "creep": (110, 40, 110),
+}
+PATH_COLOR = (60, 60, 230)
+# BGR color per kind of point, drawn last
+POINT_COLORS = {
+    "candidates": (60, 160, 60),
+    "units": (230, 180, 60),
+    "enemies": (40, 40, 255),
+    "tumors": (40, 220, 230),
+}
+Snapshot = Tuple[int, Dict[str, Any], List[Any], Dict[str, List[Any]]]
+
+
+def visual_dir(map_name: str) -> str:
+    """Return a new directory for a game's PNG frames."""
+    return f"visuals/{map_name}_{time.strftime('%Y%m%d-%H%M%S')}"
+
+
+def render(
+    shape: Tuple[int, int],
+    layers: Dict[str, Any],
+    paths: List[Any],
+    points: Dict[str, List[Any]],
+) -> Any:
+    """
+    Draw one frame.
+
+    Args:
+        shape (Tuple[int, int]): map size in cells, (width, height)
+        layers (Dict[str, ndarray]): name in LAYER_COLORS -> bool grid [x][y]
+        paths (List[Any]): paths as sequences of (x, y) cells, drawn as lines
+        points (Dict[str, List[Any]]): name in POINT_COLORS -> (x, y) positions
+
+    Returns:
+        ndarray: (height * SCALE, width * SCALE, 3) uint8 BGR image, north up
+    """
+    image = np.zeros(shape + (3,), dtype=np.uint8)
+    for name, color in LAYER_COLORS.items():
+        if layers.get(name) is not None:
+            image[layers[name]] = color
+    for name, color in POINT_COLORS.items():
+        if len(points.get(name, ())):
+            xs, ys = np.asarray(points[name], dtype=int).reshape(-1, 2).T
+            inside = (xs >= 0) & (xs < shape[0]) & (ys >= 0) & (ys < shape[1])
+            image[xs[inside], ys[inside]] = color
+    # [x][y] -> rows from the top of the map down
+    image = np.ascontiguousarray(np.rot90(image))
+    image = image.repeat(SCALE, axis=0).repeat(SCALE, axis=1)
+    # cell (x, y) -> pixel at the center of column x, row height - 1 - y
+    flip = np.array([1, -1])
+    origin = np.array([0, shape[1] - 1])
+    lines = [
+        ((np.asarray(path).reshape(-1, 2) * flip + origin) * SCALE + SCALE // 2)
+        for path in paths
+        if len(path) > 1
+    ]
+    if lines:
+        import cv2
+
+        lines = [line.astype(np.int32) for line in lines]
+        cv2.polylines(image, lines, False, PATH_COLOR)
+    return image
+
+
+class Visualizer:
+    """Draws the latest published snapshot in a background thread."""
+
+    def __init__(
+        self,
+        shape: Tuple[int, int],
+        out_dir: str = None,
+        fps: float = MAX_FPS,
+        prepare: Callable = None,
+    ) -> None:
+        """
+        Load OpenCV and start the drawing thread.
+
+        Args:
+            shape (Tuple[int, int]): map size in cells, (width, height)
+            out_dir (str): write PNG frames here, show a window if None
+            fps (float): most frames drawn per second
+            prepare (Callable): takes a snapshot's paths and points as published
+                                and returns them as render takes them, run in the
+                                drawing thread, None if they're published that way
+
+        Returns:
+            None
+        """
+        import cv2
+
+        self.cv2 = cv2
+        self.shape = shape
+        self.out_dir = out_dir
+        self.prepare = prepare
+        self.interval = 1 / fps
+        self.next_publish = 0.0
+        self.snapshot: Snapshot = None
+        self.ready = threading.Event()
+        self.stopped = False
+        self.drawn = 0
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        self.thread = threading.Thread(
+            target=self.run, name="paul-visualizer", daemon=True
+        )
+        self.thread.start()
+
+    def due(self) -> bool:
+        """Check if the drawing thread wants a new snapshot, so it's only made then."""
+        return time.perf_counter() >= self.next_publish
+
+    def publish(
+        self,
+        game_loop: int,
+        layers: Dict[str, Any],
+        paths: List[Any],
+        points: Dict[str, List[Any]],
+    ) -> None:
+        """
+        Hand over what to draw next, replacing a snapshot that wasn't drawn yet.
+
+        Nothing is copied, so pass arrays and lists the game thread won't change
+        other than by updating a grid layer in place.
+
+        Args:
+            game_loop (int): the current game loop
+            layers (Dict[str, ndarray]): see render
+            paths (List[Any]): see render, or what prepare takes
+            points (Dict[str, List[Any]]): see render, or what prepare takes
+
+        Returns:
+            None
+        """
+        self.next_publish = time.perf_counter() + self.interval
+        self.snapshot = (game_loop, layers, paths, points)
+        self.ready.set()
+
+    def run(self) -> None:
+        """Draw snapshots as they come in until closed."""
+        while True:
+            self.ready.wait()
+            self.ready.clear()
+            if self.stopped:
+                break
+            game_loop, layers, paths, points = self.snapshot
+            if self.prepare:
+                paths, points = self.prepare(paths, points)
+            image = render(self.shape, layers, paths, points)
+            if self.out_dir:
+                path = os.path.join(self.out_dir, f"{game_loop:06d}.png")
+                self.cv2.imwrite(path, image)
+            else:
+                self.cv2.imshow("Paul", image)
+                self.cv2.waitKey(1)
+            self.drawn += 1
+        if not self.out_dir:
+            self.cv2.destroyAllWindows()
+
+    def close(self) -> None:
+        """Stop the drawing thread after the frame it's on."""
+        self.stopped = True
+        self.ready.set()
+        self.thread.join()